@@ -0,0 +1,429 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from typing import Dict, List, Tuple
+import numpy
+
+from monkey_map import Board, Coordinates, Direction, Matrix2D, calculate_board_masks, get_starting_coordinates, move_part1
+from monkey_map import build_cached_jump_arrays, build_cube_geometry, build_jump_arrays, fold_cube_schedule, process_input_file, traverse_board_map, traverse_cube
+from monkey_map_batch import encode_paths, simulate_walkers
+from monkey_map_compiled import traverse_parallel
+
+
+# Benchmarks for the monkey map solution, run with: python benchmark_monkey_map.py --help
+# The scaling suite times process_input_file, traverse_board_map and traverse_cube on generated inputs of growing face sizes.
+# The micro benchmarks compare single techniques (the next cell table, the batch walkers).
+
+
+# Face layout of my own input, 1 is a face of the cube and 0 is empty space
+CUBE_NET_LAYOUT = [
+    [0, 1, 1],
+    [0, 1, 0],
+    [1, 1, 0],
+    [1, 0, 0],
+]
+
+# A few more of the 11 cube nets, to make sure the suite does not only test the layout of my own input
+CUBE_NET_LAYOUTS = [
+    CUBE_NET_LAYOUT,
+    [[0, 0, 1, 0], [1, 1, 1, 0], [0, 0, 1, 1]],
+    [[1, 1, 1, 0, 0], [0, 0, 1, 1, 1]],
+    [[1, 1, 0, 0], [0, 1, 1, 0], [0, 0, 1, 1]],
+    [[0, 1, 0, 0], [1, 1, 1, 1], [0, 1, 0, 0]],
+]
+
+# Where the results of the scaling suite are compared against, see compare_with_baseline
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample.txt')
+
+# Runs in a fresh Python process: imports monkey_map, solves both parts for the input file and prints the timings as JSON
+COLD_START_SCRIPT = '''
+import json, sys, time
+start_time = time.perf_counter()
+import monkey_map
+import_time = time.perf_counter()
+board_map, path_to_follow = monkey_map.process_input_file(sys.argv[1])
+monkey_map.traverse_board_map(board_map, path_to_follow)
+monkey_map.traverse_cube(board_map, path_to_follow)
+print(json.dumps({'import': import_time - start_time, 'solve': time.perf_counter() - import_time}))
+'''
+
+
+def generate_board_map(face_size: int, wall_density: float = 0.05, seed: int = 0, cube_net_layout: List[List[int]] = CUBE_NET_LAYOUT) -> Matrix2D:
+    """
+    Generates a padded board map following the cube net layout, with faces of face_size x face_size.
+    Every cell on a face has a chance of wall_density to be a '#', the rest is filled with ' '.
+    The first cell of the top row is always kept open, so there is a valid starting point.
+
+    The cells are drawn with numpy per row of faces, so face sizes in the thousands are generated in seconds.
+    """
+    rng = numpy.random.default_rng(seed)
+    symbols = numpy.frombuffer(b'.# ', dtype=numpy.uint8)
+
+    board_map = []
+    for layout_row in cube_net_layout:
+        block = rng.random((face_size, face_size * len(layout_row))) < wall_density
+        block = symbols[block.astype(numpy.uint8)]
+        for face_column, face in enumerate(layout_row):
+            if not face:
+                block[:, face_column * face_size:(face_column + 1) * face_size] = symbols[2]
+        board_map += [board_row.tobytes().decode('ascii') for board_row in block]
+
+    first_open_column = board_map[0].index(board_map[0].strip()[0])
+    board_map[0] = board_map[0][:first_open_column] + '.' + board_map[0][first_open_column + 1:]
+    return board_map
+
+
+def generate_actions(amount_of_moves: int, max_move_amount: int, seed: int = 0) -> List[Tuple[str, int]]:
+    """Generates a list of (rotation, move_amount) actions, which is a path already split into its tokens"""
+    rng = random.Random(seed)
+    return [(rng.choice('LR'), rng.randint(1, max_move_amount)) for _ in range(amount_of_moves)]
+
+
+def generate_path(amount_of_actions: int, max_move_amount: int, seed: int = 0) -> str:
+    """
+    Generates a random path to follow of amount_of_actions actions, alternating moves and rotations like a real input.
+    The path always starts and ends with a move.
+    """
+    rng = numpy.random.default_rng(seed)
+    amount_of_moves = (amount_of_actions + 1) // 2
+    move_amounts = rng.integers(1, max_move_amount + 1, amount_of_moves).astype(str)
+    rotations = numpy.where(rng.random(amount_of_moves) < 0.5, 'L', 'R')
+    rotations[-1] = ''
+
+    path = numpy.char.add(move_amounts, rotations)
+    return ''.join(path.tolist())
+
+
+def write_input_file(input_file: str, board_map: Matrix2D, path_to_follow: str) -> None:
+    """Writes a board and path to an input file, in the same format as the AoC2022 input (trailing ' ' are left out)"""
+    with open(input_file, 'w') as f:
+        for board_row in board_map:
+            f.write(board_row.rstrip() + '\n')
+        f.write('\n' + path_to_follow + '\n')
+
+
+# Historical variant: the next cell table is how traverse_board_map used to skip the empty space.
+# Stepping through the table turned out slower than move_part1 itself, and the jump arrays replaced it in monkey_map,
+# it is only kept here so the micro benchmarks can still compare it against the stepper.
+
+
+class NextCellTable(List[List[List[Coordinates]]]):
+    """Type hinting class for the next cell of every open cell, indexed by [Direction value][row][column]"""
+    pass
+
+
+def build_next_cell_table(board_map: Board) -> NextCellTable:
+    """
+    Precomputes, for every open cell, the cell you end up on after a single step in each direction.
+    This is the same logic as move_part1, but done once for the whole board instead of on every step.
+
+    Every row and column is reduced to the list of its non ' ' cells, which makes wrapping around
+    nothing more than taking the next (or previous) element of that list, modulo its length.
+    If the next cell is a '#', the open cell itself is stored, as the move would stop there.
+
+    Returns a 2D matrix of next coordinates for each direction, indexed by [Direction value][row][column].
+    Cells that are not open have None as next cell.
+
+    Example:
+    Row '  ..#.  ' has non ' ' cells in columns [2, 3, 4, 5].
+    Moving east from (0, 5) wraps to column 2, moving east from (0, 3) is blocked by the '#' and stays at (0, 3).
+    """
+    void_mask, wall_mask = calculate_board_masks(board_map)
+    open_mask = (~void_mask & ~wall_mask).tolist()
+    next_cell_table = NextCellTable([[None] * void_mask.shape[1] for _ in range(void_mask.shape[0])] for _ in Direction)
+
+    def store_next_cells(line: List[Coordinates], direction_forward: Direction, direction_backward: Direction) -> None:
+        next_cells_forward = next_cell_table[direction_forward.value]
+        next_cells_backward = next_cell_table[direction_backward.value]
+        is_open = [open_mask[row][column] for row, column in line]
+
+        for index in range(len(line)):
+            if not is_open[index]:
+                continue
+
+            row, column = line[index]
+            forward_index = (index + 1) % len(line)
+            next_cells_forward[row][column] = line[forward_index] if is_open[forward_index] else line[index]
+            next_cells_backward[row][column] = line[index - 1] if is_open[index - 1] else line[index]
+
+    for row in range(void_mask.shape[0]):
+        line = [(row, column) for column in numpy.flatnonzero(~void_mask[row]).tolist()]
+        store_next_cells(line, Direction.E, Direction.W)
+
+    for column in range(void_mask.shape[1]):
+        line = [(row, column) for row in numpy.flatnonzero(~void_mask[:, column]).tolist()]
+        store_next_cells(line, Direction.S, Direction.N)
+
+    return next_cell_table
+
+
+def move_with_next_cell_table(next_cell_table: NextCellTable, move_amount: int, direction: Direction, row: int, column: int) -> Coordinates:
+    """
+    Movement function for part 1, using the table from build_next_cell_table.
+
+    As walls and wraps are already resolved in the table, a step is a single lookup.
+    When the next cell is the current cell, we are standing in front of a '#' and the move stops.
+
+    Returns the new coordinates of the point after the move (row, column).
+    """
+    next_cells = next_cell_table[direction.value]
+
+    for _ in range(move_amount):
+        next_row, next_column = next_cells[row][column]
+        if next_row == row and next_column == column:
+            break
+        row, column = next_row, next_column
+
+    return row, column
+
+
+def run_with_stepper(board_map: Matrix2D, actions: List[Tuple[str, int]]) -> Tuple[int, int]:
+    """Follows the actions with move_part1, which walks through the empty space cell by cell"""
+    row, column = get_starting_coordinates(board_map)
+    direction = Direction.E
+    for rotation, move_amount in actions:
+        direction = Direction((direction.value + (1 if rotation == 'R' else -1)) % 4)
+        row, column = move_part1(board_map, move_amount, direction, row, column)
+    return row, column
+
+
+def run_with_next_cell_table(next_cell_table: NextCellTable, board_map: Matrix2D, actions: List[Tuple[str, int]]) -> Tuple[int, int]:
+    """Follows the actions with an already precomputed next cell table"""
+    row, column = get_starting_coordinates(board_map)
+    direction = Direction.E
+    for rotation, move_amount in actions:
+        direction = Direction((direction.value + (1 if rotation == 'R' else -1)) % 4)
+        row, column = move_with_next_cell_table(next_cell_table, move_amount, direction, row, column)
+    return row, column
+
+
+def benchmark_next_cell_table(face_size: int, amount_of_moves: int = 5000, repeat: int = 3) -> None:
+    """
+    Prints the time of the stepper and of the next cell table on the same board and path.
+    The one-time precompute of the table is timed separately, and is included in the total speedup.
+    """
+    # A low wall density makes for long moves, which is where the gap scans of move_part1 hurt the most
+    board_map = generate_board_map(face_size, wall_density=0.001)
+    actions = generate_actions(amount_of_moves, max_move_amount=4 * face_size)
+    next_cell_table = build_next_cell_table(board_map)
+
+    assert run_with_stepper(board_map, actions) == run_with_next_cell_table(next_cell_table, board_map, actions)
+
+    stepper_time = min(timeit.repeat(lambda: run_with_stepper(board_map, actions), number=1, repeat=repeat))
+    precompute_time = min(timeit.repeat(lambda: build_next_cell_table(board_map), number=1, repeat=repeat))
+    table_time = min(timeit.repeat(lambda: run_with_next_cell_table(next_cell_table, board_map, actions), number=1, repeat=repeat))
+    print(
+        f"face size {face_size}: \tstepper {stepper_time:.3f}s \tprecompute {precompute_time:.3f}s \ttable {table_time:.3f}s"
+        f" \tspeedup {stepper_time / table_time:.1f}x (with precompute {stepper_time / (precompute_time + table_time):.1f}x)"
+    )
+
+
+def benchmark_batch_walkers(face_size: int, amount_of_walkers: int = 10 ** 5, amount_of_moves: int = 2000) -> None:
+    """Prints the time to move amount_of_walkers walkers from random start states over the same path, on the cube"""
+    board_map = generate_board_map(face_size)
+    path = ''.join(f"{move_amount}{rotation}" for rotation, move_amount in generate_actions(amount_of_moves, max_move_amount=face_size))
+    jump_arrays = build_jump_arrays(board_map, 2)
+
+    rng = numpy.random.default_rng(0)
+    open_cells = numpy.argwhere(numpy.array([[cell == '.' for cell in board_row] for board_row in board_map]))
+    open_cells = open_cells[rng.integers(0, len(open_cells), amount_of_walkers)]
+    start_directions = rng.integers(0, 4, amount_of_walkers)
+
+    batch_time = min(timeit.repeat(lambda: simulate_walkers(jump_arrays, open_cells[:, 0], open_cells[:, 1], start_directions, encode_paths([path])[0]), number=1, repeat=3))
+    print(f"face size {face_size}: \t{amount_of_walkers} walkers x {2 * amount_of_moves} actions \tbatch {batch_time:.3f}s")
+
+
+def benchmark_parallel_crossover(face_size: int, workers: int = None, sizes: List[int] = (10 ** 4, 10 ** 5, 10 ** 6, 4 * 10 ** 6)) -> int:
+    """
+    Times traverse_parallel (part 2) against traverse_cube for paths of increasing amounts of actions.
+    Starting worker processes and compiling the start of every chunk for all states costs a fixed amount of time,
+    so the parallel mode only wins from a certain path length on, this is the crossover for traverse_parallel.
+
+    Returns the first amount of actions where the parallel mode is faster, or None if it never is (like on a single core).
+    """
+    board_map = generate_board_map(face_size)
+    crossover = None
+    for amount_of_actions in sizes:
+        path_to_follow = generate_path(amount_of_actions, max_move_amount=2 * face_size)
+        sequential_time = time_function(lambda: traverse_cube(board_map, path_to_follow), 1)
+        parallel_time = time_function(lambda: traverse_parallel(board_map, path_to_follow, 2, workers, crossover=0), 1)
+        print(f"face size {face_size}: \t{amount_of_actions} actions \tsequential {sequential_time:.3f}s \tparallel {parallel_time:.3f}s")
+
+        if crossover is None and parallel_time < sequential_time:
+            crossover = amount_of_actions
+
+    print(f"crossover: {crossover if crossover is not None else 'never'} ({workers or os.cpu_count()} workers)")
+    return crossover
+
+
+def clear_caches() -> None:
+    """Forgets the cached jump arrays and cube geometry, so the next run has to precompute them again"""
+    build_cached_jump_arrays.cache_clear()
+    fold_cube_schedule.cache_clear()
+    build_cube_geometry.cache_clear()
+
+
+def time_function(function, repeat: int) -> float:
+    """
+    Returns the best wall time in seconds of calling function repeat times.
+    The caches are cleared before every call (outside the timing, see clear_caches), otherwise only the first call would pay for the precompute.
+    """
+    return min(timeit.repeat(function, setup=clear_caches, number=1, repeat=repeat))
+
+
+def run_scaling_suite(face_sizes: List[int], amount_of_actions: int, wall_density: float, repeat: int, seed: int = 0) -> List[Dict]:
+    """
+    Times process_input_file, traverse_board_map and traverse_cube separately, for every face size.
+    The input is generated, with a cube net layout picked per face size, and written to a temporary file.
+
+    Returns a list of results, one dictionary per face size and function, with the best time of repeat runs.
+    """
+    results = []
+    for size_index, face_size in enumerate(face_sizes):
+        cube_net_layout = CUBE_NET_LAYOUTS[size_index % len(CUBE_NET_LAYOUTS)]
+        board_map = generate_board_map(face_size, wall_density, seed, cube_net_layout)
+        path_to_follow = generate_path(amount_of_actions, max_move_amount=2 * face_size, seed=seed)
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_file = os.path.join(directory, 'input.txt')
+            write_input_file(input_file, board_map, path_to_follow)
+
+            timings = {
+                'process_input_file': time_function(lambda: process_input_file(input_file), repeat),
+                'traverse_board_map': time_function(lambda: traverse_board_map(board_map, path_to_follow), repeat),
+                'traverse_cube': time_function(lambda: traverse_cube(board_map, path_to_follow), repeat),
+            }
+
+        for function_name, seconds in timings.items():
+            results.append({
+                'name': f"{function_name}[face_size={face_size}]",
+                'function': function_name,
+                'face_size': face_size,
+                'amount_of_actions': amount_of_actions,
+                'wall_density': wall_density,
+                'seconds': seconds,
+            })
+            print(f"{function_name:<20} face size {face_size:<6} {amount_of_actions} actions \t{seconds:.3f}s")
+
+    return results
+
+
+def run_cold_start(input_file: str = SAMPLE_FILE, repeat: int = 5) -> List[Dict]:
+    """
+    Times fresh Python processes solving a small input file, just like the short-lived processes we spawn (see COLD_START_SCRIPT).
+    - cold_start_import: importing monkey_map
+    - cold_start_solve: reading the input file and solving both parts, right after the import
+    - cold_start_process: the whole process, including starting the interpreter
+
+    Returns a list of results (in the same format as run_scaling_suite), with the best time of repeat runs.
+    """
+    timings = {'cold_start_import': [], 'cold_start_solve': [], 'cold_start_process': []}
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, input_file], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        timings['cold_start_process'].append(time.perf_counter() - start_time)
+
+        process_timings = json.loads(output)
+        timings['cold_start_import'].append(process_timings['import'])
+        timings['cold_start_solve'].append(process_timings['solve'])
+
+    results = []
+    for function_name, seconds in timings.items():
+        results.append({'name': f"{function_name}[{os.path.basename(input_file)}]", 'function': function_name, 'seconds': min(seconds)})
+        print(f"{function_name:<20} {os.path.basename(input_file)} \t{min(seconds):.3f}s")
+    return results
+
+
+def compare_with_baseline(results: List[Dict], baseline: List[Dict], tolerance: float, min_seconds: float = 0.1) -> List[str]:
+    """
+    Compares every result with the result of the same name in the baseline.
+    A result regresses when it is more than tolerance times slower than the baseline,
+    and also more than min_seconds slower (so the noise on very short timings does not fail the run).
+
+    Returns a list of messages, one per regression (empty if there are none).
+    """
+    baseline_seconds = {result['name']: result['seconds'] for result in baseline}
+
+    regressions = []
+    for result in results:
+        if result['name'] not in baseline_seconds:
+            continue
+        slowdown = result['seconds'] - baseline_seconds[result['name']]
+        if result['seconds'] > tolerance * baseline_seconds[result['name']] and slowdown > min_seconds:
+            regressions.append(f"{result['name']} took {result['seconds']:.3f}s, the baseline is {baseline_seconds[result['name']]:.3f}s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks for the Monkey Map solution.")
+    parser.add_argument('--face-sizes', type=int, nargs='+', default=[50, 100, 200], help="face sizes of the generated cubes (50 up to 5000)")
+    parser.add_argument('--actions', type=int, default=10 ** 4, help="amount of actions of the generated path (up to 10^7)")
+    parser.add_argument('--wall-density', type=float, default=0.05, help="chance for every cell to be a wall")
+    parser.add_argument('--repeat', type=int, default=3, help="amount of runs per benchmark, the best time is kept")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file to compare the results with")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="fail when a result is this many times slower than the baseline")
+    parser.add_argument('--min-seconds', type=float, default=0.1, help="ignore regressions of less than this many seconds")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline instead of comparing")
+    parser.add_argument('--micro', action='store_true', help="run the micro benchmarks instead of the scaling suite")
+    parser.add_argument('--cold-start', action='store_true', help="also time fresh processes importing monkey_map and solving sample.txt")
+    parser.add_argument('--parallel', action='store_true', help="find the crossover of traverse_parallel instead of running the scaling suite")
+    parser.add_argument('--workers', type=int, default=None, help="the amount of worker processes for --parallel (default: every core)")
+    arguments = parser.parse_args()
+
+    if arguments.micro:
+        for face_size in arguments.face_sizes:
+            benchmark_next_cell_table(face_size)
+        for face_size in arguments.face_sizes:
+            benchmark_batch_walkers(face_size)
+        return
+
+    if arguments.parallel:
+        for face_size in arguments.face_sizes:
+            benchmark_parallel_crossover(face_size, arguments.workers)
+        return
+
+    results = run_scaling_suite(arguments.face_sizes, arguments.actions, arguments.wall_density, arguments.repeat)
+    if arguments.cold_start:
+        results += run_cold_start(repeat=arguments.repeat)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return
+
+    if not os.path.exists(arguments.baseline):
+        print(f"No baseline found at {arguments.baseline}, run with --save-baseline to create one.")
+        return
+
+    with open(arguments.baseline, 'r') as f:
+        baseline = json.load(f)['results']
+
+    regressions = compare_with_baseline(results, baseline, arguments.tolerance, arguments.min_seconds)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,24 @@
-from typing import List, Tuple
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple, Union
+import argparse
+import array
+import collections
+import functools
+import importlib
+import itertools
+import json
+import math
+import os
 import sys
+import time
 from enum import Enum
 import re
-import numpy
+
+# numpy (and the modules only some loaders or the profiler need) take longer to import than solving a normal input,
+# so they are imported by the functions that use them, and the default CLI never imports numpy at all
+if TYPE_CHECKING:
+    import mmap
+    import numpy
 
 
 
@@ -19,7 +35,51 @@ class Direction(Enum):
 # Direction vectors used when travelling in a certain direction, to manipulate row or column
 DIRECTION_VECTORS = [[0, 1], [1, 0], [0, -1], [-1, 0]]
 
- # GRID_SIZE is hardcoded for now, can be automatically calculated in the future
+# Rotating or reversing a direction is a lookup by its value, instead of constructing a new Direction every time
+ROTATED_DIRECTIONS = {'R': [Direction.S, Direction.W, Direction.N, Direction.E], 'L': [Direction.N, Direction.E, Direction.S, Direction.W]}
+REVERSED_DIRECTIONS = [Direction.W, Direction.N, Direction.E, Direction.S]
+
+# A packed state is the int (row * width + column) * 4 + direction value (see pack_state)
+# Rotating a packed state only changes its lowest 2 bits, which is adding the delta for its direction value
+PACKED_ROTATION_DELTAS = {'R': [1, 1, 1, -3], 'L': [3, -1, -1, -1]}
+
+# The wall distance of a state without a wall on its cycle (the maximum int64), so a move is always cut off at min(move, wall distance)
+NO_WALL = (1 << 63) - 1
+
+# Jump arrays are cached for this many boards (see get_jump_arrays)
+JUMP_ARRAYS_CACHE_SIZE = 16
+
+# A traversal steps cell by cell until the move amounts add up to this many steps per cell of the board,
+# then it switches to the jump arrays (see follow_actions_stepping). Every step is O(1), even a wrap across the void (see wrap_part1),
+# and a move amount is charged in full even when a wall cuts the move short, so the stepping never costs more than the budget.
+# Building the jump arrays costs about as much as stepping over every cell once, so on a cube net a traversal never takes
+# more than about twice as long as building the jump arrays up front would (see traverse_board_map)
+DIRECT_STEP_BUDGET = 1
+# Importing numpy (for the jump arrays) takes about as long as this many steps, so a traversal that would have to import it
+# first gets these steps on top of its budget (see calculate_step_budget)
+NUMPY_IMPORT_STEPS = 1 << 19
+
+# Codes for the cells of a board stored as a numpy array (see convert_board_map_to_array)
+# BOARD_SYMBOLS holds the symbol for each code, ' ' is BOARD_VOID, '.' is BOARD_OPEN and '#' is BOARD_WALL
+BOARD_VOID = 0
+BOARD_OPEN = 1
+BOARD_WALL = 2
+BOARD_SYMBOLS = ' .#'
+
+# Tokens of the path to follow, either a move amount or a rotation
+PATH_TOKEN_PATTERN = re.compile(r'\d+|\w')
+
+# Amount of characters read at once when streaming the path from the input file
+PATH_CHUNK_SIZE = 1 << 16
+
+# Amount of bytes decompressed at once when loading a compressed input file
+INPUT_CHUNK_SIZE = 1 << 20
+
+# Compressed input files are decompressed while reading, the module with the opener is picked by the extension of the file
+COMPRESSED_FILE_OPENERS = {'.gz': 'gzip', '.xz': 'lzma'}
+NEWLINE_BYTE = ord('\n')
+
+ # GRID_SIZE is hardcoded for the VERTEX_MAP of my own input, calculate_grid_size works it out for any input
 GRID_SIZE = 50
 
 
@@ -28,6 +88,15 @@ class Matrix2D(List[List[str]]):
     pass
 
 
+# A board is either a Matrix2D of ' ', '.' and '#' symbols, or a 2D uint8 numpy array of their codes
+Board = Union[Matrix2D, 'numpy.ndarray']
+
+
+class CubeSchedule(Tuple[Tuple[int, ...], ...]):
+    """Type hinting class for the layout of the cube faces on the board, 1 is a face and 0 is empty space"""
+    pass
+
+
 class Coordinates(Tuple[int, int]):
     """Type hinting class for a set of coordinates (row, column)"""
     pass
@@ -43,6 +112,123 @@ class EdgeSide(Tuple[Coordinates, Coordinates, Direction, Vector]):
     pass
 
 
+class State(Tuple[int, int, Direction]):
+    """Type hinting class for the state of a walker (row, column, direction)"""
+    pass
+
+
+class PortalMap(Dict[State, State]):
+    """Type hinting class for the cube seams, mapping the state before walking off an edge to the state after"""
+    pass
+
+
+class PackedJumpTable(NamedTuple):
+    """
+    Helper class to view the jump arrays as flat sequences of ints, indexed by packed state (see pack_state and pack_jump_arrays):
+    - width: the width of the board, needed to pack and unpack states
+    - cycle_states: all cycles after each other, as packed states
+    - cycle_offsets: for every state, where its cycle starts in cycle_states
+    - cycle_positions: for every state, its position on the cycle
+    - cycle_lengths: for every state, the length of its cycle
+    - wall_distances: for every state, the amount of steps possible before hitting a wall (NO_WALL if there is no wall)
+    """
+    width: int
+    cycle_states: Sequence[int]
+    cycle_offsets: Sequence[int]
+    cycle_positions: Sequence[int]
+    cycle_lengths: Sequence[int]
+    wall_distances: Sequence[int]
+
+
+class JumpArrays(NamedTuple):
+    """
+    Helper class to store the jump table of a board as numpy arrays, indexed by packed state (see pack_state and build_jump_arrays):
+    - width: the width of the board, needed to pack and unpack states
+    - cycle_states: all cycles after each other, as packed states
+    - cycle_offsets: for every state, where its cycle starts in cycle_states
+    - cycle_positions: for every state, its position on the cycle
+    - cycle_lengths: for every state, the length of its cycle
+    - wall_distances: for every state, the steps possible before hitting a wall (NO_WALL if there is no wall)
+    """
+    width: int
+    cycle_states: numpy.ndarray
+    cycle_offsets: numpy.ndarray
+    cycle_positions: numpy.ndarray
+    cycle_lengths: numpy.ndarray
+    wall_distances: numpy.ndarray
+
+
+class CubeGeometry(NamedTuple):
+    """
+    Helper class to store everything part 2 needs to know about the cube of a board (see get_cube_geometry):
+    - grid_size: the size of a cube face
+    - cube_schedule: the layout of the cube faces on the board (see calculate_cube_schedule)
+    - vertex_map: the folded vertex map, with vertices multiplied by the grid size (see calculate_vertex_map)
+    - portal_map: the compiled portals of the vertex map (see compile_portal_map)
+    """
+    grid_size: int
+    cube_schedule: CubeSchedule
+    vertex_map: List[List[EdgeSide]]
+    portal_map: PortalMap
+
+
+class SparseBoard(NamedTuple):
+    """
+    Helper class to store a board without its void cells (see build_sparse_board).
+    Every row and every column of a cube net is a single span of cells, so only the start and length of each span are stored.
+    The cells themselves are numbered row by row, and only hold a wall bit.
+
+    - row_offsets, row_lengths: for every row, the first column and the amount of cells
+    - column_offsets, column_lengths: for every column, the first row and the amount of cells
+    - row_cell_offsets: for every row, the number of its first cell (the amount of cells in all rows above it)
+    - walls: the wall bitmap, 1 bit per cell (see numpy.packbits)
+    """
+    row_offsets: numpy.ndarray
+    row_lengths: numpy.ndarray
+    column_offsets: numpy.ndarray
+    column_lengths: numpy.ndarray
+    row_cell_offsets: numpy.ndarray
+    walls: numpy.ndarray
+
+
+class WallIndex(NamedTuple):
+    """
+    Helper class to store the walls of a sparse board as bitsets (see build_wall_index).
+    Bit i of a bitset is set when position i on the span (see SparseBoard) is a wall.
+
+    - row_walls: the bitset of every row
+    - column_walls: the bitset of every column
+    """
+    row_walls: List[int]
+    column_walls: List[int]
+
+
+class WrapSpans(NamedTuple):
+    """
+    Helper class to store where the cells of the rows and columns of a board start and end (see get_wrap_span).
+    Both are filled in the first time a move wraps around that row or column, so creating one costs nothing.
+
+    - row_spans: for every row wrapped around so far, its first and last non void column
+    - column_spans: for every column wrapped around so far, its first and last non void row
+    """
+    row_spans: Dict[int, Tuple[int, int]]
+    column_spans: Dict[int, Tuple[int, int]]
+
+
+class InputLayout(NamedTuple):
+    """
+    Helper class to store where the board and the path are in the bytes of an input file (see scan_input_bytes):
+    - row_offsets: for every row of the board, the offset of its first byte
+    - row_lengths: for every row of the board, the amount of bytes (without padding)
+    - width: the length of the longest row, the width of the padded board
+    - path_offset: the offset of the path to follow, right after the empty line
+    """
+    row_offsets: numpy.ndarray
+    row_lengths: numpy.ndarray
+    width: int
+    path_offset: int
+
+
 def print_2d_matrix(matrix: Matrix2D) -> None:
     """Prints out a 2D matrix cleanly"""
     for row in range(len(matrix)):
@@ -52,11 +238,207 @@ def print_2d_matrix(matrix: Matrix2D) -> None:
 
 
 
+# TRACING
+# Instead of printing while moving, structured events are sent to the subscribed callbacks.
+# The traversals only switch to the traced code when there is a subscriber, so without one nothing is sent or even created.
+
+
+# Kinds of trace events, see TraceEvent for the detail of each kind
+TRACE_MOVE_START = 'move_start'
+TRACE_MOVE_END = 'move_end'
+TRACE_WALL_HIT = 'wall_hit'
+TRACE_SEAM_CROSSING = 'seam_crossing'
+TRACE_ROTATION = 'rotation'
+
+
+class TraceEvent(NamedTuple):
+    """
+    Helper class for a trace event, with the state of the walker (row, column, direction) when it happened.
+    The detail depends on the kind of event:
+    - move_start: the move amount
+    - move_end: the amount of steps taken
+    - wall_hit: the amount of steps taken before the wall
+    - seam_crossing: the direction value before crossing (the state is the one right after crossing)
+    - rotation: 1 for rotating right, -1 for rotating left (the direction is the new direction)
+    """
+    kind: str
+    row: int
+    column: int
+    direction: Direction
+    detail: int
+
+
+# Callbacks that receive every TraceEvent, add or remove them with subscribe_trace and unsubscribe_trace
+TRACE_SUBSCRIBERS: List[Callable[[TraceEvent], None]] = []
+
+
+def subscribe_trace(callback: Callable[[TraceEvent], None]) -> None:
+    """Adds a callback that receives every trace event"""
+    TRACE_SUBSCRIBERS.append(callback)
+
+
+def unsubscribe_trace(callback: Callable[[TraceEvent], None]) -> None:
+    """Removes a callback added with subscribe_trace"""
+    TRACE_SUBSCRIBERS.remove(callback)
+
+
+def emit_trace_event(kind: str, row: int, column: int, direction: Direction, detail: int = 0) -> None:
+    """Sends a trace event to all subscribers, only call this when there are subscribers"""
+    trace_event = TraceEvent(kind, row, column, direction, detail)
+    for callback in TRACE_SUBSCRIBERS:
+        callback(trace_event)
+
+
+def print_trace_event(trace_event: TraceEvent) -> None:
+    """Trace callback that prints every event on a single line, used by the most verbose mode of main"""
+    print(f"{trace_event.kind}: \t{trace_event.row}, {trace_event.column}, {trace_event.direction.name} \t{trace_event.detail}")
+
+
+
+# TRAJECTORY RECORDING
+# Instead of a log of every step, the trajectory is recorded as one segment per move, in a growable array buffer.
+# This keeps the memory proportional to the amount of moves, no matter how many cells are stepped over.
+
+
+# Why a move (segment) stopped
+TRAJECTORY_STOP_END = 0
+TRAJECTORY_STOP_WALL = 1
+
+# A segment: the state the move started in, the amount of steps taken and why it stopped, every field is an int64
+TRAJECTORY_FIELDS = ('row', 'column', 'direction', 'length', 'stop_reason')
+
+
+@functools.lru_cache(maxsize=None)
+def get_trajectory_dtype() -> numpy.dtype:
+    """Returns the numpy dtype of a segment, with a named field for every one of TRAJECTORY_FIELDS"""
+    import numpy
+    return numpy.dtype([(field, '<i8') for field in TRAJECTORY_FIELDS])
+
+
+class TrajectoryRecorder:
+    """
+    Records the trajectory of a traversal (see traverse_board_map and traverse_cube) as segments, one per move.
+    The segments are stored one after the other in an array of int64 (which grows by itself, like a list),
+    so segments is a zero-copy numpy view with the named fields of get_trajectory_dtype.
+
+    While a view of segments (or the array loaded with mmap_mode) is alive, the buffer can not grow,
+    so export after the traversal is done.
+
+    Example:
+    recorder = TrajectoryRecorder()
+    traverse_cube(board_map, path_to_follow, recorder=recorder)
+    recorder.segments['length'].sum()    # total amount of steps taken
+    recorder.save('trajectory.npy')
+    """
+
+    def __init__(self):
+        self.buffer = array.array('q')
+        self.start_state = None
+        self.hit_wall = False
+
+    def __len__(self) -> int:
+        return len(self.buffer) // len(TRAJECTORY_FIELDS)
+
+    def record(self, row: int, column: int, direction: int, length: int, stop_reason: int) -> None:
+        """Appends a segment, the direction is the direction value"""
+        self.buffer.extend((row, column, direction, length, stop_reason))
+
+    def record_packed(self, width: int, state: int, length: int, hit_wall: bool) -> None:
+        """Move callback for follow_actions_packed, appends a segment for a move from a packed state (see pack_state)"""
+        row, column = divmod(state >> 2, width)
+        self.record(row, column, state & 3, length, TRAJECTORY_STOP_WALL if hit_wall else TRAJECTORY_STOP_END)
+
+    def handle_trace_event(self, trace_event: TraceEvent) -> None:
+        """Trace callback, so moves are also recorded when the traversal is traced (see follow_actions_traced)"""
+        if trace_event.kind == TRACE_MOVE_START:
+            self.start_state = (trace_event.row, trace_event.column, trace_event.direction.value)
+            self.hit_wall = False
+        elif trace_event.kind == TRACE_WALL_HIT:
+            self.hit_wall = True
+        elif trace_event.kind == TRACE_MOVE_END:
+            self.record(*self.start_state, trace_event.detail, TRAJECTORY_STOP_WALL if self.hit_wall else TRAJECTORY_STOP_END)
+
+    @property
+    def segments(self) -> numpy.ndarray:
+        """The recorded segments, as a zero-copy structured numpy view of the buffer (see get_trajectory_dtype)"""
+        import numpy
+        return numpy.frombuffer(self.buffer, dtype=get_trajectory_dtype())
+
+    def save(self, file_name: str) -> None:
+        """Saves the segments as a .npy file, which can be loaded with numpy.load(file_name, mmap_mode='r') to get a view again"""
+        import numpy
+        numpy.save(file_name, self.segments)
+
+
+
 # MONKEY MAP - GENERAL (for both part 1 and 2)
 
 
-def get_starting_coordinates(board_map: Matrix2D) -> Coordinates:
+def is_board_array(board_map: Union[Board, SparseBoard]) -> bool:
+    """Checks if the board is a numpy array, without importing numpy (if numpy was never imported, the board cannot be an array)"""
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(board_map, numpy.ndarray)
+
+
+@functools.lru_cache(maxsize=None)
+def get_board_symbol_codes() -> numpy.ndarray:
+    """Returns the code of every byte value (see BOARD_SYMBOLS), to convert the bytes of a board at once"""
+    import numpy
+    board_symbol_codes = numpy.zeros(256, dtype=numpy.uint8)
+    board_symbol_codes[numpy.frombuffer(BOARD_SYMBOLS.encode('ascii'), dtype=numpy.uint8)] = numpy.arange(len(BOARD_SYMBOLS))
+    return board_symbol_codes
+
+
+def convert_board_map_to_array(board_map: Matrix2D) -> numpy.ndarray:
+    """
+    Converts a padded board map into a contiguous 2D uint8 numpy array, using the codes of BOARD_SYMBOLS.
+    All rows are converted at once, by looking up every byte of the joined rows in a 256 entry table.
+
+    Returns the board as a numpy array of shape (rows, columns).
+    """
+    import numpy
+    max_row_size = max(len(board_row) for board_row in board_map)
+    board_bytes = ''.join(''.join(board_row).ljust(max_row_size) for board_row in board_map).encode('ascii')
+    return get_board_symbol_codes()[numpy.frombuffer(board_bytes, dtype=numpy.uint8)].reshape(len(board_map), max_row_size)
+
+
+def calculate_board_masks(board_map: Board) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Calculates the void mask and the wall mask of the board, as 2D boolean numpy arrays.
+    A Matrix2D is converted to a numpy array first, so both masks are a single vectorized comparison.
+
+    Returns a tuple of the void_mask and the wall_mask.
+    """
+    if not is_board_array(board_map):
+        board_map = convert_board_map_to_array(board_map)
+    return board_map == BOARD_VOID, board_map == BOARD_WALL
+
+
+def get_board_symbols(board_map: Board) -> Tuple:
+    """
+    Returns the symbols to compare the cells of the board with, as (void, open, wall).
+    This way the same code works for a Matrix2D (' ', '.', '#') and a numpy array (BOARD_VOID, BOARD_OPEN, BOARD_WALL).
+    """
+    if is_board_array(board_map):
+        return BOARD_VOID, BOARD_OPEN, BOARD_WALL
+    return tuple(BOARD_SYMBOLS)
+
+
+def calculate_step_budget(board_map: Board) -> int:
+    """Returns the amount of steps a traversal takes cell by cell, before it switches to the jump arrays (see DIRECT_STEP_BUDGET)"""
+    step_budget = DIRECT_STEP_BUDGET * len(board_map) * len(board_map[0])
+    return step_budget if 'numpy' in sys.modules else step_budget + NUMPY_IMPORT_STEPS
+
+
+def get_starting_coordinates(board_map: Union[Board, SparseBoard]) -> Coordinates:
     """Finds the starting coordinates on the board and returns them in Tuple form (row, column)"""
+    if isinstance(board_map, SparseBoard):
+        import numpy
+        is_wall = get_sparse_wall_bits(board_map, numpy.arange(board_map.row_lengths[0]))
+        return (0, int(board_map.row_offsets[0] + numpy.flatnonzero(is_wall == 0)[0]))
+    if is_board_array(board_map):
+        return (0, int((board_map[0] == BOARD_OPEN).argmax()))
+
     for x in range(len(board_map[0])):
         if board_map[0][x] == '.':
             return (0, x)
@@ -78,40 +460,18 @@ def rotate(action: str, direction: Direction) -> Direction:
     If current direction is 0 and you rotate left, it would become -1. With a mod 4 (all directions)
     we can make sure direction stays within bounds, as this would result in 3.
     """
-    if action == 'R':
-        return Direction( (direction.value + 1) % 4 )
-    elif action == 'L':
-        return Direction( (direction.value - 1) % 4 )
+    if action == 'R' or action == 'L':
+        return ROTATED_DIRECTIONS[action][direction.value]
     raise RuntimeError(f"Unknown action {action}, something went wrong.")
 
 
-def process_input_file(input_file: str) -> Tuple[Matrix2D, str]:
+def pad_board_map(board_map: Matrix2D) -> Matrix2D:
     """
-    Processes the input file line by line.
-    Each line will be inserted in a board_map array. Since a string is also an array of strings (Python),
-    we can see board_map as a 2D matrix. Added extra code to make sure the grid for the board_map is consistent
-    for all columns.
+    Added extra code to make sure the grid for the board_map is consistent for all columns.
 
-    The final line, split from the board with an empty line, are the actions to follow in a string.
-
-    Returns a tuple of the board_map and the actions_to_follow.
+    Returns the board_map, with every row padded to the size of the longest row.
     """
-    board_map = []
-
-    max_line_size = None
-    with open(input_file, 'r') as f:
-        line = f.readline().strip('\n')
-        max_line_size = len(line)
-        while line:
-            board_map.append(line)
-            line = f.readline().strip('\n')
-            if len(line) > max_line_size:
-                max_line_size = len(line)
-
-        actions_to_follow = f.readline().strip()
-
-    if max_line_size is None:
-        raise RuntimeError("You provided an empty file...")
+    max_line_size = max((len(line) for line in board_map), default=0)
 
     # I realized when running input.txt, I would be getting an index error because not all rows are equal in size.
     # The trailing ' ' characters are omitted and not added to the line it read in.
@@ -119,23 +479,342 @@ def process_input_file(input_file: str) -> Tuple[Matrix2D, str]:
     # we could run into a board_map[new_row][column] where that column value caused an index error.
     # Adding trailing ' ' characters fixes this issue.
     # This was not picked up by my tests, as there I never had any missing trailing ' ' characters.
+    # Every row is padded at once with ljust, adding the ' ' characters one at a time was quadratic in the line size.
     for row in range(len(board_map)):
-        line = board_map[row]
-        while len(line) < max_line_size:
-            line += ' '
-        board_map[row] = line
-        
-
-    print_2d_matrix(board_map)
-    print(actions_to_follow)
+        board_map[row] = board_map[row].ljust(max_line_size)
+
+    return board_map
+
+
+def get_compressed_file_opener(input_file: str) -> Optional[Callable]:
+    """Returns the open function of the module that decompresses the input file (see COMPRESSED_FILE_OPENERS), or None for a plain file"""
+    module_name = COMPRESSED_FILE_OPENERS.get(os.path.splitext(input_file)[1])
+    return importlib.import_module(module_name).open if module_name else None
+
+
+def open_input_file(input_file: str) -> TextIO:
+    """
+    Opens an input file for reading as text. A .gz or .xz file is decompressed while reading (see COMPRESSED_FILE_OPENERS),
+    so an archived input never needs to be decompressed to disk first.
+
+    Returns the open file.
+    """
+    opener = get_compressed_file_opener(input_file)
+    return opener(input_file, 'rt') if opener else open(input_file, 'r')
+
+
+def read_input_bytes(input_file: str, with_path: bool = True, chunk_size: int = INPUT_CHUNK_SIZE) -> Tuple[memoryview, memoryview]:
+    """
+    Reads the bytes of an input file, split at the empty line into the board (with the newline of its last row) and the path.
+    A plain file is mapped into memory (see mmap), so nothing is read before it is used and nothing is copied.
+    A .gz or .xz file cannot be mapped, it is decompressed chunk by chunk in a single pass (see COMPRESSED_FILE_OPENERS),
+    and if with_path is not set the decompression stops right after the empty line, the path is then left empty.
+
+    Returns a tuple of the board bytes and the path bytes.
+    """
+    opener = get_compressed_file_opener(input_file)
+    if not opener:
+        import mmap
+        with open(input_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return (memoryview(b''), memoryview(b''))
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        empty_line = find_empty_line(data)
+    else:
+        data = bytearray()
+        empty_line = -1
+        with opener(input_file, 'rb') as f:
+            chunk = f.read(chunk_size)
+            while chunk and (empty_line == -1 or with_path):
+                # The empty line can be split over two chunks, so the search starts at the last byte of the previous chunk
+                search_start = len(data)
+                data += chunk
+                if empty_line == -1:
+                    empty_line = find_empty_line(data, search_start)
+                chunk = f.read(chunk_size)
+        if not with_path and empty_line != -1:
+            del data[empty_line + 1:]
+
+    if empty_line == -1:
+        return (memoryview(data), memoryview(b''))
+    return (memoryview(data)[:empty_line], memoryview(data)[empty_line + 1:])
+
+
+def find_empty_line(data: Union[bytearray, mmap.mmap], start: int = 0) -> int:
+    """Returns the offset of the newline of the first empty line in data (searching from start), or -1 if there is none"""
+    if data[:1] == b'\n':
+        return 0
+    newlines = data.find(b'\n\n', max(start - 1, 0))
+    return newlines + 1 if newlines != -1 else -1
+
+
+def decode_board_rows(board_bytes: memoryview) -> Matrix2D:
+    """Returns the rows of the board bytes of an input file (see read_input_bytes), without padding (see pad_board_map)"""
+    board_rows = str(board_bytes, 'ascii').rstrip('\n')
+    if not board_rows:
+        raise RuntimeError("You provided an empty file...")
+    return board_rows.split('\n')
+
+
+def load_board_rows(input_file: str) -> Matrix2D:
+    """
+    Loads the board from the bytes of an input file (see read_input_bytes), without reading the path.
+
+    Returns the board_map, without padding (see pad_board_map).
+    """
+    return decode_board_rows(read_input_bytes(input_file, with_path=False)[0])
+
+
+def scan_input_bytes(data: numpy.ndarray) -> InputLayout:
+    """
+    Finds the rows of the board and the start of the path in the bytes of an input file, in a single pass over the newlines.
+    The board ends at the first empty line (or at the end of the file).
+
+    Returns the layout, see InputLayout.
+    """
+    import numpy
+    newlines = numpy.flatnonzero(data == NEWLINE_BYTE)
+    line_offsets = numpy.concatenate(([0], newlines + 1))
+    line_lengths = numpy.append(newlines, len(data)) - line_offsets
+
+    empty_lines = numpy.flatnonzero(line_lengths == 0)
+    amount_of_rows = int(empty_lines[0]) if len(empty_lines) else len(line_offsets)
+    path_offset = int(line_offsets[amount_of_rows]) + 1 if amount_of_rows < len(line_offsets) else len(data)
+
+    row_lengths = line_lengths[:amount_of_rows]
+    return InputLayout(line_offsets[:amount_of_rows], row_lengths, int(row_lengths.max(initial=0)), path_offset)
+
+
+def build_board_array(data: numpy.ndarray, input_layout: InputLayout) -> numpy.ndarray:
+    """
+    Builds the padded board as a numpy array (see convert_board_map_to_array) straight from the bytes of an input file.
+    All cells are converted and put in place at once: the board bytes without their newlines are, in order,
+    exactly the cells of the board that are not padding.
+
+    Returns the board as a numpy array of shape (rows, width).
+    """
+    import numpy
+    row_offsets, row_lengths, width, _ = input_layout
+    board_end = int(row_offsets[-1] + row_lengths[-1]) if len(row_offsets) else 0
+    board_bytes = data[:board_end]
+
+    board_array = numpy.zeros((len(row_offsets), width), dtype=numpy.uint8)
+    board_array[numpy.arange(width) < row_lengths[:, None]] = get_board_symbol_codes()[board_bytes[board_bytes != NEWLINE_BYTE]]
+    return board_array
+
+
+def get_board_row_views(data: numpy.ndarray, input_layout: InputLayout) -> List[numpy.ndarray]:
+    """Returns every row of the board as a view on the bytes of the input file, without padding and without copying"""
+    return [data[offset:offset + length] for offset, length in zip(input_layout.row_offsets.tolist(), input_layout.row_lengths.tolist())]
+
+
+def load_board(input_file: str, as_array: bool = False, as_rows: bool = False) -> Union[Board, List[numpy.ndarray]]:
+    """
+    Loads the board from the bytes of an input file (see read_input_bytes), without reading the path.
+    By default the board is a padded Matrix2D (see load_board_rows and pad_board_map).
+    If as_array is set, the rows are found in a single pass (see scan_input_bytes) and the padded board array is built at once (see build_board_array).
+    If as_rows is set, the board is not padded or copied, every row is a view on the bytes instead (see get_board_row_views).
+
+    Returns the board.
+
+    Example:
+    board_array = load_board('input.txt.xz', as_array=True)
+    """
+    if not (as_array or as_rows):
+        return pad_board_map(load_board_rows(input_file))
+
+    board_bytes, _ = read_input_bytes(input_file, with_path=False)
+    return convert_board_bytes(board_bytes, as_rows)
+
+
+def convert_board_bytes(board_bytes: memoryview, as_rows: bool = False) -> Union[numpy.ndarray, List[numpy.ndarray]]:
+    """Returns the board bytes of an input file as a padded board array, or as views on every row if as_rows is set (see load_board)"""
+    import numpy
+    data = numpy.frombuffer(board_bytes, dtype=numpy.uint8)
+    input_layout = scan_input_bytes(data)
+    if not len(input_layout.row_offsets):
+        raise RuntimeError("You provided an empty file...")
+
+    if as_rows:
+        return get_board_row_views(data, input_layout)
+    return build_board_array(data, input_layout)
+
+
+def load_input_file(input_file: str, as_array: bool = False, as_rows: bool = False) -> Tuple[Union[Board, List[numpy.ndarray]], str]:
+    """
+    Loads an input file from its bytes (see read_input_bytes), instead of reading it line by line.
+    The board is loaded just like load_board does, as a padded Matrix2D, a board array (as_array) or row views (as_rows).
+    For very long paths, use load_board and read_path_chunks instead, which do not load the whole path in memory.
+
+    Returns a tuple of the board and the actions_to_follow.
+
+    Example:
+    board_array, actions_to_follow = load_input_file('input.txt.xz', as_array=True)
+    """
+    board_bytes, path_bytes = read_input_bytes(input_file)
+    actions_to_follow = str(path_bytes, 'ascii').strip()
+    if as_array or as_rows:
+        return (convert_board_bytes(board_bytes, as_rows), actions_to_follow)
+    return (pad_board_map(decode_board_rows(board_bytes)), actions_to_follow)
+
+
+def process_input_file(input_file: str, as_array: bool = False, verbose: bool = False, as_sparse: bool = False) -> Tuple[Board, str]:
+    """
+    Processes the input file, the board and the actions to follow are loaded by load_input_file.
+
+    The final line, split from the board with an empty line, are the actions to follow in a string.
+    For very long paths, use read_path_chunks instead, which does not load the whole path in memory.
+
+    If as_array is set, the board_map is loaded as a numpy array straight from the bytes of the file (see load_board).
+    If as_sparse is set, the board is never padded, and is stored without its void cells (see build_sparse_board).
+    If verbose is set, the board_map and the actions_to_follow are printed out.
+
+    Returns a tuple of the board_map and the actions_to_follow.
+    """
+    if as_sparse:
+        board_bytes, path_bytes = read_input_bytes(input_file)
+        return (build_sparse_board(decode_board_rows(board_bytes)), str(path_bytes, 'ascii').strip())
+
+    board_map, actions_to_follow = load_input_file(input_file, as_array=as_array and not verbose)
+
+    if verbose:
+        print_2d_matrix(board_map)
+        print(actions_to_follow)
+
+    if verbose and as_array:
+        return (convert_board_map_to_array(board_map), actions_to_follow)
     return (board_map, actions_to_follow)
 
 
+def read_path_chunks(input_file: str, chunk_size: int = PATH_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Streams the path to follow from the input file, in chunks of chunk_size characters.
+    The board is skipped without storing it, everything after the empty line is the path.
+    A .gz or .xz file is decompressed while streaming (see open_input_file).
+
+    Returns a generator of chunks, to be used with iterate_path_tokens (or directly as path_to_follow).
+    """
+    with open_input_file(input_file) as f:
+        while f.readline().strip('\n'):
+            pass
+
+        chunk = f.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = f.read(chunk_size)
+
+
+def iterate_path_tokens(path_to_follow: Union[str, Iterable[str]]) -> Iterator[str]:
+    """
+    Splits the path to follow into its actions (a move amount or a rotation), one at a time.
+    The path can be a string, or an iterable of chunks of the path (see read_path_chunks).
+
+    A move amount can be split over two chunks, so digits at the very end of a chunk are held back
+    and put in front of the next chunk.
+
+    Returns a generator of actions.
+
+    Example:
+    The chunks '10R5', '5L2' give the actions '10', 'R', '55', 'L', '2'.
+    """
+    if isinstance(path_to_follow, str):
+        path_to_follow = [path_to_follow]
+
+    pending_digits = ''
+    for chunk in path_to_follow:
+        chunk = pending_digits + chunk
+        pending_digits = ''
+
+        for match in PATH_TOKEN_PATTERN.finditer(chunk):
+            action = match.group()
+            if match.end() == len(chunk) and action.isdigit():
+                pending_digits = action
+            else:
+                yield action
+
+    if pending_digits:
+        yield pending_digits
+
+
 
 # MONKEY MAP - PART ONE
 
 
-def move_part1(board_map: Matrix2D, move_amount: int, direction: Direction, row: int, column: int) -> Coordinates:
+def move_part1_array(board_array: numpy.ndarray, move_amount: int, direction: Direction, row: int, column: int) -> Coordinates:
+    """
+    Movement function for part 1, for a board stored as a numpy array.
+
+    Instead of stepping, the whole row (or column) is handled at once:
+    - the non void cells are put in walking order, starting right after the current cell and ending on it
+    - the first wall in that order limits the move, without a wall the move wraps around modulo the amount of cells
+
+    Returns the new coordinates of the point after the move (row, column).
+    """
+    import numpy
+    moving_along_row = direction in (Direction.E, Direction.W)
+    line = board_array[row] if moving_along_row else board_array[:, column]
+    position = column if moving_along_row else row
+
+    cells = numpy.flatnonzero(line != BOARD_VOID)
+    index = int(numpy.searchsorted(cells, position))
+    if direction in (Direction.E, Direction.S):
+        walking_order = numpy.concatenate((cells[index + 1:], cells[:index + 1]))
+    else:
+        walking_order = numpy.concatenate((cells[:index][::-1], cells[index:][::-1]))
+
+    walls = numpy.flatnonzero(line[walking_order] == BOARD_WALL)
+    if len(walls) == 0:
+        steps = move_amount % len(walking_order)
+    else:
+        steps = min(move_amount, int(walls[0]))
+
+    if steps > 0:
+        position = int(walking_order[steps - 1])
+    return (row, position) if moving_along_row else (position, column)
+
+
+def get_wrap_span(board_map: Matrix2D, wrap_spans: WrapSpans, direction: Direction, row: int, column: int) -> Tuple[int, int]:
+    """
+    Returns the first and last non void cell of the row (moving E or W) or the column (moving S or N) of the cell (row, column).
+    The span is only worked out the first time, after that it is looked up in wrap_spans.
+    """
+    moving_along_row = direction in (Direction.E, Direction.W)
+    spans, index = (wrap_spans.row_spans, row) if moving_along_row else (wrap_spans.column_spans, column)
+    span = spans.get(index)
+    if span is None:
+        line = ''.join(board_map[row]) if moving_along_row else ''.join(board_row[column] for board_row in board_map)
+        span = spans[index] = (len(line) - len(line.lstrip(' ')), len(line.rstrip(' ')) - 1)
+    return span
+
+
+def wrap_part1(board_map: Matrix2D, wrap_spans: WrapSpans, direction: Direction, row: int, column: int) -> Coordinates:
+    """
+    Finds the cell a step from (row, column) lands on, when the next cell in direction is void.
+    Stepping off the first or last cell of a row or column lands on the other end of it (see get_wrap_span), so wrapping is O(1)
+    instead of scanning the void. Only a void gap in the middle of a row or column (never the case for a cube net) is still scanned.
+
+    Returns the coordinates of the first non void cell in direction (row, column).
+    """
+    first, last = get_wrap_span(board_map, wrap_spans, direction, row, column)
+    if direction == Direction.E and column == last:
+        return (row, first)
+    if direction == Direction.W and column == first:
+        return (row, last)
+    if direction == Direction.S and row == last:
+        return (first, column)
+    if direction == Direction.N and row == first:
+        return (last, column)
+
+    delta_row, delta_column = DIRECTION_VECTORS[direction.value]
+    row = (row + delta_row) % len(board_map)
+    column = (column + delta_column) % len(board_map[row])
+    while board_map[row][column] == ' ':
+        row = (row + delta_row) % len(board_map)
+        column = (column + delta_column) % len(board_map[row])
+    return (row, column)
+
+
+def move_part1(board_map: Union[Board, SparseBoard], move_amount: int, direction: Direction, row: int, column: int, wrap_spans: WrapSpans = None) -> Coordinates:
     """
     Movement function for part 1.
 
@@ -143,61 +822,247 @@ def move_part1(board_map: Matrix2D, move_amount: int, direction: Direction, row:
     The starting location is (row, column).
 
     If a '#' symbol is encountered, it will stop at the point right before this obstacle.
-    If a ' ' symbol is encountered, it will wrap around the board and continue from there.
+    If a ' ' symbol is encountered, it will wrap around the board and continue from there (see wrap_part1).
     If a '.' symbol is encountered, it will continue as normal from this point.
 
+    Pass the same wrap_spans to every move on the board, so every row and column it wraps around is only looked up once.
+    A board stored as a numpy array is handled by move_part1_array, a sparse board by move_part1_sparse.
+
     Returns the new coordinates of the point after the move (row, column).
     """
+    if is_board_array(board_map):
+        return move_part1_array(board_map, move_amount, direction, row, column)
+    if isinstance(board_map, SparseBoard):
+        return move_part1_sparse(board_map, move_amount, direction, row, column)
+
+    if wrap_spans is None:
+        wrap_spans = WrapSpans({}, {})
     delta_row, delta_column = DIRECTION_VECTORS[direction.value]
 
     for _ in range(move_amount):
-        next_element = board_map[(row + delta_row) % len(board_map)][ (column + delta_column) % len(board_map[row]) ]
+        next_row = (row + delta_row) % len(board_map)
+        next_column = (column + delta_column) % len(board_map[row])
+        next_element = board_map[next_row][next_column]
+
+        # We encountered an empty space, the move wraps around to the other side of the board (see wrap_part1)
+        if next_element == ' ':
+            next_row, next_column = wrap_part1(board_map, wrap_spans, direction, row, column)
+            next_element = board_map[next_row][next_column]
 
         if next_element == '#':
             break
+        row, column = next_row, next_column
 
-        if next_element == '.':
-            row = (row + delta_row) % len(board_map)
-            column = (column + delta_column) % len(board_map[row])
-            continue
+    return row, column
 
-        # We encountered an empty space, will have to continue moving until we find either '#' or '.'
-        new_row = row
-        new_column = column
-        while next_element == ' ':
-            new_row = (new_row + delta_row) % len(board_map)
-            new_column = (new_column + delta_column) % len(board_map[row])
-            next_element = board_map[new_row][new_column]
 
-        if next_element == '#':
-            break
-        else:
-            row = new_row
-            column = new_column
+def traverse_board_map(board_map: Board, path_to_follow: Union[str, Iterable[str]], jump_arrays: JumpArrays = None, recorder: TrajectoryRecorder = None) -> int:
+    """
+    Main function for part 1, wrapping around the board.
 
-    return row, column
+    Traverses through the map by either rotating or moving (see traverse, which picks between stepping and the jump arrays).
+    The actions are read one at a time (see iterate_path_tokens), so the path can also be streamed in chunks.
+    With a recorder, every move is recorded as well (see TrajectoryRecorder).
+
+    Returns the custom scoring value for AoC2022 day 22.
+    """
+    return traverse(board_map, path_to_follow, 1, jump_arrays, recorder)
 
 
-def traverse_board_map(board_map: Matrix2D, path_to_follow: str) -> int:
+
+# MONKEY MAP - SPARSE BOARD
+# For huge boards, most of the padded rectangle of a cube net is void. A sparse board only stores the real cells (see SparseBoard).
+
+
+def build_sparse_board(board_rows: Matrix2D) -> SparseBoard:
     """
-    Main function for part 1.
+    Builds a sparse board from the rows of the board (padded or not, see load_board_rows).
+    The leading ' ' characters of a row give its offset, the '#' characters are packed into the wall bitmap.
+    The spans of the columns are worked out from the spans of the rows, one numpy slice per row.
 
-    Arranges initial values (starting_point, direction and actions)
-    Then traverses through the map by either:
-    - rotating
-    - moving
+    Returns the sparse board, raises an error if a row or column is not a single span of cells.
+    """
+    import numpy
+    row_offsets, row_lengths, wall_rows = [], [], []
+    for board_row in board_rows:
+        cells = board_row.strip(' ')
+        if ' ' in cells:
+            raise RuntimeError(f"Row {len(row_offsets)} is not a single span of cells, this is not a cube net.")
+        row_offsets.append(len(board_row) - len(board_row.lstrip(' ')))
+        row_lengths.append(len(cells))
+        wall_rows.append(numpy.frombuffer(cells.encode('ascii'), dtype=numpy.uint8) == ord('#'))
+
+    width = max(offset + length for offset, length in zip(row_offsets, row_lengths))
+    column_first_rows = numpy.full(width, len(board_rows), dtype=numpy.int64)
+    column_last_rows = numpy.full(width, -1, dtype=numpy.int64)
+    column_counts = numpy.zeros(width, dtype=numpy.int64)
+    for row, (offset, length) in enumerate(zip(row_offsets, row_lengths)):
+        column_first_rows[offset:offset + length] = numpy.minimum(column_first_rows[offset:offset + length], row)
+        column_last_rows[offset:offset + length] = row
+        column_counts[offset:offset + length] += 1
+
+    column_lengths = column_last_rows - column_first_rows + 1
+    if numpy.any((column_counts != column_lengths) & (column_counts > 0)):
+        raise RuntimeError("A column is not a single span of cells, this is not a cube net.")
+
+    row_lengths = numpy.array(row_lengths, dtype=numpy.int64)
+    return SparseBoard(
+        numpy.array(row_offsets, dtype=numpy.int64),
+        row_lengths,
+        numpy.where(column_counts > 0, column_first_rows, 0),
+        column_counts,
+        numpy.concatenate(([0], numpy.cumsum(row_lengths)[:-1])),
+        numpy.packbits(numpy.concatenate(wall_rows)) if wall_rows else numpy.zeros(0, dtype=numpy.uint8),
+    )
+
+
+def get_sparse_wall_bits(sparse_board: SparseBoard, cells: numpy.ndarray) -> numpy.ndarray:
+    """Returns the wall bit (1 for a wall) of every cell number in cells, looked up in the wall bitmap"""
+    return (sparse_board.walls[cells >> 3] >> (7 - (cells & 7))) & 1
+
+
+def move_part1_sparse(sparse_board: SparseBoard, move_amount: int, direction: Direction, row: int, column: int) -> Coordinates:
+    """
+    Movement function for part 1, for a sparse board.
+
+    The row (or column) is a span of cells, so wrapping around is the position on that span modulo its length.
+    The void cells are never looked at, only the wall bits of the span:
+    - the distance to every wall in the walking direction is (wall - position) modulo the length (flipped when walking backwards)
+    - the closest wall limits the move, without a wall the move wraps around modulo the length
+
+    Returns the new coordinates of the point after the move (row, column).
+
+    Example:
+    Row '  ..#.  ' is the span with offset 2 and length 4, its wall is on position 2.
+    Moving E 3 steps from column 5 (position 3) wraps to position 0 and 1, the wall is 3 steps away,
+    so the move stops on position 1, which is column 3.
+    """
+    import numpy
+    moving_along_row = direction in (Direction.E, Direction.W)
+    step = 1 if direction in (Direction.E, Direction.S) else -1
+
+    if moving_along_row:
+        offset, length = int(sparse_board.row_offsets[row]), int(sparse_board.row_lengths[row])
+        cells = sparse_board.row_cell_offsets[row] + numpy.arange(length)
+        position = column - offset
+    else:
+        offset, length = int(sparse_board.column_offsets[column]), int(sparse_board.column_lengths[column])
+        rows = numpy.arange(offset, offset + length)
+        cells = sparse_board.row_cell_offsets[rows] + column - sparse_board.row_offsets[rows]
+        position = row - offset
+
+    walls = numpy.flatnonzero(get_sparse_wall_bits(sparse_board, cells))
+    if len(walls) > 0:
+        move_amount = min(move_amount, int(numpy.min(((walls - position) * step) % length)) - 1)
+
+    position = offset + (position + step * move_amount) % length
+    return (row, position) if moving_along_row else (position, column)
+
+
+def convert_bits_to_int(bits: numpy.ndarray) -> int:
+    """Converts an array of bits (bit i is bits[i]) into a Python int, which works as a bitset of any size"""
+    import numpy
+    return int.from_bytes(numpy.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+def build_wall_index(sparse_board: SparseBoard) -> WallIndex:
+    """
+    Builds a bitset per row and per column of a sparse board, with a bit set for every wall on its span.
+    The rows are slices of the unpacked wall bitmap, the walls are sorted by column (and row) to fill in the columns.
+
+    Returns the wall index, see WallIndex.
+    """
+    import numpy
+    row_cell_offsets = sparse_board.row_cell_offsets
+    amount_of_cells = int(row_cell_offsets[-1] + sparse_board.row_lengths[-1])
+    is_wall = numpy.unpackbits(sparse_board.walls, count=amount_of_cells)
+
+    row_walls = [convert_bits_to_int(is_wall[start:start + length]) for start, length in zip(row_cell_offsets.tolist(), sparse_board.row_lengths.tolist())]
+
+    wall_cells = numpy.flatnonzero(is_wall)
+    wall_rows = numpy.searchsorted(row_cell_offsets, wall_cells, side='right') - 1
+    wall_columns = sparse_board.row_offsets[wall_rows] + wall_cells - row_cell_offsets[wall_rows]
+    order = numpy.lexsort((wall_rows, wall_columns))
+    wall_rows, wall_columns = wall_rows[order], wall_columns[order]
+    bounds = numpy.searchsorted(wall_columns, numpy.arange(len(sparse_board.column_lengths) + 1))
+
+    column_walls = []
+    for column, (start, end) in enumerate(zip(bounds[:-1].tolist(), bounds[1:].tolist())):
+        bits = numpy.zeros(int(sparse_board.column_lengths[column]), dtype=numpy.uint8)
+        bits[wall_rows[start:end] - sparse_board.column_offsets[column]] = 1
+        column_walls.append(convert_bits_to_int(bits))
+
+    return WallIndex(row_walls, column_walls)
+
+
+def find_steps_to_wall(walls: int, length: int, position: int, forward: bool) -> int:
+    """
+    Finds how many steps can be taken from position on a span, before hitting a wall (see WallIndex).
+    Going forward, the walls after position are walls >> (position + 1), the lowest set bit of that is the closest.
+    Going backward, the walls before position are the bits below it, the highest set bit of that is the closest.
+    Without a wall in front of position, the search wraps around to the other end of the span.
+
+    Returns the amount of steps, or -1 if there is no wall on the span at all.
+
+    Example:
+    Walls 0b00100 on a span of length 5, going forward from position 3.
+    There is no wall after position 3, so it wraps: the lowest wall is on position 2, which gives (5 - 1 - 3) + 2 = 3 steps.
+    """
+    if not walls:
+        return -1
+
+    if forward:
+        walls_ahead = walls >> (position + 1)
+        if walls_ahead:
+            return (walls_ahead & -walls_ahead).bit_length() - 1
+        return (length - 1 - position) + (walls & -walls).bit_length() - 1
+
+    walls_behind = walls & ((1 << position) - 1)
+    if walls_behind:
+        return position - walls_behind.bit_length()
+    return position + (length - walls.bit_length())
+
+
+def move_part1_bitset(sparse_board: SparseBoard, wall_index: WallIndex, move_amount: int, direction: Direction, row: int, column: int) -> Coordinates:
+    """
+    Movement function for part 1, for a sparse board with its wall index (see build_wall_index).
+    The closest wall is found with a few bit operations (see find_steps_to_wall), wrapping around is modulo the span length.
+    This way a move takes the same time for any move amount, without any per cell tables.
+
+    Returns the new coordinates of the point after the move (row, column).
+    """
+    if direction == Direction.E or direction == Direction.W:
+        offset, length, walls, position = sparse_board.row_offsets[row], sparse_board.row_lengths[row], wall_index.row_walls[row], column
+    else:
+        offset, length, walls, position = sparse_board.column_offsets[column], sparse_board.column_lengths[column], wall_index.column_walls[column], row
+    offset, length = int(offset), int(length)
+    position -= offset
+
+    forward = direction == Direction.E or direction == Direction.S
+    steps_to_wall = find_steps_to_wall(walls, length, position, forward)
+    if steps_to_wall != -1 and steps_to_wall < move_amount:
+        move_amount = steps_to_wall
+
+    position = offset + (position + move_amount if forward else position - move_amount) % length
+    return (row, position) if direction == Direction.E or direction == Direction.W else (position, column)
+
+
+def traverse_sparse_board(sparse_board: SparseBoard, path_to_follow: Union[str, Iterable[str]]) -> int:
+    """
+    Main function for part 1, for a sparse board.
+    No per cell tables are precomputed, only the wall index (see build_wall_index), so every move is a few bit operations.
 
     Returns the custom scoring value for AoC2022 day 22.
     """
-    row, column = get_starting_coordinates(board_map)
+    wall_index = build_wall_index(sparse_board)
+    row, column = get_starting_coordinates(sparse_board)
     direction = Direction.E
-    action_list = re.findall(r'\d+|\w', path_to_follow)
 
-    for action in action_list:
+    for action in iterate_path_tokens(path_to_follow):
         if check_action_is_rotate(action):
             direction = rotate(action, direction)
         else:
-            row, column = move_part1(board_map, int(action), direction, row, column)
+            row, column = move_part1_bitset(sparse_board, wall_index, int(action), direction, row, column)
 
     return 1000 * (row + 1) + 4 * (column + 1) + direction.value
 
@@ -207,7 +1072,9 @@ def traverse_board_map(board_map: Matrix2D, path_to_follow: str) -> int:
 
 
 # Had to draw this out, please check 'cube_drawing_with_vertex_map.pdf'
-# This is hardcoded for my solution only, automatically generating this would be incredibly complex
+# This is hardcoded for my solution only, traverse_cube now generates the vertex map with fold_cube_schedule
+# It is kept as the reference the automatic folding is tested against
+# The vertices are in face units (just like fold_cube_schedule), use scale_vertex_map to multiply them by GRID_SIZE
 # This is a mapping for:
 # - on the left side the source edge with its vertices, and the movement vector along this edge
 # - on the right the destination edge with vertices, and the movement vector along this edge
@@ -221,17 +1088,10 @@ VERTEX_MAP = [
     [[(3, 1), (3, 2), Direction.S, (0,  1)], [(3, 1), (4, 1), Direction.E, (1,  0)]]  # edge G
 ]
 
-# TODO: do not alter a global constant, instead make this into a function
-# Leaving quick and dirty for now
-for edge in range(len(VERTEX_MAP)):
-    for edge_side in range(2):
-        for vertex in range(2):
-            VERTEX_MAP[edge][edge_side][vertex] = numpy.multiply(VERTEX_MAP[edge][edge_side][vertex], GRID_SIZE)
-
 
 def reverse_direction(direction: Direction) -> Direction:
     """Reverses the direction, by turning 180 degrees."""
-    return Direction( (direction.value + 2) % 4 )
+    return REVERSED_DIRECTIONS[direction.value]
 
 
 def calculate_point_on_other_edge_side(edge_side: EdgeSide, point_index: int) -> Coordinates:
@@ -250,119 +1110,171 @@ def calculate_point_on_other_edge_side(edge_side: EdgeSide, point_index: int) ->
     vertex_start, vertex_end, edge_direction, edge_movement_vector = edge_side
     delta_along_row, delta_along_column = edge_movement_vector[0], edge_movement_vector[1]
 
-    new_point = numpy.add(vertex_start, numpy.multiply((delta_along_row, delta_along_column), point_index))
-    return new_point[0], new_point[1]
+    return vertex_start[0] + delta_along_row * point_index, vertex_start[1] + delta_along_column * point_index
 
 
-def calculate_index_on_edge_for_point(original_point_coordinates: Coordinates, edge_side: EdgeSide, direction: Direction) -> int:
+def calculate_cell_on_edge_side(edge_side: EdgeSide, point_index: int) -> Coordinates:
     """
-    Function that calculates the index position of our current point on the edge,
-    in case we are about to walk off it.
+    The vertices in VERTEX_MAP are the corners of the cells, not the cells themselves.
+    A corner (row, column) is the top left corner of cell (row, column).
 
-    Returns the index, if a wrap would happen, otherwise returns -1.
+    This function returns the cell right next to the edge, on the inside of the face, for the given index.
+    The cell lies one row (or column) before the corner when the edge runs backwards along it,
+    or when the face lies above (or left of) the edge, which is the case when walking off it S (or E).
 
     Example:
-    Let's say the edge runs from (0, 50) to (0, 100).
-    The current direction is North and the edge direction is also North.
-    If the point would be (0, 61), this point would lie on this edge with and index of 11 (50 + 11 = 61).
-
-    # TODO: This function feels a bit multi-functional by only calculating index if direction matches
-    # We should probably split this up into a more modular function
+    The edge runs from (0, 100) to (0, 150) with direction N and movement vector (0, 1).
+    Index 11 has the corner point (0, 111), which is also the top left corner of cell (0, 111).
+    The edge running back from (50, 150) to (50, 100) with direction S and movement vector (0, -1)
+    has the corner point (50, 139) for index 11, which gives us cell (49, 138).
     """
+    point_row, point_column = calculate_point_on_other_edge_side(edge_side, point_index)
     vertex_start, vertex_end, edge_direction, edge_movement_vector = edge_side
 
-    # Potential to walk off the map!
-    if edge_direction == direction:
-
-        delta_along_row, delta_along_column = edge_movement_vector[0], edge_movement_vector[1]
-        vertex_start_row, vertex_start_column = vertex_start[0], vertex_start[1]
+    if edge_movement_vector[0] == -1 or edge_direction == Direction.S:
+        point_row -= 1
+    if edge_movement_vector[1] == -1 or edge_direction == Direction.E:
+        point_column -= 1
 
-        for i in range(GRID_SIZE):
-            if (vertex_start_row + ( i * delta_along_row ), vertex_start_column + ( i * delta_along_column)) == original_point_coordinates:
-                return i
+    return point_row, point_column
 
-    return -1
 
-
-def calculate_index_for_wrap(row: int, column: int, direction: Direction) -> Tuple[int, EdgeSide]:
+def compile_portal_map(vertex_map: List[List[EdgeSide]]) -> PortalMap:
     """
-    This functions determines if a wrap around an edge is needed.
-    All edges with both their sides are checked, as it is possible that the point resides on any of them.
+    Compiles all edges of the vertex map once into a dictionary of portals.
+    Every cell on an edge side, walking off the edge in the direction of that edge side, is a key.
+    The value is the cell on the other edge side with the same index, and the direction pointing into that face.
 
-    If the point_index returned from calculate_index_on_edge_for_point is different than -1,
-    we know 100% sure that we are about to move off the current edge.
+    Both edge sides are added as source, as you can walk over an edge in both ways.
 
-    Returns -1 if no wrap is needed, otherwise returns the index position of the current point.
-    Also returns the destination edge side, as it is possible we are moving from edge side 2 to side 1.
+    Returns the portal map, which holds 2 * GRID_SIZE portals for each edge.
 
-    # TODO: This function feels a bit multi-functional by calculating index or returning -1 if there is no wrap needed
-    # We should probably split this up into calculate_index and check_wrap_needed or something along these lines
+    Example:
+    Edge A runs from (100, 50) to (50, 50) with direction W on one side, and from (100, 50) to (100, 0) with direction N on the other side.
+    Walking W from cell (99, 50) (index 0) ends up in cell (100, 49) facing S.
+    Walking N from cell (100, 49) (index 0) ends up in cell (99, 50) facing E.
     """
-    point_index = -1
+    portal_map = PortalMap()
 
-    for edge_side_1, edge_side_2 in VERTEX_MAP:
-        point_index = calculate_index_on_edge_for_point((row, column), edge_side_1, direction)
-        if point_index != -1:
-            break
+    for edge_side_1, edge_side_2 in vertex_map:
+        vertex_start, vertex_end = edge_side_1[0], edge_side_1[1]
+        edge_length = abs(vertex_end[0] - vertex_start[0]) + abs(vertex_end[1] - vertex_start[1])
 
-        point_index = calculate_index_on_edge_for_point((row, column), edge_side_2, direction)
-        if point_index != -1:
-            # edge_side_2 is the source, edge_side_1 is the destination. Reverse them.
-            edge_side_1, edge_side_2 = edge_side_2, edge_side_1
-            break
+        for source_edge_side, destination_edge_side in ((edge_side_1, edge_side_2), (edge_side_2, edge_side_1)):
+            # Direction of the destination edge side is pointing OUT, we need it to point IN
+            destination_direction = reverse_direction(destination_edge_side[2])
+
+            for point_index in range(edge_length):
+                source_row, source_column = calculate_cell_on_edge_side(source_edge_side, point_index)
+                destination_row, destination_column = calculate_cell_on_edge_side(destination_edge_side, point_index)
+                portal_map[(source_row, source_column, source_edge_side[2])] = (destination_row, destination_column, destination_direction)
 
-    destination_edge_side = edge_side_2
-    return point_index, destination_edge_side
-    
+    return portal_map
 
-def move_part2(board_map: Matrix2D, move_amount: int, direction: Direction, row: int, column: int) -> Coordinates:
+
+def move_part2(board_map: Board, portal_map: PortalMap, move_amount: int, direction: Direction, row: int, column: int) -> State:
     """
     Movement function for part 2.
 
     Traverses the board map according to the given move_amount and direction.
     The starting location is (row, column).
 
-    It will first calculate if a wrap to a different edge is needed:
-    - if no, simply continue with the next point on the same edge with the same direction
-    - if yes, calculate the new point on the different edge and use that point with the updated direction
+    Every step first looks up if the current state is the entrance of a portal (see compile_portal_map):
+    - if no, simply continue with the next point on the same face with the same direction
+    - if yes, continue with the cell and the direction on the other side of the portal
 
     If a '#' symbol is encountered, it will stop at the point right before this obstacle.
-    If a ' ' symbol is encountered, it will wrap around the board and continue from there.
     If a '.' symbol is encountered, it will continue as normal from this point.
 
+    When there are trace subscribers, the move, seam crossings and wall hits are sent as trace events.
+
     Returns the new coordinates and new direction of the point after the move (row, column, direction).
     """
     delta_row, delta_column = DIRECTION_VECTORS[direction.value]
-    
-    print(f"{row}, {column}")
-    for _ in range(move_amount):
-        current_point_index, dest_edge_side = calculate_index_for_wrap(row + delta_row, column + delta_column, direction)
+    void_symbol, open_symbol, wall_symbol = get_board_symbols(board_map)
+    tracing = bool(TRACE_SUBSCRIBERS)
+
+    if tracing:
+        emit_trace_event(TRACE_MOVE_START, row, column, direction, move_amount)
+
+    steps = move_amount
+    for step in range(move_amount):
+        portal = portal_map.get((row, column, direction))
 
         # No wrap around needed, simple movement
-        if current_point_index == -1:
-            new_row, new_column = row + delta_row, column + delta_column
-            new_direction = direction
-            next_element = board_map[new_row][new_column]
+        if portal is None:
+            new_row, new_column, new_direction = row + delta_row, column + delta_column, direction
 
-        # Wrap is needed, with an index based off the vertex start to the point
+        # Wrap is needed, the portal holds the cell and direction on the other edge side
         else:
-            new_row, new_column = calculate_point_on_other_edge_side(dest_edge_side, current_point_index)
-            next_element = board_map[new_row + delta_row][new_column + delta_column]
-            # Direction of the destination edge side is pointing OUT, we need it to point IN
-            new_direction = reverse_direction(dest_edge_side[2])
+            new_row, new_column, new_direction = portal
 
-        if next_element == '#':
+        if board_map[new_row][new_column] == wall_symbol:
+            steps = step
+            if tracing:
+                emit_trace_event(TRACE_WALL_HIT, row, column, direction, steps)
             break
-        if next_element == '.':
-            row = new_row
-            column = new_column
+
+        if tracing and portal is not None:
+            emit_trace_event(TRACE_SEAM_CROSSING, new_row, new_column, new_direction, direction.value)
+
+        row, column = new_row, new_column
+        if new_direction != direction:
             direction = new_direction
-            continue
+            delta_row, delta_column = DIRECTION_VECTORS[direction.value]
+
+    if tracing:
+        emit_trace_event(TRACE_MOVE_END, row, column, direction, steps)
 
     return row, column, direction
 
 
-def print_cube_schedule_from_board_map(board_map: Matrix2D) -> None:
+def calculate_grid_size(board_map: Board) -> int:
+    """
+    Calculates the size of a cube face, based off the amount of non ' ' cells on the board.
+    A cube has 6 faces of grid_size x grid_size cells.
+
+    Returns the grid size, raises an error if the board can not be a cube.
+    """
+    if is_board_array(board_map):
+        amount_of_cells = int((board_map != BOARD_VOID).sum())
+    else:
+        amount_of_cells = sum(len(board_row) - list(board_row).count(' ') for board_row in board_map)
+    grid_size = math.isqrt(amount_of_cells // 6)
+
+    if grid_size == 0 or 6 * grid_size * grid_size != amount_of_cells:
+        raise RuntimeError(f"A board with {amount_of_cells} cells can not be folded into a cube.")
+    return grid_size
+
+
+def calculate_cube_schedule(board_map: Board, grid_size: int) -> CubeSchedule:
+    """
+    Calculates a simple overview for the cube, by checking the top left cell of every grid_size x grid_size block.
+    This overview is also the signature of the net shape, as it does not depend on the grid size or the walls.
+
+    For a numpy array, the board is tiled into blocks with a reshape, and a block is a face if any of its cells is not void.
+
+    Returns the cube schedule as a tuple of tuples, so it can be used as a dictionary (or cache) key.
+    """
+    if is_board_array(board_map):
+        rows, columns = board_map.shape
+        faces = board_map.reshape(rows // grid_size, grid_size, columns // grid_size, grid_size).any(axis=(1, 3))
+        return CubeSchedule(tuple(int(face) for face in face_row) for face_row in faces)
+
+    simple_grid = []
+    for row in range(0, len(board_map), grid_size):
+        simple_grid_line = []
+        for column in range(0, len(board_map[row]), grid_size):
+            if board_map[row][column] != ' ':
+                simple_grid_line.append(1)
+            else:
+                simple_grid_line.append(0)
+        simple_grid.append(tuple(simple_grid_line))
+
+    return CubeSchedule(simple_grid)
+
+
+def print_cube_schedule_from_board_map(board_map: Board, grid_size: int = GRID_SIZE) -> None:
     """
     Prints out a simple overview for the cube, useful for calculating the vertex map.
     Using this simple matrix to draw out the cube edges + vertices
@@ -373,63 +1285,818 @@ def print_cube_schedule_from_board_map(board_map: Matrix2D) -> None:
     110
     100
     """
-    simple_grid = []
-    for row in range(0, len(board_map), GRID_SIZE):
-        simple_grid_line = []
-        for column in range(0, len(board_map[row]), GRID_SIZE):
-            if board_map[row][column] != ' ':
-                simple_grid_line.append(1)
-            else:
-                simple_grid_line.append(0)
-        simple_grid.append(simple_grid_line)
+    print_2d_matrix(calculate_cube_schedule(board_map, grid_size))
+
+
+# Corners of a face, relative to the top left corner of that face (row, column)
+# Per direction the two corners of the edge you walk off of when moving in that direction
+FACE_EDGE_CORNERS = [[(0, 1), (1, 1)], [(1, 0), (1, 1)], [(0, 0), (1, 0)], [(0, 0), (0, 1)]]
+
+
+@functools.lru_cache(maxsize=None)
+def fold_cube_schedule(cube_schedule: CubeSchedule) -> Tuple[Tuple[EdgeSide, EdgeSide], ...]:
+    """
+    Folds the net of the cube, and finds which edges of the net end up on the same edge of the cube.
+    This is what I drew out by hand for VERTEX_MAP, the result is in the same format with a grid size of 1.
+
+    Folding is done by placing the first face on the cube corners (0, 0, 0), (0, 1, 0), (1, 1, 0) and (1, 0, 0),
+    with its normal (pointing into the cube) being (0, 0, 1). Then walking over the neighbouring faces in the net:
+    - the corners on the shared edge stay where they are
+    - the other corners are the shared corners moved along the normal of the previous face
+    - the new normal points from the shared edge back to the previous face
+    Two edges of the net are then the same edge of the cube if their corners end up on the same cube corners.
+    All edges shared by two neighbouring faces in the net need no wrap, the other 7 pairs are the edges for VERTEX_MAP.
+
+    The result is cached by cube schedule, as there are only a few net shapes that every input can have.
+
+    Returns the vertex map (as a tuple, it is shared by everyone using the cache).
+
+    Example:
+    The cube schedule of my own input (011, 010, 110, 100) folds to the same edges as VERTEX_MAP.
+    """
+    faces = [(face_row, face_column) for face_row in range(len(cube_schedule)) for face_column in range(len(cube_schedule[face_row])) if cube_schedule[face_row][face_column]]
+    if len(faces) != 6:
+        raise RuntimeError(f"A cube has 6 faces, this cube schedule has {len(faces)}.")
+
+    # Every folded face stores the cube corner for each of its corners, and its normal
+    folded_faces = {faces[0]: ({(0, 0): (0, 0, 0), (0, 1): (1, 0, 0), (1, 1): (1, 1, 0), (1, 0): (0, 1, 0)}, (0, 0, 1))}
+    faces_to_fold = [faces[0]]
+    while faces_to_fold:
+        face_row, face_column = faces_to_fold.pop()
+        cube_corners, normal = folded_faces[(face_row, face_column)]
+
+        for direction in Direction:
+            delta_row, delta_column = DIRECTION_VECTORS[direction.value]
+            neighbour = (face_row + delta_row, face_column + delta_column)
+            if neighbour not in faces or neighbour in folded_faces:
+                continue
+
+            neighbour_cube_corners = {}
+            for corner_row, corner_column in cube_corners:
+                # The same corner seen from the face we came from
+                shared_corner = (corner_row + delta_row, corner_column + delta_column)
+                if shared_corner in cube_corners:
+                    neighbour_cube_corners[(corner_row, corner_column)] = cube_corners[shared_corner]
+                else:
+                    corner = cube_corners[(corner_row, corner_column)]
+                    neighbour_cube_corners[(corner_row, corner_column)] = tuple(corner[axis] + normal[axis] for axis in range(3))
+
+            (shared_row, shared_column), _ = FACE_EDGE_CORNERS[direction.value]
+            shared = cube_corners[(shared_row, shared_column)]
+            back = cube_corners[(shared_row - delta_row, shared_column - delta_column)]
+            neighbour_normal = tuple(back[axis] - shared[axis] for axis in range(3))
+
+            folded_faces[neighbour] = (neighbour_cube_corners, neighbour_normal)
+            faces_to_fold.append(neighbour)
+
+    if len(folded_faces) != 6:
+        raise RuntimeError("Not all faces of this cube schedule are connected, it can not be folded into a cube.")
+
+    # Group every edge of every face by the cube corners it ends up on
+    cube_edges = {}
+    for (face_row, face_column), (cube_corners, _) in folded_faces.items():
+        for direction in Direction:
+            corner_1, corner_2 = FACE_EDGE_CORNERS[direction.value]
+            cube_edge = frozenset((cube_corners[corner_1], cube_corners[corner_2]))
+            cube_edges.setdefault(cube_edge, []).append((face_row, face_column, direction, corner_1, corner_2))
+
+    if any(len(edge_sides) != 2 for edge_sides in cube_edges.values()):
+        raise RuntimeError("Some faces of this cube schedule end up on top of each other, it can not be folded into a cube.")
+
+    vertex_map = []
+    for edge_sides in cube_edges.values():
+        (face_row_1, face_column_1, direction_1, start_1, end_1), (face_row_2, face_column_2, direction_2, start_2, end_2) = edge_sides
+        delta_row, delta_column = DIRECTION_VECTORS[direction_1.value]
+        if (face_row_1 + delta_row, face_column_1 + delta_column) == (face_row_2, face_column_2):
+            continue
+
+        # Both edge sides have to start in the same cube corner
+        if folded_faces[(face_row_1, face_column_1)][0][start_1] != folded_faces[(face_row_2, face_column_2)][0][start_2]:
+            start_2, end_2 = end_2, start_2
+
+        edge = []
+        for face_row, face_column, direction, start, end in ((face_row_1, face_column_1, direction_1, start_1, end_1), (face_row_2, face_column_2, direction_2, start_2, end_2)):
+            vertex_start = (face_row + start[0], face_column + start[1])
+            vertex_end = (face_row + end[0], face_column + end[1])
+            edge_movement_vector = (vertex_end[0] - vertex_start[0], vertex_end[1] - vertex_start[1])
+            edge.append((vertex_start, vertex_end, direction, edge_movement_vector))
+        vertex_map.append(tuple(edge))
+
+    return tuple(vertex_map)
+
+
+def scale_vertex_map(vertex_map: List[List[EdgeSide]], grid_size: int) -> List[List[EdgeSide]]:
+    """
+    Multiplies the vertices of a vertex map in face units (like VERTEX_MAP or the result of fold_cube_schedule) by the grid size.
+    The movement vectors stay the same, they are one cell per step.
+
+    Returns the scaled vertex map, the given vertex map is left untouched.
+    """
+    scaled_vertex_map = []
+    for edge in vertex_map:
+        scaled_vertex_map.append([
+            [(vertex_start[0] * grid_size, vertex_start[1] * grid_size), (vertex_end[0] * grid_size, vertex_end[1] * grid_size), direction, edge_movement_vector]
+            for vertex_start, vertex_end, direction, edge_movement_vector in edge
+        ])
+    return scaled_vertex_map
+
 
-    print_2d_matrix(simple_grid)
+def calculate_vertex_map(board_map: Board) -> List[List[EdgeSide]]:
+    """
+    Generates the vertex map for any board, instead of drawing it out by hand.
+    The grid size is calculated from the board, the edges are folded (and cached) per cube schedule.
+
+    Returns the vertex map with vertices multiplied by the grid size (see scale_vertex_map).
+    """
+    grid_size = calculate_grid_size(board_map)
+    return scale_vertex_map(fold_cube_schedule(calculate_cube_schedule(board_map, grid_size)), grid_size)
+
+
+@functools.lru_cache(maxsize=None)
+def build_cube_geometry(cube_schedule: CubeSchedule, grid_size: int) -> CubeGeometry:
+    """
+    Builds the cube geometry for a cube schedule and grid size: the folded and scaled vertex map, and its portals.
+    The walls are not part of it, so it is cached and shared by every board with the same net and grid size.
+
+    Returns the cube geometry, see CubeGeometry.
+    """
+    vertex_map = scale_vertex_map(fold_cube_schedule(cube_schedule), grid_size)
+    return CubeGeometry(grid_size, cube_schedule, vertex_map, compile_portal_map(vertex_map))
 
 
-def traverse_cube(board_map: Matrix2D, path_to_follow: str) -> int:
+def get_cube_geometry(board_map: Board) -> CubeGeometry:
+    """
+    Gets the cube geometry of a board (see build_cube_geometry), which is only built the first time part 2 needs it.
+
+    Returns the cube geometry, see CubeGeometry.
+    """
+    grid_size = calculate_grid_size(board_map)
+    return build_cube_geometry(calculate_cube_schedule(board_map, grid_size), grid_size)
+
+
+def traverse_cube(board_map: Board, path_to_follow: Union[str, Iterable[str]], verbose: bool = False, jump_arrays: JumpArrays = None, recorder: TrajectoryRecorder = None) -> int:
     """
     Main function for part 2.
 
-    Prints out a sample of the cube edges.
+    Gets the cube geometry of this board (see get_cube_geometry) and prints out its cube schedule (if verbose is set).
+    Traverses through the cube by either rotating or moving, over the cube seams (see traverse, which picks between stepping and the jump arrays).
+    The actions are read one at a time (see iterate_path_tokens), so the path can also be streamed in chunks.
+    With a recorder, every move is recorded as well (see TrajectoryRecorder).
+
+    Returns the custom scoring value for AoC2022 day 22.
+    """
+    if verbose:
+        print_2d_matrix(get_cube_geometry(board_map).cube_schedule)
 
-    Arranges initial values (starting_point, direction and actions)
-    Then traverses through the cube by either:
-    - rotating
-    - moving
+    return traverse(board_map, path_to_follow, 2, jump_arrays, recorder)
+
+
+
+# MONKEY MAP - JUMP TABLES (for both part 1 and 2)
+# Walking straight ahead (ignoring walls) always brings you back to where you started: on the board (part 1) every row gives
+# a cycle going E and the reversed cycle going W, every column one going S and one going N. On the cube (part 2) a cycle goes
+# around the cube once, over 4 faces, changing direction at the seams. A jump table stores every cycle, the position of every state
+# on it and the distance to the next wall, so a move is cut off at that distance and becomes a single jump along the cycle.
+
+
+def pack_state(row: int, column: int, direction: Direction, width: int) -> int:
+    """Packs a state into a single int, (row * width + column) * 4 + direction value"""
+    return (row * width + column) * 4 + direction.value
+
+
+def unpack_state(state: int, width: int) -> State:
+    """Unpacks a packed state (see pack_state) into the state (row, column, direction)"""
+    row, column = divmod(state >> 2, width)
+    return (row, column, Direction(state & 3))
+
+
+def calculate_wall_distances(cycle_walls: numpy.ndarray, cycle_lengths: numpy.ndarray = None) -> numpy.ndarray:
+    """
+    Calculates the distance to the next wall for every position on the cycles, given which positions are walls.
+    The cycles lie after each other, cycle_lengths gives their lengths (by default it is all a single cycle).
+
+    This is a searchsorted over the positions of all walls, with a sentinel past the end.
+    When the next wall lies on a later cycle (or is the sentinel), it is the first wall of the own cycle one lap later instead.
+
+    Returns the wall distances (NO_WALL if there is no wall on the cycle).
+
+    Example:
+    Cycle '..#.' gives a distance of 1 for position 0, 0 for position 1 and 2 for position 3 (wrapping around).
+    """
+    import numpy
+    if cycle_lengths is None:
+        cycle_lengths = numpy.array([len(cycle_walls)], dtype=numpy.int64)
+    cycle_indices = numpy.repeat(numpy.arange(len(cycle_lengths)), cycle_lengths)
+    cycle_ends = numpy.cumsum(cycle_lengths)
+
+    walls = numpy.flatnonzero(cycle_walls)
+    positions = numpy.arange(len(cycle_walls))
+    next_walls = numpy.append(walls, len(cycle_walls))[numpy.searchsorted(walls, positions, side='right')]
+
+    # The walls are sorted, so the first wall of a cycle is the first one with that cycle index
+    wall_cycles = cycle_indices[walls]
+    is_first_wall = numpy.ones(len(walls), dtype=bool)
+    is_first_wall[1:] = wall_cycles[1:] != wall_cycles[:-1]
+    has_wall = numpy.zeros(len(cycle_lengths), dtype=bool)
+    has_wall[wall_cycles] = True
+    first_walls = numpy.zeros(len(cycle_lengths), dtype=numpy.int64)
+    first_walls[wall_cycles[is_first_wall]] = walls[is_first_wall] + cycle_lengths[wall_cycles[is_first_wall]]
+
+    next_walls = numpy.where(next_walls < cycle_ends[cycle_indices], next_walls, first_walls[cycle_indices])
+    return numpy.where(has_wall[cycle_indices], next_walls - positions - 1, NO_WALL)
+
+
+def calculate_packed_cycles_part1(board_array: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Calculates the cycles of part 1 all at once with numpy.
+    The cells of the board in row order are all E cycles after each other, reversed they are all W cycles.
+    The cells in column order (a lexsort) are all S cycles, reversed they are all N cycles.
+
+    Returns a tuple of all cycles after each other as packed states, and the length of every cycle.
+    """
+    import numpy
+    width = board_array.shape[1]
+    rows, columns = numpy.nonzero(board_array != BOARD_VOID)
+    row_cells = rows * width + columns
+    column_cells = row_cells[numpy.lexsort((rows, columns))]
+    row_lengths = numpy.bincount(rows)
+    row_lengths = row_lengths[row_lengths > 0]
+    column_lengths = numpy.bincount(columns)
+    column_lengths = column_lengths[column_lengths > 0]
+
+    cycle_states = numpy.concatenate([
+        row_cells * 4 + Direction.E.value,
+        row_cells[::-1] * 4 + Direction.W.value,
+        column_cells * 4 + Direction.S.value,
+        column_cells[::-1] * 4 + Direction.N.value,
+    ])
+    return cycle_states, numpy.concatenate([row_lengths, row_lengths[::-1], column_lengths, column_lengths[::-1]])
+
+
+def calculate_packed_cycles_part2(board_array: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Calculates the cycles of part 2 from runs instead of state by state.
+    A run is a lane straight over one face, in one direction: grid size states, which are all a fixed delta apart.
+    Every cycle is a few runs after each other, the run after a run starts where its last state leads to
+    (through the portal map, or the next cell on the board).
+
+    Only the runs are linked together in Python (24 per grid size), the states of all runs are a single numpy broadcast.
+
+    Returns a tuple of all cycles after each other as packed states, and the length of every cycle.
+    """
+    import numpy
+    cube_geometry = get_cube_geometry(board_array)
+    grid_size, portal_map = cube_geometry.grid_size, cube_geometry.portal_map
+    height, width = board_array.shape
+    lanes = numpy.arange(grid_size)
+
+    run_starts = []
+    for top in range(0, height, grid_size):
+        for left in range(0, width, grid_size):
+            if board_array[top, left] == BOARD_VOID:
+                continue
+            bottom, right = top + grid_size - 1, left + grid_size - 1
+            run_starts.append(((top + lanes) * width + left) * 4 + Direction.E.value)
+            run_starts.append((top * width + left + lanes) * 4 + Direction.S.value)
+            run_starts.append(((top + lanes) * width + right) * 4 + Direction.W.value)
+            run_starts.append((bottom * width + left + lanes) * 4 + Direction.N.value)
+
+    run_starts = numpy.concatenate(run_starts)
+    run_deltas = numpy.array([(delta_row * width + delta_column) * 4 for delta_row, delta_column in DIRECTION_VECTORS])[run_starts & 3]
+    run_states = run_starts[:, None] + lanes * run_deltas[:, None]
+
+    run_indices = {state: run for run, state in enumerate(run_starts.tolist())}
+    next_runs = []
+    for state in run_states[:, -1].tolist():
+        row, column, direction = unpack_state(state, width)
+        next_state = portal_map.get((row, column, direction))
+        if next_state is None:
+            delta_row, delta_column = DIRECTION_VECTORS[direction.value]
+            next_state = (row + delta_row, column + delta_column, direction)
+        next_runs.append(run_indices[pack_state(*next_state, width)])
+
+    run_order = []
+    cycle_lengths = []
+    visited = bytearray(len(next_runs))
+    for run in range(len(next_runs)):
+        cycle_start = len(run_order)
+        while not visited[run]:
+            visited[run] = 1
+            run_order.append(run)
+            run = next_runs[run]
+        if len(run_order) > cycle_start:
+            cycle_lengths.append((len(run_order) - cycle_start) * grid_size)
+
+    return run_states[run_order].ravel(), numpy.array(cycle_lengths, dtype=numpy.int64)
+
+
+def build_jump_arrays(board_map: Board, part: int) -> JumpArrays:
+    """
+    Builds the jump table of the board (see the JUMP TABLES comment), as numpy arrays over all packed states of the board.
+    The cycles for part 1 or part 2 are built with numpy (see calculate_packed_cycles_part1 and calculate_packed_cycles_part2),
+    so no state is ever a tuple. States on a void cell are never visited by a walker, they are left at 0.
+
+    The distance to the next wall is calculated for all cycles at once, see calculate_wall_distances.
+
+    Returns the jump arrays, see JumpArrays.
+    """
+    import numpy
+    board_array = board_map if is_board_array(board_map) else convert_board_map_to_array(board_map)
+    if part == 1:
+        cycle_states, cycle_lengths = calculate_packed_cycles_part1(board_array)
+    elif part == 2:
+        cycle_states, cycle_lengths = calculate_packed_cycles_part2(board_array)
+    else:
+        raise RuntimeError(f"Unknown part {part}, there is only part 1 and part 2.")
+
+    amount_of_states = board_array.size * 4
+    state_offsets = numpy.repeat(numpy.cumsum(cycle_lengths) - cycle_lengths, cycle_lengths)
+
+    cycle_offsets = numpy.zeros(amount_of_states, dtype=numpy.int64)
+    cycle_positions = numpy.zeros(amount_of_states, dtype=numpy.int64)
+    cycle_lengths_by_state = numpy.ones(amount_of_states, dtype=numpy.int64)
+    wall_distances = numpy.zeros(amount_of_states, dtype=numpy.int64)
+
+    cycle_offsets[cycle_states] = state_offsets
+    cycle_positions[cycle_states] = numpy.arange(len(cycle_states)) - state_offsets
+    cycle_lengths_by_state[cycle_states] = numpy.repeat(cycle_lengths, cycle_lengths)
+    wall_distances[cycle_states] = calculate_wall_distances(board_array.ravel()[cycle_states >> 2] == BOARD_WALL, cycle_lengths)
+
+    return JumpArrays(board_array.shape[1], cycle_states, cycle_offsets, cycle_positions, cycle_lengths_by_state, wall_distances)
+
+
+@functools.lru_cache(maxsize=JUMP_ARRAYS_CACHE_SIZE)
+def build_cached_jump_arrays(board_bytes: bytes, width: int, part: int) -> JumpArrays:
+    """
+    Builds the jump arrays of a board given as the bytes of its numpy array (see build_jump_arrays), cached by those bytes.
+    The cached arrays are shared by every caller, so they are made read-only.
+
+    Returns the jump arrays, see JumpArrays.
+    """
+    import numpy
+    jump_arrays = build_jump_arrays(numpy.frombuffer(board_bytes, dtype=numpy.uint8).reshape(-1, width), part)
+    for field in jump_arrays[1:]:
+        field.flags.writeable = False
+    return jump_arrays
+
+
+def get_jump_arrays(board_map: Board, part: int) -> JumpArrays:
+    """
+    Gets the jump arrays of a board (see build_cached_jump_arrays), which are only built the first time a traversal needs them.
+    Following many paths over the same board builds them once.
+
+    Returns the read-only jump arrays, see JumpArrays.
+
+    Example:
+    jump_arrays = get_jump_arrays(board_map, 2)
+    traverse_cube(board_map, path_to_follow, jump_arrays=jump_arrays)
+    """
+    board_array = board_map if is_board_array(board_map) else convert_board_map_to_array(board_map)
+    return build_cached_jump_arrays(board_array.tobytes(), board_array.shape[1], part)
+
+
+def pack_jump_arrays(jump_arrays: JumpArrays) -> PackedJumpTable:
+    """
+    Views the jump arrays as a packed jump table, to follow a path one action at a time (see follow_actions_packed).
+    Every field is a memoryview of its array, so nothing is copied, and a lookup gives a plain int instead of a numpy scalar.
+
+    Returns the packed jump table, see PackedJumpTable.
+    """
+    width, *fields = jump_arrays
+    return PackedJumpTable(width, *(memoryview(field) for field in fields))
+
+
+def follow_actions_packed(packed_jump_table: PackedJumpTable, state: int, actions: Iterable[str], on_move: Callable[[int, int, bool], None] = None) -> int:
+    """
+    Follows the actions on packed states (see pack_state), the fast path for both parts.
+    A rotation adds a delta to the state (see PACKED_ROTATION_DELTAS),
+    a move is cut off at the wall distance and is a single jump along the cycle, with ints from flat sequences.
+    This way no Direction or tuple is created for any action.
+
+    The optional on_move is called for every move before the jump, with the packed state the move starts in,
+    the amount of steps taken (full laps around a cycle without walls included) and whether it stopped at a wall.
+    A TrajectoryRecorder records the moves this way (see TrajectoryRecorder.record_packed).
+
+    Returns the final packed state.
+    """
+    _, cycle_states, cycle_offsets, cycle_positions, cycle_lengths, wall_distances = packed_jump_table
+    rotate_right, rotate_left = PACKED_ROTATION_DELTAS['R'], PACKED_ROTATION_DELTAS['L']
+
+    for action in actions:
+        if action == 'R':
+            state += rotate_right[state & 3]
+        elif action == 'L':
+            state += rotate_left[state & 3]
+        elif action.isdigit():
+            move_amount = int(action)
+            wall_distance = wall_distances[state]
+            hit_wall = wall_distance < move_amount
+            if hit_wall:
+                move_amount = wall_distance
+            if on_move is not None:
+                on_move(state, move_amount, hit_wall)
+            state = cycle_states[cycle_offsets[state] + (cycle_positions[state] + move_amount) % cycle_lengths[state]]
+        else:
+            raise RuntimeError(f"Unknown action {action}, something went wrong.")
+
+    return state
+
+
+def follow_path_packed(packed_jump_table: PackedJumpTable, state: int, path_to_follow: Union[str, Iterable[str]]) -> int:
+    """Follows the path on packed states (see follow_actions_packed), the path can also be streamed in chunks (see iterate_path_tokens)"""
+    return follow_actions_packed(packed_jump_table, state, iterate_path_tokens(path_to_follow))
+
+
+def follow_actions_traced(packed_jump_table: PackedJumpTable, state: int, actions: Iterable[str]) -> int:
+    """
+    Same as follow_actions_packed, but sends trace events for every action.
+    A move walks along its cycle, so a seam crossing is every step that does not end up on the next cell in the same direction,
+    which also includes wrapping around the board in part 1.
+
+    Full laps around a cycle without walls are skipped, just like follow_actions_packed does.
+
+    Returns the final packed state.
+    """
+    width, cycle_states, cycle_offsets, cycle_positions, cycle_lengths, wall_distances = packed_jump_table
+
+    for action in actions:
+        row, column, direction = unpack_state(state, width)
+        if check_action_is_rotate(action):
+            direction = rotate(action, direction)
+            emit_trace_event(TRACE_ROTATION, row, column, direction, 1 if action == 'R' else -1)
+            state = pack_state(row, column, direction, width)
+            continue
+        if not action.isdigit():
+            raise RuntimeError(f"Unknown action {action}, something went wrong.")
+
+        move_amount = int(action)
+        emit_trace_event(TRACE_MOVE_START, row, column, direction, move_amount)
+
+        offset, position, length = cycle_offsets[state], cycle_positions[state], cycle_lengths[state]
+        wall_distance = wall_distances[state]
+        hits_wall = wall_distance < move_amount
+        steps = wall_distance if hits_wall else move_amount
+        steps_to_walk = steps if hits_wall else steps % length
+
+        for step in range(1, steps_to_walk + 1):
+            next_row, next_column, next_direction = unpack_state(cycle_states[offset + (position + step) % length], width)
+            delta_row, delta_column = DIRECTION_VECTORS[direction.value]
+            if next_direction != direction or (row + delta_row, column + delta_column) != (next_row, next_column):
+                emit_trace_event(TRACE_SEAM_CROSSING, next_row, next_column, next_direction, direction.value)
+            row, column, direction = next_row, next_column, next_direction
+
+        if hits_wall:
+            emit_trace_event(TRACE_WALL_HIT, row, column, direction, steps)
+        emit_trace_event(TRACE_MOVE_END, row, column, direction, steps)
+        state = pack_state(row, column, direction, width)
+
+    return state
+
+
+def get_stepping_move(board_map: Board, part: int) -> Callable[[int, Direction, int, int], State]:
+    """
+    Returns the movement function that steps cell by cell for part 1 (move_part1, wrapping around the board, see WrapSpans)
+    or part 2 (move_part2, through the portals of the cube seams), with the board already filled in.
+    """
+    if part == 1:
+        wrap_spans = WrapSpans({}, {})
+        return lambda move_amount, direction, row, column: (*move_part1(board_map, move_amount, direction, row, column, wrap_spans), direction)
+    if part == 2:
+        return functools.partial(move_part2, board_map, get_cube_geometry(board_map).portal_map)
+    raise RuntimeError(f"Unknown part {part}, there is only part 1 and part 2.")
+
+
+def traverse(board_map: Board, path_to_follow: Union[str, Iterable[str]], part: int, jump_arrays: JumpArrays = None, recorder: TrajectoryRecorder = None) -> int:
+    """
+    Follows the path over the board for part 1 or part 2, used by both traverse_board_map and traverse_cube.
+
+    A path that is short compared to the board is stepped cell by cell (see get_stepping_move and follow_actions_stepping),
+    building the jump arrays would take longer than that. As soon as the steps add up to the step budget (see calculate_step_budget),
+    the rest of the path is followed with the jump arrays (see get_jump_arrays), so every move is a single lookup, no matter the move amount.
+    With jump arrays given, a recorder or trace subscribers, the jump arrays are used from the start:
+    without trace subscribers the path is followed on packed states (see follow_actions_packed),
+    otherwise every action is traced (see follow_actions_traced).
+    A sparse board is rejected, traverse_sparse_board is the only way to traverse one.
 
     Returns the custom scoring value for AoC2022 day 22.
     """
-    print_cube_schedule_from_board_map(board_map)
+    if isinstance(board_map, SparseBoard):
+        raise RuntimeError("A sparse board can only be traversed with traverse_sparse_board.")
 
     row, column = get_starting_coordinates(board_map)
     direction = Direction.E
-    action_list = re.findall(r'\d+|\w', path_to_follow)
+    actions = iterate_path_tokens(path_to_follow)
+
+    if jump_arrays is None and recorder is None and not TRACE_SUBSCRIBERS:
+        move = get_stepping_move(board_map, part)
+        step_budget = calculate_step_budget(board_map)
+        (row, column, direction), action = follow_actions_stepping(move, (row, column, direction), actions, step_budget)
+        if action is None:
+            return 1000 * (row + 1) + 4 * (column + 1) + direction.value
+        actions = itertools.chain([action], actions)
+
+    if jump_arrays is None:
+        jump_arrays = get_jump_arrays(board_map, part)
+    packed_jump_table = pack_jump_arrays(jump_arrays)
+    state = pack_state(row, column, direction, packed_jump_table.width)
+
+    # Without anyone listening, the path is followed on packed states, so no Direction or tuple is created per action
+    if not TRACE_SUBSCRIBERS:
+        on_move = None if recorder is None else functools.partial(recorder.record_packed, packed_jump_table.width)
+        state = follow_actions_packed(packed_jump_table, state, actions, on_move)
+    else:
+        if recorder is not None:
+            subscribe_trace(recorder.handle_trace_event)
+        try:
+            state = follow_actions_traced(packed_jump_table, state, actions)
+        finally:
+            if recorder is not None:
+                unsubscribe_trace(recorder.handle_trace_event)
+
+    row, column, direction = unpack_state(state, packed_jump_table.width)
+    return 1000 * (row + 1) + 4 * (column + 1) + direction.value
+
+
+def follow_actions_stepping(move: Callable[[int, Direction, int, int], State], state: State, actions: Iterator[str], step_budget: int) -> Tuple[State, Optional[str]]:
+    """
+    Follows the actions cell by cell with the given movement function (move_part1 or move_part2, without the board),
+    as long as the move amounts add up to no more than the step budget.
+    For a path that is short compared to the board, this is faster than building the jump arrays (see DIRECT_STEP_BUDGET).
+
+    Returns a tuple of the state after the actions followed, and the first action that did not fit the budget (None if all actions fit).
+    """
+    row, column, direction = state
 
-    for action in action_list:
+    for action in actions:
         if check_action_is_rotate(action):
             direction = rotate(action, direction)
+        elif action.isdigit():
+            move_amount = int(action)
+            step_budget -= move_amount
+            if step_budget < 0:
+                return (row, column, direction), action
+            row, column, direction = move(move_amount, direction, row, column)
         else:
-            row, column, direction = move_part2(board_map, int(action), direction, row, column)
+            raise RuntimeError(f"Unknown action {action}, something went wrong.")
+
+    return (row, column, direction), None
+
+
+
+# MONKEY MAP - MOVE MEMOIZATION (for both part 1 and 2)
+# Without a jump table, move_part1 and move_part2 walk cell by cell, even though real paths repeat the same moves a lot
+# (a walker stuck against a wall keeps asking for the same answer). A move memo keeps the results of recent moves,
+# keyed by (row, column, direction value, move amount), so a repeated move is a single lookup.
+
+
+DEFAULT_MOVE_MEMO_CAPACITY = 1 << 16
+
+# How the entry to evict is picked when the memo is full: the least recently used one, or the oldest one
+MOVE_MEMO_EVICTIONS = ('lru', 'fifo')
+
+
+class MoveMemo:
+    """
+    Bounded memo of the moves on a board, for part 1 (wrapping around the board) or part 2 (crossing the cube seams).
+    Every move result is stored as a state (row, column, direction), the stats count the hits, misses and evictions.
+    A memoized move sends no trace events, only a miss runs move_part1 or move_part2.
+
+    When the board changes in place, call invalidate. When it is replaced, call set_board (part 2 needs the new portals).
+
+    Example:
+    memo = MoveMemo(board_map, part=2, capacity=4096)
+    row, column, direction = memo.move(10, Direction.E, 0, 8)
+    memo.traverse('10R5L5R10L4R5L5')
+    memo.stats
+    """
+
+    def __init__(self, board_map: Board, part: int = 1, capacity: int = DEFAULT_MOVE_MEMO_CAPACITY, eviction: str = 'lru'):
+        if part not in (1, 2):
+            raise RuntimeError(f"Unknown part {part}, there is only part 1 and part 2.")
+        if eviction not in MOVE_MEMO_EVICTIONS:
+            raise RuntimeError(f"Unknown eviction {eviction}, use one of {MOVE_MEMO_EVICTIONS}.")
+        if capacity < 1:
+            raise RuntimeError(f"The capacity of a move memo should be at least 1, not {capacity}.")
+
+        self.part = part
+        self.capacity = capacity
+        self.eviction = eviction
+        self.entries: Dict[Tuple[int, int, int, int], State] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.set_board(board_map)
+
+    def set_board(self, board_map: Board) -> None:
+        """Replaces the board (the portals of part 2 are worked out again, see get_cube_geometry), and invalidates the memo"""
+        self.board_map = board_map
+        self.portal_map = get_cube_geometry(board_map).portal_map if self.part == 2 else None
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Forgets every memoized move (and the spans of the rows and columns of part 1, see WrapSpans), the stats are kept"""
+        self.entries.clear()
+        self.wrap_spans = WrapSpans({}, {})
+
+    def move(self, move_amount: int, direction: Direction, row: int, column: int) -> State:
+        """
+        Moves just like move_part1 or move_part2 (depending on the part), or looks up the result of the same move.
+
+        Returns the new coordinates and new direction of the point after the move (row, column, direction).
+        """
+        entries = self.entries
+        key = (row, column, direction.value, move_amount)
+        result = entries.get(key)
+        if result is not None:
+            self.hits += 1
+            if self.eviction == 'lru':
+                entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        if self.part == 1:
+            result = (*move_part1(self.board_map, move_amount, direction, row, column, self.wrap_spans), direction)
+        else:
+            result = move_part2(self.board_map, self.portal_map, move_amount, direction, row, column)
+
+        entries[key] = result
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    @property
+    def stats(self) -> Dict:
+        """The hits, misses, evictions, the current size and the hit rate of the memo"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'capacity': self.capacity,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def traverse(self, path_to_follow: Union[str, Iterable[str]]) -> int:
+        """
+        Follows the path from the start of the board, with every move going through the memo.
+
+        Returns the custom scoring value for AoC2022 day 22.
+        """
+        row, column = get_starting_coordinates(self.board_map)
+        direction = Direction.E
+
+        for action in iterate_path_tokens(path_to_follow):
+            if check_action_is_rotate(action):
+                direction = rotate(action, direction)
+            else:
+                row, column, direction = self.move(int(action), direction, row, column)
+
+        return 1000 * (row + 1) + 4 * (column + 1) + direction.value
+
+
+
+# PROFILING
 
-    return 1000 * (row + 1) + 4 * (column + 1) + direction.value
+
+def count_trace_event(counters: Dict[str, int], trace_event: TraceEvent) -> None:
+    """Trace callback (use it with functools.partial) that counts the moves, steps, rotations, seam crossings and wall stops"""
+    if trace_event.kind == TRACE_MOVE_END:
+        counters['moves'] += 1
+        counters['steps'] += trace_event.detail
+    elif trace_event.kind == TRACE_ROTATION:
+        counters['rotations'] += 1
+    elif trace_event.kind == TRACE_SEAM_CROSSING:
+        counters['seam_crossings'] += 1
+    elif trace_event.kind == TRACE_WALL_HIT:
+        counters['wall_stops'] += 1
+
+
+def profile_phase(phases: Dict[str, Dict], phase: str, function: Callable, *arguments):
+    """
+    Runs the function twice: once to measure the wall time, and once under tracemalloc to measure the allocation peak.
+    tracemalloc slows everything down, that is why the wall time is measured on its own.
+
+    Stores the wall time and the allocation peak of the phase in phases.
+    Returns the result of the function.
+    """
+    import tracemalloc
+    start_time = time.perf_counter()
+    function(*arguments)
+    seconds = time.perf_counter() - start_time
+
+    tracemalloc.start()
+    result = function(*arguments)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    phases[phase] = {'seconds': seconds, 'peak_bytes': peak_bytes}
+    return result
+
+
+def profile_traversal(traverse: Callable, board_map: Board, input_file: str, jump_arrays: JumpArrays, seconds: float) -> Dict[str, int]:
+    """
+    Follows the path once more with a counting trace subscriber (see count_trace_event).
+    This traced run is not timed, steps per second are calculated with the seconds of the untraced run.
+
+    Returns the hot path counters.
+    """
+    counters = {'moves': 0, 'steps': 0, 'rotations': 0, 'seam_crossings': 0, 'wall_stops': 0}
+    callback = functools.partial(count_trace_event, counters)
+
+    subscribe_trace(callback)
+    try:
+        traverse(board_map, read_path_chunks(input_file), jump_arrays=jump_arrays)
+    finally:
+        unsubscribe_trace(callback)
+
+    counters['steps_per_second'] = counters['steps'] / seconds if seconds > 0 else 0
+    return counters
+
+
+def profile_main(input_file: str) -> Dict:
+    """
+    Solves both parts for the input file, while profiling every phase:
+    input load, board padding, the jump table precompute of both parts, traverse_board_map and traverse_cube.
+    Every phase gets its wall time and allocation peak (see profile_phase).
+    Both traversals also get their hot path counters (see profile_traversal), in part 1 every seam crossing is a wrap.
+
+    Returns the profile, which can be written out as JSON.
+    """
+    phases = {}
+
+    board_rows = profile_phase(phases, 'input_load', lambda: load_board_rows(input_file))
+    board_map = profile_phase(phases, 'board_padding', lambda: pad_board_map(list(board_rows)))
+    jump_arrays_part1 = profile_phase(phases, 'precompute_part1', lambda: build_jump_arrays(board_map, 1))
+    jump_arrays_part2 = profile_phase(phases, 'precompute_part2', lambda: build_jump_arrays(board_map, 2))
+    score_part1 = profile_phase(phases, 'traverse_board_map', lambda: traverse_board_map(board_map, read_path_chunks(input_file), jump_arrays=jump_arrays_part1))
+    score_part2 = profile_phase(phases, 'traverse_cube', lambda: traverse_cube(board_map, read_path_chunks(input_file), jump_arrays=jump_arrays_part2))
+
+    counters_part1 = profile_traversal(traverse_board_map, board_map, input_file, jump_arrays_part1, phases['traverse_board_map']['seconds'])
+    counters_part1['wraps'] = counters_part1.pop('seam_crossings')
+    counters_part2 = profile_traversal(traverse_cube, board_map, input_file, jump_arrays_part2, phases['traverse_cube']['seconds'])
+
+    return {
+        'input_file': input_file,
+        'answers': {'part1': score_part1, 'part2': score_part2},
+        'phases': phases,
+        'counters': {'part1': counters_part1, 'part2': counters_part2},
+    }
+
+
+def print_profile(profile: Dict) -> None:
+    """Prints out the profile from profile_main as a table"""
+    print(f"{'phase':<20}{'seconds':>12}{'peak MiB':>12}")
+    for phase, measurements in profile['phases'].items():
+        print(f"{phase:<20}{measurements['seconds']:>12.4f}{measurements['peak_bytes'] / 2 ** 20:>12.2f}")
+    for part, counters in profile['counters'].items():
+        print(f"{part}: " + ', '.join(f"{counter} {value:.0f}" for counter, value in counters.items()))
 
 
 
 # MAIN
 
-def main(input_file: str) -> None:
-    board_map, path_to_follow = process_input_file(input_file)
+def main(input_file: str, verbosity: int = 0) -> None:
+    """
+    Solves both parts for the input file.
+    With a verbosity of 1 the board, the path and the cube schedule are printed out,
+    with a verbosity of 2 every trace event is printed out as well (see print_trace_event).
+    """
+    board_map = load_board(input_file)
 
-    score = traverse_board_map(board_map, path_to_follow)
+    if verbosity >= 1:
+        print_2d_matrix(board_map)
+        for chunk in read_path_chunks(input_file):
+            print(chunk, end='')
+        print()
+    if verbosity >= 2:
+        subscribe_trace(print_trace_event)
+
+    # The path is streamed from the input file for each part, instead of loading it in memory
+    score = traverse_board_map(board_map, read_path_chunks(input_file))
     print(f"Part 1 - Answer: \t{score}")
 
-    score = traverse_cube(board_map, path_to_follow)
+    score = traverse_cube(board_map, read_path_chunks(input_file), verbose=verbosity >= 1)
     print(f"Part 2 - Answer: \t{score}")
 
+    if verbosity >= 2:
+        unsubscribe_trace(print_trace_event)
 
-if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Please provide the input file as the only argument.")
-        sys.exit(1)
 
-    main(sys.argv[1])
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves the Monkey Map problem from AoC2022 day 22.")
+    parser.add_argument('input_file', help="the input file, with the board and the path to follow")
+    parser.add_argument('-v', '--verbose', action='count', default=0, help="print the board and cube schedule (-v), and every trace event (-vv)")
+    parser.add_argument('--profile', metavar='PROFILE_FILE', help="profile every phase, and write the profile as JSON to this file")
+    arguments = parser.parse_args()
+
+    if arguments.profile:
+        profile = profile_main(arguments.input_file)
+        print_profile(profile)
+        print(f"Part 1 - Answer: \t{profile['answers']['part1']}")
+        print(f"Part 2 - Answer: \t{profile['answers']['part2']}")
+        with open(arguments.profile, 'w') as f:
+            json.dump(profile, f, indent=2)
+    else:
+        main(arguments.input_file, arguments.verbose)
@@ -0,0 +1,284 @@
+from typing import List, NamedTuple, Tuple
+import numpy
+
+from monkey_map import BOARD_OPEN, BOARD_VOID, BOARD_WALL, Board, Coordinates, Direction, JumpArrays, State, calculate_wall_distances
+from monkey_map import convert_board_map_to_array, get_jump_arrays, get_starting_coordinates, iterate_path_tokens
+
+
+
+# BATCH WALKERS
+# Simulates many walkers on the same board at once, for what-if analysis.
+# Every walker has its own start state and its own path, all walkers are moved together with numpy.
+
+
+# Encoding of the actions of a path in an int array, a move amount is stored as is (0 is also used as padding)
+ROTATE_LEFT = -1
+ROTATE_RIGHT = -2
+
+
+def pack_states(rows: numpy.ndarray, columns: numpy.ndarray, directions: numpy.ndarray, width: int) -> numpy.ndarray:
+    """Packs arrays of rows, columns and direction values into one array of packed states"""
+    return (numpy.asarray(rows, dtype=numpy.int64) * width + columns) * 4 + directions
+
+
+def unpack_states(states: numpy.ndarray, width: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Unpacks an array of packed states into arrays of rows, columns and direction values"""
+    rows, columns = numpy.divmod(states >> 2, width)
+    return rows, columns, states & 3
+
+
+def encode_path(path_to_follow: str) -> List[int]:
+    """Encodes the actions of a path to follow as ints, a move amount is stored as is, a rotation as ROTATE_LEFT or ROTATE_RIGHT"""
+    return [ROTATE_LEFT if action == 'L' else ROTATE_RIGHT if action == 'R' else int(action) for action in iterate_path_tokens(path_to_follow)]
+
+
+def encode_paths(paths: List[str]) -> numpy.ndarray:
+    """
+    Encodes the paths to follow into a 2D int array, one row per path, padded with 0 (a move of 0 does nothing).
+    A move amount is stored as is, a rotation as ROTATE_LEFT or ROTATE_RIGHT.
+
+    Returns the encoded actions, of shape (amount of paths, longest amount of actions).
+    """
+    encoded_paths = [encode_path(path) for path in paths]
+
+    actions = numpy.zeros((len(encoded_paths), max((len(encoded_path) for encoded_path in encoded_paths), default=0)), dtype=numpy.int64)
+    for walker, encoded_path in enumerate(encoded_paths):
+        actions[walker, :len(encoded_path)] = encoded_path
+    return actions
+
+
+def move_walkers(jump_arrays: JumpArrays, states: numpy.ndarray, move_amounts: numpy.ndarray) -> numpy.ndarray:
+    """
+    Moves all walkers at once, each by its own move amount (see follow_actions_packed).
+    A walker that hits a wall has its move cut off at the wall distance, there is no branching per walker.
+
+    Returns the new packed states.
+    """
+    steps = numpy.minimum(move_amounts, jump_arrays.wall_distances[states])
+    cycle_lengths = jump_arrays.cycle_lengths[states]
+    return jump_arrays.cycle_states[jump_arrays.cycle_offsets[states] + (jump_arrays.cycle_positions[states] + steps % cycle_lengths) % cycle_lengths]
+
+
+def encode_action_codes(actions: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Gives every distinct action a code, which is its row in the action table (see build_action_table).
+    The distinct move amounts get the codes 0 up to the amount of move amounts, then rotating left and rotating right.
+
+    Move amounts are usually small, so they are numbered with a lookup table instead of sorting all actions.
+
+    Returns a tuple of the distinct move amounts and the action codes (same shape as actions).
+    """
+    moves = numpy.maximum(actions, 0)
+    max_move_amount = int(moves.max(initial=0))
+
+    if max_move_amount < 1 << 20:
+        is_move_amount = numpy.zeros(max_move_amount + 1, dtype=bool)
+        is_move_amount[moves.ravel()] = True
+        move_amounts = numpy.flatnonzero(is_move_amount)
+        action_codes = (numpy.cumsum(is_move_amount) - 1)[moves]
+    else:
+        move_amounts, action_codes = numpy.unique(moves, return_inverse=True)
+        action_codes = action_codes.reshape(actions.shape)
+
+    action_codes[actions == ROTATE_LEFT] = len(move_amounts)
+    action_codes[actions == ROTATE_RIGHT] = len(move_amounts) + 1
+    return move_amounts, action_codes
+
+
+def build_action_table(jump_arrays: JumpArrays, move_amounts: numpy.ndarray) -> numpy.ndarray:
+    """
+    Precomputes the next state of every state, for every action a walker can do:
+    - row i is a move of move_amounts[i] (see move_walkers, this is where walls are taken care of)
+    - the second to last row is rotating left, the last row is rotating right
+
+    This makes every action of every walker a single gather in this table.
+
+    Returns the action table, of shape (amount of move amounts + 2, amount of states).
+    """
+    all_states = numpy.arange(len(jump_arrays.cycle_offsets), dtype=numpy.int64)
+
+    action_table = numpy.empty((len(move_amounts) + 2, len(all_states)), dtype=numpy.int64)
+    for move_index, move_amount in enumerate(move_amounts):
+        action_table[move_index] = move_walkers(jump_arrays, all_states, move_amount)
+    action_table[-2] = (all_states & ~3) | ((all_states + 3) & 3)
+    action_table[-1] = (all_states & ~3) | ((all_states + 1) & 3)
+
+    return action_table
+
+
+def simulate_walkers(
+    jump_arrays: JumpArrays,
+    start_rows: numpy.ndarray,
+    start_columns: numpy.ndarray,
+    start_directions: numpy.ndarray,
+    actions: numpy.ndarray
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Main function for the batch walkers.
+
+    Every walker starts at its own (row, column, direction value) and follows its own row of encoded actions (see encode_paths).
+    A single row of actions (a 1D array) is followed by all walkers.
+
+    Every distinct action gets a row in the action table (see build_action_table).
+    All walkers then do their n-th action together, with one gather in that table.
+
+    Returns the final rows, columns, direction values and the custom scoring values for AoC2022 day 22, as arrays.
+    """
+    states = pack_states(start_rows, start_columns, start_directions, jump_arrays.width)
+    actions = numpy.asarray(actions)
+
+    # Walkers with different paths are handled one step at a time, so store the actions per step contiguously
+    actions_per_step = numpy.ascontiguousarray(actions.T) if actions.ndim == 2 else actions
+    move_amounts, action_codes = encode_action_codes(actions_per_step)
+    action_table = build_action_table(jump_arrays, move_amounts)
+
+    if action_codes.ndim == 1:
+        for action_code in action_codes:
+            states = action_table[action_code][states]
+    else:
+        flat_action_table = action_table.ravel()
+        for step_action_codes in action_codes:
+            states = flat_action_table[step_action_codes * action_table.shape[1] + states]
+
+    rows, columns, directions = unpack_states(states, jump_arrays.width)
+    return rows, columns, directions, 1000 * (rows + 1) + 4 * (columns + 1) + directions
+
+
+def simulate_walkers_on_board(board_map: Board, paths: List[str], part: int = 1, start_states: List[State] = None) -> numpy.ndarray:
+    """
+    Helper function to simulate walkers on a board without building the jump arrays yourself.
+    Every path gets a walker, starting on the starting coordinates facing E unless start_states are given.
+
+    Returns the custom scoring values for AoC2022 day 22, one per path.
+    """
+    jump_arrays = get_jump_arrays(board_map, part)
+
+    if start_states is None:
+        start_states = [(*get_starting_coordinates(board_map), Direction.E)] * len(paths)
+    start_rows, start_columns, start_directions = numpy.array([(row, column, direction.value) for row, column, direction in start_states], dtype=numpy.int64).reshape(-1, 3).T
+
+    _, _, _, scores = simulate_walkers(jump_arrays, start_rows, start_columns, start_directions, encode_paths(paths))
+    return scores
+
+
+
+# WALL VARIANTS
+# Runs one path against many variants of a board, which only differ from the base board in some walls (a wall overlay per variant).
+# The cycles (the wrap rules of part 1, the cube seams of part 2) do not depend on the walls, so they are shared by all variants.
+# Only the wall distances of the cycles through a toggled cell differ from the base board, those are stored per variant.
+# One walker per variant then follows the path, all walkers doing the same action together.
+
+
+class WallVariants(NamedTuple):
+    """
+    Helper class to store the variants of a board (see build_wall_variants), on top of the jump arrays of the base board:
+    - override_keys: sorted keys variant * amount of states + state, for every state whose wall distance differs from the base board
+    - override_distances: the wall distance for every override key
+    - start_states: the packed start state of every variant
+    """
+    override_keys: numpy.ndarray
+    override_distances: numpy.ndarray
+    start_states: numpy.ndarray
+
+
+def build_wall_variants(board_map: Board, jump_arrays: JumpArrays, overlays: List[List[Coordinates]]) -> WallVariants:
+    """
+    Builds the variants of a board, every overlay is a list of cells (row, column) that are toggled from open to wall or back.
+    The wall distances are only calculated again for the (at most 4) cycles through every toggled cell (see calculate_wall_distances),
+    and the start state only for a variant that toggles a cell on the top row.
+
+    Returns the variants, see WallVariants. Raises an error if a toggled cell is not on the board, or no open cell is left on the top row.
+    """
+    board_array = numpy.asarray(board_map if isinstance(board_map, numpy.ndarray) else convert_board_map_to_array(board_map))
+    base_walls = board_array.ravel() == BOARD_WALL
+    width, amount_of_states = jump_arrays.width, len(jump_arrays.cycle_offsets)
+    base_start_state = int(pack_states(*get_starting_coordinates(board_array), Direction.E.value, width))
+
+    override_keys, override_distances, start_states = [], [], []
+    for variant, overlay in enumerate(overlays):
+        cells = numpy.array([row * width + column for row, column in overlay], dtype=numpy.int64)
+        if numpy.any(board_array.ravel()[cells] == BOARD_VOID):
+            raise RuntimeError(f"Variant {variant} toggles a cell that is not on the board, only open cells and walls can be toggled.")
+
+        for offset in numpy.unique(jump_arrays.cycle_offsets[(cells[:, None] * 4 + numpy.arange(4)).ravel()]).tolist():
+            states = jump_arrays.cycle_states[offset:offset + jump_arrays.cycle_lengths[jump_arrays.cycle_states[offset]]]
+            override_keys.append(variant * amount_of_states + states)
+            override_distances.append(calculate_wall_distances(base_walls[states >> 2] ^ numpy.isin(states >> 2, cells)))
+
+        top_row_cells = cells[cells < width]
+        if len(top_row_cells):
+            top_row = board_array[0].copy()
+            top_row[top_row_cells] = numpy.where(top_row[top_row_cells] == BOARD_WALL, BOARD_OPEN, BOARD_WALL)
+            open_columns = numpy.flatnonzero(top_row == BOARD_OPEN)
+            if not len(open_columns):
+                raise RuntimeError(f"Variant {variant} walls off the whole top row, there is no open cell left to start on.")
+            start_states.append(int(open_columns[0]) * 4 + Direction.E.value)
+        else:
+            start_states.append(base_start_state)
+
+    override_keys = numpy.concatenate(override_keys) if override_keys else numpy.zeros(0, dtype=numpy.int64)
+    override_distances = numpy.concatenate(override_distances) if override_distances else numpy.zeros(0, dtype=numpy.int64)
+    order = numpy.argsort(override_keys, kind='stable')
+    return WallVariants(override_keys[order], override_distances[order], numpy.array(start_states, dtype=numpy.int64))
+
+
+def lookup_wall_distances(jump_arrays: JumpArrays, wall_variants: WallVariants, variants: numpy.ndarray, states: numpy.ndarray) -> numpy.ndarray:
+    """Returns the wall distance of every state, in its own variant: the override if there is one, otherwise the one of the base board"""
+    wall_distances = jump_arrays.wall_distances[states]
+    override_keys = wall_variants.override_keys
+    if len(override_keys) == 0:
+        return wall_distances
+
+    keys = variants * len(jump_arrays.cycle_offsets) + states
+    indices = numpy.minimum(numpy.searchsorted(override_keys, keys), len(override_keys) - 1)
+    return numpy.where(override_keys[indices] == keys, wall_variants.override_distances[indices], wall_distances)
+
+
+def simulate_wall_variants(
+    jump_arrays: JumpArrays,
+    wall_variants: WallVariants,
+    path_to_follow: str
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Main function for the wall variants.
+
+    Every variant gets a walker at its own start state, and all walkers follow the same path together.
+    A rotation is the same for every walker, a move is cut off at the wall distance of each walker in its own variant.
+
+    Returns the final rows, columns, direction values and the custom scoring values for AoC2022 day 22, one per variant.
+    """
+    states = wall_variants.start_states.copy()
+    variants = numpy.arange(len(states), dtype=numpy.int64)
+    cycle_states, cycle_offsets, cycle_positions, cycle_lengths = jump_arrays[1:5]
+
+    for action in encode_path(path_to_follow):
+        if action == ROTATE_LEFT:
+            states = (states & ~3) | ((states + 3) & 3)
+        elif action == ROTATE_RIGHT:
+            states = (states & ~3) | ((states + 1) & 3)
+        else:
+            steps = numpy.minimum(action, lookup_wall_distances(jump_arrays, wall_variants, variants, states))
+            lengths = cycle_lengths[states]
+            states = cycle_states[cycle_offsets[states] + (cycle_positions[states] + steps % lengths) % lengths]
+
+    rows, columns, directions = unpack_states(states, jump_arrays.width)
+    return rows, columns, directions, 1000 * (rows + 1) + 4 * (columns + 1) + directions
+
+
+def simulate_wall_variants_on_board(
+    board_map: Board,
+    path_to_follow: str,
+    overlays: List[List[Coordinates]],
+    part: int = 1
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Helper function to run a path against variants of a board, without building the jump arrays and the variants yourself.
+    Every overlay is a list of cells (row, column) that are toggled from open to wall or back (see build_wall_variants).
+
+    Returns the final rows, columns, direction values and the custom scoring values for AoC2022 day 22, one per overlay.
+
+    Example:
+    simulate_wall_variants_on_board(board_map, '10R5L5R10L4R5L5', [[], [(0, 9)], [(5, 10), (6, 10)]], part=2)
+    """
+    jump_arrays = get_jump_arrays(board_map, part)
+    return simulate_wall_variants(jump_arrays, build_wall_variants(board_map, jump_arrays, overlays), path_to_follow)
@@ -0,0 +1,161 @@
+from typing import List, NamedTuple
+import argparse
+import hashlib
+import os
+import shutil
+import numpy
+
+from monkey_map import NEWLINE_BYTE, JumpArrays, build_jump_arrays, convert_board_map_to_array, pad_board_map
+from monkey_map import decode_board_rows, read_input_bytes, read_path_chunks, traverse_board_map, traverse_cube
+
+
+
+# BOARD CACHE
+# The padded board and the jump arrays of both parts are stored on disk, keyed by a hash of the board section of the input file.
+# Re-running the same board with another path then skips the padding and the precompute, only the path is read.
+# Every entry is a directory of .npy files, so the arrays can be memory-mapped when loaded.
+# The cache has a size cap, the least recently used entries are evicted first (the mtime of an entry is its last use).
+
+
+DEFAULT_CACHE_DIR = '.monkey_map_cache'
+DEFAULT_CACHE_SIZE = 1 << 30
+
+# Every array of the jump arrays is stored in its own .npy file, part{part}_{field}.npy
+CACHED_JUMP_ARRAY_FIELDS = JumpArrays._fields[1:]
+
+
+class CachedBoard(NamedTuple):
+    """
+    Helper class for a board in the cache:
+    - key: the hash of the board section (see hash_board_bytes)
+    - entry_dir: the directory holding the .npy files of this board
+    - board_map: the padded board as a numpy array (see convert_board_map_to_array), memory-mapped
+    """
+    key: str
+    entry_dir: str
+    board_map: numpy.ndarray
+
+
+def hash_board_bytes(board_bytes: memoryview) -> str:
+    """
+    Returns the sha256 hash of the board section, straight from the bytes of the input file (see read_input_bytes),
+    so the board is not decoded. The newlines after the last row are left out, so the hash does not depend on them.
+    """
+    board_end = len(board_bytes)
+    while board_end and board_bytes[board_end - 1] == NEWLINE_BYTE:
+        board_end -= 1
+    return hashlib.sha256(board_bytes[:board_end]).hexdigest()
+
+
+def save_array_atomic(file_name: str, array: numpy.ndarray) -> None:
+    """
+    Saves an array as a .npy file, by writing to a temporary file first and renaming it.
+    This way a reader (maybe another process) never sees a half written file.
+    """
+    temporary_file_name = f"{file_name}.{os.getpid()}.tmp.npy"
+    numpy.save(temporary_file_name, array)
+    os.replace(temporary_file_name, file_name)
+
+
+def calculate_entry_size(entry_dir: str) -> int:
+    """Returns the size of all files in a cache entry, in bytes"""
+    return sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+
+
+def evict_cache_entries(cache_dir: str, max_bytes: int, keep_key: str = None) -> List[str]:
+    """
+    Evicts the least recently used entries (by mtime), until the whole cache fits in max_bytes.
+    The entry of keep_key is never evicted, as it is in use.
+
+    Returns the keys of the evicted entries.
+    """
+    entries = [(entry.stat().st_mtime, entry.name, calculate_entry_size(entry.path))
+               for entry in os.scandir(cache_dir) if entry.is_dir()]
+    total_size = sum(size for _, _, size in entries)
+
+    evicted_keys = []
+    for _, key, size in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        if key == keep_key:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total_size -= size
+        evicted_keys.append(key)
+
+    return evicted_keys
+
+
+def open_cached_board(input_file: str, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE) -> CachedBoard:
+    """
+    Reads the bytes of the board section of the input file and looks them up in the cache.
+    On a miss, the board is decoded, padded, converted to a numpy array and stored.
+    On a hit the board is never decoded, the stored array is memory-mapped.
+    Either way the entry is marked as used, and the cache is trimmed to max_bytes.
+
+    Returns the cached board, see CachedBoard.
+    """
+    board_bytes = read_input_bytes(input_file, with_path=False)[0]
+
+    key = hash_board_bytes(board_bytes)
+    entry_dir = os.path.join(cache_dir, key)
+    board_file_name = os.path.join(entry_dir, 'board.npy')
+
+    if not os.path.exists(board_file_name):
+        os.makedirs(entry_dir, exist_ok=True)
+        save_array_atomic(board_file_name, convert_board_map_to_array(pad_board_map(decode_board_rows(board_bytes))))
+
+    os.utime(entry_dir)
+    evict_cache_entries(cache_dir, max_bytes, keep_key=key)
+    return CachedBoard(key, entry_dir, numpy.load(board_file_name, mmap_mode='r'))
+
+
+def get_cached_jump_arrays(cached_board: CachedBoard, part: int, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE) -> JumpArrays:
+    """
+    Looks up the jump arrays of part 1 or part 2 for a cached board (see open_cached_board).
+    On a miss, the jump arrays are built and stored. On a hit, the stored arrays are memory-mapped, nothing is converted.
+
+    Returns the jump arrays, see JumpArrays.
+    """
+    file_names = [os.path.join(cached_board.entry_dir, f"part{part}_{field}.npy") for field in CACHED_JUMP_ARRAY_FIELDS]
+
+    if all(os.path.exists(file_name) for file_name in file_names):
+        return JumpArrays(cached_board.board_map.shape[1], *(numpy.load(file_name, mmap_mode='r') for file_name in file_names))
+
+    jump_arrays = build_jump_arrays(cached_board.board_map, part)
+    for file_name, array in zip(file_names, jump_arrays[1:]):
+        save_array_atomic(file_name, array)
+    evict_cache_entries(cache_dir, max_bytes, keep_key=cached_board.key)
+    return jump_arrays
+
+
+def traverse_cached(input_file: str, part: int, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE) -> int:
+    """
+    Solves part 1 or part 2 for the input file, with the board and its jump arrays from the cache.
+    Only the path is read from the input file (see read_path_chunks).
+
+    Returns the final score.
+    """
+    cached_board = open_cached_board(input_file, cache_dir, max_bytes)
+    jump_arrays = get_cached_jump_arrays(cached_board, part, cache_dir, max_bytes)
+    traverse = traverse_board_map if part == 1 else traverse_cube
+    return traverse(cached_board.board_map, read_path_chunks(input_file), jump_arrays=jump_arrays)
+
+
+
+# MAIN
+
+def main(input_file: str, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE) -> None:
+    """Solves both parts for the input file, with the board and its jump arrays from the cache"""
+    print(f"Part 1 - Answer: \t{traverse_cached(input_file, 1, cache_dir, max_bytes)}")
+    print(f"Part 2 - Answer: \t{traverse_cached(input_file, 2, cache_dir, max_bytes)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves the Monkey Map problem from AoC2022 day 22, with a cache of boards and jump arrays.")
+    parser.add_argument('input_file', help="the input file, with the board and the path to follow")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f"the cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help="the size cap of the cache in bytes (default: 1 GiB)")
+    arguments = parser.parse_args()
+
+    main(arguments.input_file, arguments.cache_dir, arguments.cache_size)
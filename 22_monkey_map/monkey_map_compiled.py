@@ -0,0 +1,295 @@
+from typing import List, Optional, Tuple, Union
+import itertools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+
+from monkey_map import BOARD_OPEN, PATH_TOKEN_PATTERN, Board, Direction, JumpArrays, convert_board_map_to_array, get_jump_arrays, get_starting_coordinates, traverse_board_map, traverse_cube
+from monkey_map import follow_path_packed, pack_jump_arrays, pack_state, unpack_state
+from monkey_map_batch import ROTATE_LEFT, ROTATE_RIGHT, build_action_table, encode_action_codes, encode_path, encode_paths, move_walkers
+from monkey_map_batch import pack_states, unpack_states
+
+
+
+# COMPILED PATHS
+# A (part of a) path is compiled into a mapping: an int array giving the final state for every possible start state.
+# Mappings can be composed, and a block repeated k times only needs log(k) compositions (exponentiation by squaring).
+
+
+def compose_mappings(first_mapping: numpy.ndarray, second_mapping: numpy.ndarray) -> numpy.ndarray:
+    """Returns the mapping of doing first_mapping and then second_mapping, which is a single gather"""
+    return second_mapping[first_mapping]
+
+
+def power_mapping(mapping: numpy.ndarray, repeats: int) -> numpy.ndarray:
+    """
+    Calculates the mapping of doing the same mapping repeats times, with exponentiation by squaring.
+    The mapping is squared for every bit of repeats, and added to the result for every bit that is set.
+
+    Returns the repeated mapping.
+
+    Example:
+    Repeating 13 (1101 in binary) times is mapping^1, mapping^4 and mapping^8 after each other, 5 compositions instead of 12.
+    """
+    repeated_mapping = numpy.arange(len(mapping), dtype=mapping.dtype)
+    while repeats:
+        if repeats & 1:
+            repeated_mapping = compose_mappings(repeated_mapping, mapping)
+        mapping = compose_mappings(mapping, mapping)
+        repeats >>= 1
+    return repeated_mapping
+
+
+def compile_action_codes(action_table: numpy.ndarray, action_codes: numpy.ndarray) -> numpy.ndarray:
+    """
+    Compiles a list of action codes (see encode_action_codes) into a single mapping.
+    Every action is a row of the action table, so this is one gather over all states per action.
+
+    Returns the mapping of the actions.
+    """
+    mapping = numpy.arange(action_table.shape[1], dtype=action_table.dtype)
+    for action_code in action_codes:
+        mapping = action_table[action_code][mapping]
+    return mapping
+
+
+def find_repeated_block(action_codes: numpy.ndarray) -> Tuple[int, int]:
+    """
+    Finds the shortest block of actions the whole list is made of, using the prefix function (as used by Knuth-Morris-Pratt).
+    The list is the block repeated a number of times, followed by the start of the block for what is left.
+
+    Returns a tuple of the block length and the amount of repeats.
+
+    Example:
+    10R5L 10R5L 10R5L 10 has a block of 4 actions (10, R, 5, L), repeated 3 times and followed by (10).
+    """
+    action_codes = action_codes.tolist()
+    if not action_codes:
+        return 0, 0
+
+    prefix_lengths = [0] * len(action_codes)
+    for index in range(1, len(action_codes)):
+        prefix_length = prefix_lengths[index - 1]
+        while prefix_length and action_codes[index] != action_codes[prefix_length]:
+            prefix_length = prefix_lengths[prefix_length - 1]
+        if action_codes[index] == action_codes[prefix_length]:
+            prefix_length += 1
+        prefix_lengths[index] = prefix_length
+
+    block_length = len(action_codes) - prefix_lengths[-1]
+    return block_length, len(action_codes) // block_length
+
+
+def compile_path(board_map: Board, path_to_follow: Union[str, List[str]], part: int, block_repeats: int = 1) -> numpy.ndarray:
+    """
+    Compiles the path to follow into a single mapping over all packed states (see pack_states) of the board.
+    The path is followed block_repeats times.
+
+    The path is searched for a repeated block (see find_repeated_block), so a path of k repeats costs
+    the states times the block length plus the states times log(k), instead of k times the path length.
+
+    Returns the mapping, which tells where every start state ends up.
+    """
+    jump_arrays = get_jump_arrays(board_map, part)
+    move_amounts, action_codes = encode_action_codes(encode_paths([path_to_follow])[0])
+    action_table = build_action_table(jump_arrays, move_amounts)
+
+    block_length, repeats = find_repeated_block(action_codes)
+    block_mapping = compile_action_codes(action_table, action_codes[:block_length])
+    rest_mapping = compile_action_codes(action_table, action_codes[block_length * repeats:])
+    path_mapping = compose_mappings(power_mapping(block_mapping, repeats), rest_mapping)
+
+    return power_mapping(path_mapping, block_repeats)
+
+
+def traverse_compiled(board_map: Board, path_to_follow: str, part: int, block_repeats: int = 1) -> int:
+    """
+    Main function for the compiled paths, gives the same result as traverse_board_map (part 1) or traverse_cube (part 2)
+    for the path repeated block_repeats times.
+
+    A path without a repeated block (see find_repeated_block) is not compiled, compiling it would cost the states times the path length,
+    instead only the start state is followed (see follow_actions_packed), which costs the path length.
+
+    Returns the custom scoring value for AoC2022 day 22.
+    """
+    width = len(board_map[0])
+    row, column = get_starting_coordinates(board_map)
+
+    if block_repeats == 1:
+        _, repeats = find_repeated_block(encode_action_codes(encode_paths([path_to_follow])[0])[1])
+        if repeats < 2:
+            packed_jump_table = pack_jump_arrays(get_jump_arrays(board_map, part))
+            row, column, direction = unpack_state(follow_path_packed(packed_jump_table, pack_state(row, column, Direction.E, width), path_to_follow), width)
+            return 1000 * (row + 1) + 4 * (column + 1) + direction.value
+
+    mapping = compile_path(board_map, path_to_follow, part, block_repeats)
+    rows, columns, directions = unpack_states(mapping[pack_states(row, column, Direction.E.value, width)], width)
+    return int(1000 * (rows + 1) + 4 * (columns + 1) + directions)
+
+
+
+# PARALLEL COMPOSITION
+# A single very long path is split into chunks, and every chunk is compiled into a mapping in its own worker process.
+# The mappings are then composed in order, which gives the mapping of the whole path.
+# Compiling a chunk does not follow every state separately: walls make trajectories merge,
+# so after a few hundred actions only a handful of distinct states is left to follow (see compile_chunk).
+
+
+# Below this amount of actions, traverse_parallel falls back to the sequential traversal.
+# The crossover depends on the amount of cores, so there is no default: the parallel mode is opt-in,
+# measure the crossover on the machine with benchmark_parallel_crossover and pass it to traverse_parallel.
+# On a single core it is never worth it, 4M actions on a face of 50 take 4.4s sequential and 8.5s in parallel.
+DEFAULT_PARALLEL_CROSSOVER = None
+
+# A rotation, where the path can be split into chunks without splitting a move amount
+ROTATION_PATTERN = re.compile(r'[LR]')
+
+# Amount of actions between merging the states that ended up the same
+MERGE_INTERVAL = 64
+
+# Once this few distinct states are left, they are followed one by one with ints instead of numpy arrays (see follow_encoded_actions)
+SEQUENTIAL_STATES = 4
+
+# Set in every worker process by initialize_chunk_worker, so the jump arrays are sent once per worker instead of once per chunk
+CHUNK_WORKER_JUMP_ARRAYS = None
+CHUNK_WORKER_JUMP_LISTS = None
+CHUNK_WORKER_OPEN_STATES = None
+
+
+def follow_encoded_actions(jump_lists: List[List[int]], state: int, actions: List[int]) -> int:
+    """
+    Follows encoded actions (see encode_path) from a single packed state, with the jump arrays as lists of ints.
+    This is the same as follow_actions_packed, only with the actions encoded as ints.
+
+    Returns the final packed state.
+    """
+    cycle_states, cycle_offsets, cycle_positions, cycle_lengths, wall_distances = jump_lists
+
+    for action in actions:
+        if action == ROTATE_LEFT:
+            state = (state & ~3) | ((state + 3) & 3)
+        elif action == ROTATE_RIGHT:
+            state = (state & ~3) | ((state + 1) & 3)
+        else:
+            steps = action if action < wall_distances[state] else wall_distances[state]
+            state = cycle_states[cycle_offsets[state] + (cycle_positions[state] + steps) % cycle_lengths[state]]
+
+    return state
+
+
+def compile_chunk(jump_arrays: JumpArrays, open_states: numpy.ndarray, actions: List[int], jump_lists: List[List[int]] = None) -> numpy.ndarray:
+    """
+    Compiles a chunk of encoded actions (see encode_path) into a mapping over all packed states, starting from every open state.
+    Only the distinct states are followed: every MERGE_INTERVAL actions the states that ended up the same are merged,
+    and inverse keeps track of which distinct state every open state became.
+    Once SEQUENTIAL_STATES or fewer are left, the rest of the chunk is followed state by state (see follow_encoded_actions),
+    jump_lists are the jump arrays (without the width) as lists, they are made from jump_arrays when not given.
+
+    Returns the mapping of the chunk, states that are not open are mapped onto themselves.
+
+    Example:
+    Two walkers that both walk into the same wall end up on the same state, from then on only one of them is followed.
+    """
+    states = open_states
+    inverse = numpy.arange(len(open_states))
+
+    for index, action in enumerate(actions):
+        if action == ROTATE_LEFT:
+            states = (states & ~3) | ((states + 3) & 3)
+        elif action == ROTATE_RIGHT:
+            states = (states & ~3) | ((states + 1) & 3)
+        else:
+            states = move_walkers(jump_arrays, states, action)
+
+        if index % MERGE_INTERVAL == MERGE_INTERVAL - 1 and len(states) > 1:
+            states, merged_inverse = numpy.unique(states, return_inverse=True)
+            inverse = merged_inverse[inverse]
+
+        if len(states) <= SEQUENTIAL_STATES:
+            if jump_lists is None:
+                jump_lists = [jump_array.tolist() for jump_array in jump_arrays[1:]]
+            states = numpy.array([follow_encoded_actions(jump_lists, state, actions[index + 1:]) for state in states.tolist()], dtype=numpy.int64)
+            break
+
+    mapping = numpy.arange(len(jump_arrays.cycle_offsets), dtype=numpy.int64)
+    mapping[open_states] = states[inverse]
+    return mapping
+
+
+def initialize_chunk_worker(jump_arrays: JumpArrays, open_states: numpy.ndarray) -> None:
+    """Stores the jump arrays (also as lists) and the open states in the worker process, see CHUNK_WORKER_JUMP_ARRAYS"""
+    global CHUNK_WORKER_JUMP_ARRAYS, CHUNK_WORKER_JUMP_LISTS, CHUNK_WORKER_OPEN_STATES
+    CHUNK_WORKER_JUMP_ARRAYS, CHUNK_WORKER_OPEN_STATES = jump_arrays, open_states
+    CHUNK_WORKER_JUMP_LISTS = [jump_array.tolist() for jump_array in jump_arrays[1:]]
+
+
+def compile_chunk_in_worker(path_chunk: str) -> numpy.ndarray:
+    """Encodes and compiles a chunk of the path in a worker process, see compile_chunk"""
+    return compile_chunk(CHUNK_WORKER_JUMP_ARRAYS, CHUNK_WORKER_OPEN_STATES, encode_path(path_chunk), CHUNK_WORKER_JUMP_LISTS)
+
+
+def split_path(path_to_follow: str, amount_of_chunks: int) -> List[str]:
+    """
+    Splits the path to follow into (about) equally long chunks, cutting right after a rotation so no move amount is split.
+    This way every worker encodes its own chunk, instead of encoding the whole path up front.
+
+    Returns the chunks, in order.
+    """
+    chunks = []
+    start = 0
+    for chunk in range(1, amount_of_chunks):
+        rotation = ROTATION_PATTERN.search(path_to_follow, chunk * len(path_to_follow) // amount_of_chunks)
+        if rotation is None:
+            break
+        if rotation.end() > start:
+            chunks.append(path_to_follow[start:rotation.end()])
+            start = rotation.end()
+    chunks.append(path_to_follow[start:])
+    return chunks
+
+
+def compile_path_parallel(board_map: Board, path_to_follow: str, part: int, workers: int = None, amount_of_chunks: int = None) -> numpy.ndarray:
+    """
+    Compiles the path to follow into a single mapping over all packed states, just like compile_path,
+    by compiling amount_of_chunks chunks (one per worker by default) in a pool of worker processes and composing them in order.
+
+    Returns the mapping, which tells where every open start state ends up.
+    """
+    board_array = board_map if isinstance(board_map, numpy.ndarray) else convert_board_map_to_array(board_map)
+    jump_arrays = get_jump_arrays(board_array, part)
+    open_states = numpy.flatnonzero(numpy.repeat(board_array.ravel() == BOARD_OPEN, 4))
+
+    workers = workers or os.cpu_count()
+    chunks = split_path(path_to_follow, amount_of_chunks or workers)
+
+    mapping = numpy.arange(len(jump_arrays.cycle_offsets), dtype=numpy.int64)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initialize_chunk_worker, initargs=(jump_arrays, open_states)) as executor:
+        for chunk_mapping in executor.map(compile_chunk_in_worker, chunks):
+            mapping = compose_mappings(mapping, chunk_mapping)
+    return mapping
+
+
+def count_actions(path_to_follow: str, limit: int) -> int:
+    """Counts the actions (move amounts and rotations) of the path to follow, like iterate_path_tokens parses them, stops counting at limit"""
+    return sum(1 for _ in itertools.islice(PATH_TOKEN_PATTERN.finditer(path_to_follow), limit))
+
+
+def traverse_parallel(board_map: Board, path_to_follow: str, part: int, workers: int = None, crossover: Optional[int] = DEFAULT_PARALLEL_CROSSOVER) -> int:
+    """
+    Main function for the parallel composition, gives the same result as traverse_board_map (part 1) or traverse_cube (part 2).
+    A path with fewer actions than crossover is not worth starting worker processes for, it is followed sequentially.
+    Without a crossover the path is always followed sequentially, pass the crossover measured with benchmark_parallel_crossover
+    (or 0 to always run in parallel).
+
+    Returns the custom scoring value for AoC2022 day 22.
+    """
+    if crossover is None or count_actions(path_to_follow, crossover) < crossover:
+        return traverse_board_map(board_map, path_to_follow) if part == 1 else traverse_cube(board_map, path_to_follow)
+
+    mapping = compile_path_parallel(board_map, path_to_follow, part, workers)
+
+    width = len(board_map[0])
+    row, column = get_starting_coordinates(board_map)
+    rows, columns, directions = unpack_states(mapping[pack_states(row, column, Direction.E.value, width)], width)
+    return int(1000 * (rows + 1) + 4 * (columns + 1) + directions)
@@ -0,0 +1,183 @@
+from typing import List, NamedTuple, Optional
+import argparse
+import array
+import numpy
+
+from monkey_map import PACKED_ROTATION_DELTAS, Board, Direction, JumpArrays, State, get_jump_arrays, get_starting_coordinates
+from monkey_map import pack_state, process_input_file
+from monkey_map_batch import ROTATE_LEFT, ROTATE_RIGHT
+
+
+
+# STATE GRAPH QUERIES
+# The board and its wrap rules (part 1) or cube seams (part 2) make up a graph over the packed states (see pack_state).
+# Every state has an edge for both rotations, and one for every move amount, up to the wall (or up to max_move).
+# This graph is never stored edge by edge, the jump arrays of the board already hold it (see get_jump_arrays):
+# the moves of a state are the states after it on its cycle, up to the wall distance.
+#
+# A breadth first search over this graph gives the least amount of actions to reach every state from a start state.
+# Moving N steps only reaches further along the same cycle, so a move stops sweeping along its cycle
+# as soon as it runs into a state that another move already swept past. This way every state is passed a few times at most,
+# instead of once for every move amount, which keeps the search linear in the amount of states.
+
+
+class StateSearch(NamedTuple):
+    """
+    Helper class to store the result of a breadth first search over the state graph (see search_states):
+    - width, height: the size of the board, needed to pack and unpack states
+    - levels: for every packed state, the least amount of actions to reach it (-1 if it cannot be reached)
+    - parents: for every packed state, the state it is reached from (-1 for the start state, or if it cannot be reached)
+    - parent_actions: for every packed state, the action it is reached with (ROTATE_LEFT, ROTATE_RIGHT or the move amount)
+    """
+    width: int
+    height: int
+    levels: numpy.ndarray
+    parents: numpy.ndarray
+    parent_actions: numpy.ndarray
+
+
+def build_state_graph(board_map: Board, part: int) -> JumpArrays:
+    """
+    Builds the state graph of a board, with the wrap rules of part 1 or the cube seams of part 2.
+
+    Returns the jump arrays of the board, which hold every edge of the graph (see the STATE GRAPH QUERIES comment).
+    """
+    return get_jump_arrays(board_map, part)
+
+
+def search_states(state_graph: JumpArrays, start_state: int, max_move: int = None) -> StateSearch:
+    """
+    Runs a breadth first search over the state graph from the start state, one level (amount of actions) at a time.
+    Every state of the current level first gets its rotations, then its moves (up to the wall, or up to max_move steps).
+
+    Without max_move, a state reached by a move had its whole stretch up to the wall swept by that move already,
+    so a later move sweeping along the same cycle stops there. With max_move, only a state that swept itself can stop a sweep.
+
+    Returns the result of the search, see StateSearch.
+    """
+    width, cycle_states, cycle_offsets, cycle_positions, cycle_lengths, wall_distances = state_graph
+    amount_of_states = len(cycle_offsets)
+    cycle_states, cycle_offsets = array.array('q', cycle_states.tobytes()), array.array('q', cycle_offsets.tobytes())
+    cycle_positions, cycle_lengths = array.array('q', cycle_positions.tobytes()), array.array('q', cycle_lengths.tobytes())
+    wall_distances = array.array('q', wall_distances.tobytes())
+
+    levels = array.array('q', [-1]) * amount_of_states
+    parents = array.array('q', [-1]) * amount_of_states
+    parent_actions = array.array('q', [0]) * amount_of_states
+    swept = bytearray(amount_of_states)
+    rotations = ((ROTATE_RIGHT, PACKED_ROTATION_DELTAS['R']), (ROTATE_LEFT, PACKED_ROTATION_DELTAS['L']))
+
+    levels[start_state] = 0
+    frontier = [start_state]
+    level = 0
+    while frontier:
+        level += 1
+        next_frontier = []
+        for state in frontier:
+            for action, deltas in rotations:
+                next_state = state + deltas[state & 3]
+                if levels[next_state] == -1:
+                    levels[next_state], parents[next_state], parent_actions[next_state] = level, state, action
+                    next_frontier.append(next_state)
+
+            swept[state] = 1
+            offset, position, length = cycle_offsets[state], cycle_positions[state], cycle_lengths[state]
+            reach = min(wall_distances[state], length - 1)
+            if max_move is not None:
+                reach = min(reach, max_move)
+
+            for steps in range(1, reach + 1):
+                next_state = cycle_states[offset + (position + steps) % length]
+                if swept[next_state]:
+                    break
+                if levels[next_state] == -1:
+                    levels[next_state], parents[next_state], parent_actions[next_state] = level, state, steps
+                    next_frontier.append(next_state)
+                    if max_move is None:
+                        swept[next_state] = 1
+        frontier = next_frontier
+
+    return StateSearch(
+        width,
+        amount_of_states // 4 // width,
+        numpy.frombuffer(levels, dtype=numpy.int64),
+        numpy.frombuffer(parents, dtype=numpy.int64),
+        numpy.frombuffer(parent_actions, dtype=numpy.int64),
+    )
+
+
+def get_start_state(board_map: Board, start: State = None) -> int:
+    """Returns the packed start state, the given start (row, column, direction) or else the start of the board facing E"""
+    row, column, direction = start if start is not None else (*get_starting_coordinates(board_map), Direction.E)
+    return pack_state(row, column, direction, len(board_map[0]))
+
+
+def find_reachable_cells(state_search: StateSearch) -> numpy.ndarray:
+    """Returns a boolean array of the size of the board, telling which cells can be reached (facing any direction)"""
+    return (state_search.levels != -1).reshape(state_search.height, state_search.width, 4).any(axis=2)
+
+
+def find_instructions(state_search: StateSearch, target_state: int) -> Optional[List[str]]:
+    """
+    Walks back from the target state to the start state over the parents of the search.
+
+    Returns the actions to reach the target state ('L', 'R' or a move amount), or None if it cannot be reached.
+    """
+    if state_search.levels[target_state] == -1:
+        return None
+
+    actions = []
+    state = target_state
+    while state_search.parents[state] != -1:
+        action = int(state_search.parent_actions[state])
+        actions.append('L' if action == ROTATE_LEFT else 'R' if action == ROTATE_RIGHT else str(action))
+        state = int(state_search.parents[state])
+    return actions[::-1]
+
+
+def find_shortest_instructions(state_search: StateSearch, row: int, column: int, direction: Direction = None) -> Optional[List[str]]:
+    """
+    Finds the shortest instructions to reach the cell (row, column) facing direction, or facing any direction if it is not given.
+    Without max_move in the search, two moves never follow each other, so ''.join(actions) is a valid path to follow.
+
+    Returns the actions, or None if the cell cannot be reached.
+
+    Example:
+    state_search = search_states(build_state_graph(board_map, 2), get_start_state(board_map))
+    find_shortest_instructions(state_search, 5, 10, Direction.S)
+    """
+    directions = list(Direction) if direction is None else [direction]
+    target_states = [pack_state(row, column, target_direction, state_search.width) for target_direction in directions]
+    target_states = [state for state in target_states if state_search.levels[state] != -1]
+    if not target_states:
+        return None
+    return find_instructions(state_search, min(target_states, key=lambda state: state_search.levels[state]))
+
+
+
+# MAIN
+
+def main(input_file: str, part: int, target: State = None, max_move: int = None) -> None:
+    """Prints the amount of reachable cells from the start, and the shortest instructions to reach the target (if given)"""
+    board_map, _ = process_input_file(input_file, as_array=True)
+    state_search = search_states(build_state_graph(board_map, part), get_start_state(board_map), max_move)
+    print(f"Reachable cells: \t{int(find_reachable_cells(state_search).sum())}")
+
+    if target is not None:
+        row, column, direction = target
+        actions = find_shortest_instructions(state_search, row, column, direction)
+        print(f"Instructions: \t{'unreachable' if actions is None else ''.join(actions)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Answers reachability and shortest instruction queries for the Monkey Map problem (AoC2022 day 22).")
+    parser.add_argument('input_file', help="the input file, with the board (the path is ignored)")
+    parser.add_argument('--part', type=int, default=1, choices=(1, 2), help="wrap around the board (1) or over the cube (2)")
+    parser.add_argument('--target', type=int, nargs=3, metavar=('ROW', 'COLUMN', 'DIRECTION'), help="the target state, direction 0-3 is E, S, W, N")
+    parser.add_argument('--max-move', type=int, default=None, help="the largest move amount allowed in a single action")
+    arguments = parser.parse_args()
+
+    target = None
+    if arguments.target:
+        target = (arguments.target[0], arguments.target[1], Direction(arguments.target[2]))
+    main(arguments.input_file, arguments.part, target, arguments.max_move)
@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, Iterator, List, TextIO
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from monkey_map import load_board, read_path_chunks, traverse_board_map, traverse_cube
+
+
+
+# PROCESS POOL
+# Every input file is solved on its own (both parts), so a batch of input files is spread over a pool of processes.
+# Input files are handed out in chunks, to keep the overhead per file low when there are thousands of small files.
+
+
+def collect_input_files(paths: Iterable[str], pattern_suffix: str = '.txt') -> List[str]:
+    """
+    Collects the input files to solve: files are taken as is, directories are searched (not recursively)
+    for files ending with pattern_suffix, in sorted order.
+
+    Returns the list of input files.
+    """
+    input_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            input_files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                      if name.endswith(pattern_suffix) and os.path.isfile(os.path.join(path, name))))
+        else:
+            input_files.append(path)
+    return input_files
+
+
+def solve_input_file(input_file: str) -> Dict:
+    """
+    Solves both parts for a single input file, and times the loading and both parts.
+    Any error is caught and stored in the result, so one bad file does not stop the batch.
+    The scores of the parts that were solved before the error are kept.
+
+    Returns the result, which can be written out as a JSON line.
+    """
+    result = {'input_file': input_file, 'part1': None, 'part2': None, 'seconds': {}, 'error': None}
+
+    try:
+        start_time = time.perf_counter()
+        board_map = load_board(input_file)
+        result['seconds']['load'] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        result['part1'] = traverse_board_map(board_map, read_path_chunks(input_file))
+        result['seconds']['part1'] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        result['part2'] = traverse_cube(board_map, read_path_chunks(input_file))
+        result['seconds']['part2'] = time.perf_counter() - start_time
+    except Exception as error:
+        result['error'] = f"{type(error).__name__}: {error}"
+
+    return result
+
+
+def solve_input_files_chunk(input_files: List[str]) -> List[Dict]:
+    """Solves a chunk of input files in one worker (see solve_input_file)"""
+    return [solve_input_file(input_file) for input_file in input_files]
+
+
+def solve_input_files(input_files: List[str], workers: int = None, chunk_size: int = 1) -> Iterator[Dict]:
+    """
+    Solves all input files with a process pool of workers processes (None uses every core).
+    The input files are handed out in chunks of chunk_size files.
+
+    Returns a generator of results (see solve_input_file), in the order the chunks finish.
+
+    Example:
+    With 1000 input files and a chunk_size of 10, 100 chunks are submitted to the pool,
+    and the 10 results of a chunk are yielded as soon as that chunk is done.
+    """
+    chunks = [input_files[start:start + chunk_size] for start in range(0, len(input_files), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(solve_input_files_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def write_results(results: Iterable[Dict], f: TextIO) -> Dict[str, int]:
+    """
+    Streams the results to f as JSON lines, flushing after every line so the results show up as they finish.
+
+    Returns the amount of solved and failed input files.
+    """
+    summary = {'solved': 0, 'failed': 0}
+    for result in results:
+        f.write(json.dumps(result) + '\n')
+        f.flush()
+        summary['failed' if result['error'] else 'solved'] += 1
+    return summary
+
+
+
+# MAIN
+
+def main(paths: List[str], output_file: str = '-', workers: int = None, chunk_size: int = 1, pattern_suffix: str = '.txt') -> Dict[str, int]:
+    """
+    Solves both parts for every input file (or every input file in a directory) in paths,
+    and writes the results as JSON lines to output_file ('-' writes to stdout).
+
+    Returns the amount of solved and failed input files.
+    """
+    results = solve_input_files(collect_input_files(paths, pattern_suffix), workers, chunk_size)
+
+    if output_file == '-':
+        return write_results(results, sys.stdout)
+    with open(output_file, 'w') as f:
+        return write_results(results, f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves the Monkey Map problem from AoC2022 day 22 for many input files in parallel.")
+    parser.add_argument('paths', nargs='+', help="the input files, or directories with input files")
+    parser.add_argument('--output', default='-', help="the JSONL file to write the results to, '-' for stdout (default)")
+    parser.add_argument('--workers', type=int, default=None, help="the amount of worker processes (default: every core)")
+    parser.add_argument('--chunk-size', type=int, default=1, help="the amount of input files handed to a worker at once")
+    parser.add_argument('--suffix', default='.txt', help="the suffix of the input files in a directory (default: .txt)")
+    arguments = parser.parse_args()
+
+    summary = main(arguments.paths, arguments.output, arguments.workers, arguments.chunk_size, arguments.suffix)
+    print(f"Solved {summary['solved']} input files, {summary['failed']} failed.", file=sys.stderr)
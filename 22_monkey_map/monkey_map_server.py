@@ -0,0 +1,221 @@
+from typing import Dict, List, NamedTuple
+import argparse
+import asyncio
+import collections
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+
+from monkey_map import BOARD_OPEN, Direction, PackedJumpTable, follow_path_packed, get_jump_arrays, get_starting_coordinates, pack_jump_arrays
+from monkey_map import pack_state, process_input_file, unpack_state
+
+
+
+# QUERY SERVER
+# A long-running local server, which loads boards once and keeps their packed jump tables in memory.
+# Every request and response is a single line of JSON, over a Unix socket or a localhost TCP connection:
+# - {"op": "load", "board": "name", "input_file": "input.txt"} loads a board and precomputes the jump tables of both parts
+# - {"op": "query", "board": "name", "path": "10R5L5", "part": 2, "start": [0, 8, 0]} follows the path (start is optional)
+# - {"op": "stats"} gives the latency percentiles of the queries and the queue depth
+# Queries run on a thread pool, the boards are shared between them and never changed after loading.
+
+
+# Amount of query latencies kept for the percentiles
+LATENCY_WINDOW = 10000
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class LoadedBoard(NamedTuple):
+    """
+    Helper class for a board loaded by the server:
+    - width: the width of the board, needed to pack and unpack states
+    - cells: the cells of the board row after row (see convert_board_map_to_array), to check that a start is on an open cell
+    - start_state: the packed start state (see pack_state)
+    - packed_jump_tables: the packed jump table for every part (see pack_jump_arrays)
+    """
+    width: int
+    cells: numpy.ndarray
+    start_state: int
+    packed_jump_tables: Dict[int, PackedJumpTable]
+
+
+def load_board(input_file: str, parts: List[int] = (1, 2)) -> LoadedBoard:
+    """
+    Reads the board of an input file and precomputes the packed jump tables of the given parts.
+
+    Returns the loaded board, see LoadedBoard.
+    """
+    board_map, _ = process_input_file(input_file, as_array=True)
+    width = board_map.shape[1]
+    row, column = get_starting_coordinates(board_map)
+
+    packed_jump_tables = {}
+    for part in parts:
+        packed_jump_tables[part] = pack_jump_arrays(get_jump_arrays(board_map, part))
+    return LoadedBoard(width, board_map.ravel(), pack_state(row, column, Direction.E, width), packed_jump_tables)
+
+
+def run_query(loaded_board: LoadedBoard, path_to_follow: str, part: int, start: List[int] = None) -> Dict:
+    """
+    Follows the path on a loaded board, from start (row, column, direction value) or from the start of the board.
+    A start outside the board, or on a void cell or a wall, is rejected: the jump tables only hold the states on open cells.
+
+    Returns the score and the final state (row, column, direction value).
+    """
+    if part not in loaded_board.packed_jump_tables:
+        raise RuntimeError(f"Part {part} is not loaded for this board.")
+
+    state = loaded_board.start_state
+    if start is not None:
+        row, column, direction = start
+        height = len(loaded_board.cells) // loaded_board.width
+        if not (0 <= row < height and 0 <= column < loaded_board.width) or loaded_board.cells[row * loaded_board.width + column] != BOARD_OPEN:
+            raise RuntimeError(f"Start ({row}, {column}) is not an open cell of the board.")
+        state = pack_state(row, column, Direction(direction), loaded_board.width)
+
+    row, column, direction = unpack_state(follow_path_packed(loaded_board.packed_jump_tables[part], state, path_to_follow), loaded_board.width)
+    return {'score': 1000 * (row + 1) + 4 * (column + 1) + direction.value, 'state': [row, column, direction.value]}
+
+
+def calculate_percentiles(latencies: List[float], percentiles: List[int] = LATENCY_PERCENTILES) -> Dict[str, float]:
+    """Returns the given percentiles of the latencies in milliseconds, as {'p50': ..., 'p90': ..., 'p99': ...}"""
+    if not latencies:
+        return {f"p{percentile}": None for percentile in percentiles}
+    values = numpy.percentile(numpy.array(latencies) * 1000, percentiles)
+    return {f"p{percentile}": float(value) for percentile, value in zip(percentiles, values)}
+
+
+class QueryServer:
+    """
+    Keeps the loaded boards, and answers the requests of every connection (see the QUERY SERVER comment for the requests).
+    Loading and querying run on a thread pool, so the event loop keeps accepting requests in the meantime.
+    The queue depth is the amount of queries that are waiting or running.
+
+    Example:
+    server = QueryServer(workers=4)
+    await server.start(unix_path='/tmp/monkey_map.sock')
+    await server.serve_forever()
+    """
+
+    def __init__(self, workers: int = None):
+        self.boards: Dict[str, LoadedBoard] = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.queries = 0
+        self.server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, unix_path: str = None) -> None:
+        """Starts listening on the Unix socket at unix_path, or else on host and port (port 0 picks a free port, see address)"""
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+
+    @property
+    def address(self):
+        """The address the server listens on, (host, port) or the path of the Unix socket"""
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        """Keeps serving until cancelled"""
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        """Stops listening, and shuts down the thread pool"""
+        self.server.close()
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers every request line of a connection, in order, until the client closes it"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write((json.dumps(await self.handle_request(line)) + '\n').encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_request(self, line: bytes) -> Dict:
+        """
+        Handles a single request line. Any error is sent back in the response, instead of closing the connection.
+
+        Returns the response.
+        """
+        try:
+            request = json.loads(line)
+            operation = request.get('op')
+            loop = asyncio.get_running_loop()
+
+            if operation == 'query':
+                return await self.handle_query(request)
+            if operation == 'load':
+                loaded_board = await loop.run_in_executor(self.executor, load_board, request['input_file'], request.get('parts', (1, 2)))
+                self.boards[request['board']] = loaded_board
+                return {'board': request['board'], 'parts': sorted(loaded_board.packed_jump_tables)}
+            if operation == 'stats':
+                return self.get_stats()
+            raise RuntimeError(f"Unknown op {operation}, use load, query or stats.")
+
+        except Exception as error:
+            return {'error': f"{type(error).__name__}: {error}"}
+
+    async def handle_query(self, request: Dict) -> Dict:
+        """Runs a query on the thread pool, and keeps track of its latency and the queue depth"""
+        if request['board'] not in self.boards:
+            raise RuntimeError(f"Board {request['board']} is not loaded.")
+        loaded_board = self.boards[request['board']]
+
+        start_time = time.perf_counter()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, run_query, loaded_board, request['path'], request.get('part', 1), request.get('start'))
+        finally:
+            self.queue_depth -= 1
+            self.queries += 1
+            self.latencies.append(time.perf_counter() - start_time)
+
+    def get_stats(self) -> Dict:
+        """Returns the loaded boards, the amount of queries, the latency percentiles (in ms) and the queue depth"""
+        return {
+            'boards': sorted(self.boards),
+            'queries': self.queries,
+            'latency_ms': calculate_percentiles(list(self.latencies)),
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+
+
+# MAIN
+
+async def main(boards: List[str], host: str = '127.0.0.1', port: int = 8022, unix_path: str = None, workers: int = None) -> None:
+    """Loads the boards (given as name=input_file), and serves queries until interrupted"""
+    server = QueryServer(workers)
+    for board in boards:
+        name, input_file = board.split('=', 1)
+        print(await server.handle_request(json.dumps({'op': 'load', 'board': name, 'input_file': input_file}).encode()))
+
+    await server.start(host, port, unix_path)
+    print(f"Serving on {server.address}")
+    await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serves Monkey Map queries (AoC2022 day 22) on boards kept in memory.")
+    parser.add_argument('boards', nargs='*', help="boards to load at start, as name=input_file")
+    parser.add_argument('--host', default='127.0.0.1', help="the host to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8022, help="the port to listen on (default: 8022)")
+    parser.add_argument('--unix-socket', help="listen on this Unix socket instead of host and port")
+    parser.add_argument('--workers', type=int, default=None, help="the amount of threads running queries")
+    arguments = parser.parse_args()
+
+    asyncio.run(main(arguments.boards, arguments.host, arguments.port, arguments.unix_socket, arguments.workers))
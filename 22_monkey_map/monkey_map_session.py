@@ -0,0 +1,169 @@
+from typing import Dict, List, Tuple
+import numpy
+
+from monkey_map import BOARD_OPEN, BOARD_VOID, BOARD_WALL, Board, Direction, State, calculate_wall_distances, convert_board_map_to_array
+from monkey_map import get_jump_arrays, get_starting_coordinates, pack_jump_arrays, pack_state, unpack_state, PACKED_ROTATION_DELTAS
+from monkey_map_batch import ROTATE_LEFT, ROTATE_RIGHT, encode_path
+
+
+
+# TRAVERSAL SESSIONS
+# A session keeps the board, the path and the trajectory of one walker, so small changes do not need a rerun from scratch.
+# Every checkpoint_interval actions the (packed) state is stored as a checkpoint, and every move is recorded per cycle it walks on.
+# - appending actions resumes from the last checkpoint
+# - toggling a wall only updates the wall distances of the (at most 4) cycles through that cell,
+#   and replays from the first checkpoint after which a recorded move walks over (or was stopped by) that cell
+
+
+DEFAULT_CHECKPOINT_INTERVAL = 256
+
+
+class MoveRecord(Tuple[int, int, int, bool]):
+    """Type hinting class for a recorded move on a cycle (segment, start position on the cycle, steps taken, stopped by a wall)"""
+    pass
+
+
+class TraversalSession:
+    """
+    Follows a path on a board (part 1 or part 2), and keeps what is needed to update the result after a small change.
+
+    Example:
+    session = TraversalSession(board_map, '10R5L5R10L4R5L5', part=2)
+    session.append('R3')           # only replays the actions after the last checkpoint
+    session.toggle_wall(5, 10)     # only replays from the first checkpoint that walks over (5, 10)
+    session.score
+    """
+
+    def __init__(self, board_map: Board, path_to_follow: str = '', part: int = 1, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        board_array = numpy.array(board_map if isinstance(board_map, numpy.ndarray) else convert_board_map_to_array(board_map))
+        jump_arrays = get_jump_arrays(board_array, part)
+
+        self.part = part
+        self.checkpoint_interval = checkpoint_interval
+        self.width = board_array.shape[1]
+        self.cells = board_array.ravel()
+        # The jump arrays are shared by every traversal of this board, toggling a wall changes a copy of the wall distances
+        self.jump_arrays = jump_arrays._replace(wall_distances=jump_arrays.wall_distances.copy())
+        self.packed_jump_table = pack_jump_arrays(self.jump_arrays)
+
+        self.actions: List[int] = []
+        self.checkpoints: List[int] = [self.calculate_start_state()]
+        self.cycle_moves: Dict[int, List[MoveRecord]] = {}
+        self.state = self.checkpoints[0]
+        self.actions_replayed = 0
+
+        self.append(path_to_follow)
+
+    @property
+    def score(self) -> int:
+        """The custom scoring value for AoC2022 day 22, for the final state"""
+        row, column, direction = unpack_state(self.state, self.width)
+        return 1000 * (row + 1) + 4 * (column + 1) + direction.value
+
+    def get_checkpoints(self) -> List[State]:
+        """Returns the checkpoints as states (row, column, direction), checkpoint i is the state before action i * checkpoint_interval"""
+        return [unpack_state(state, self.width) for state in self.checkpoints]
+
+    def calculate_start_state(self) -> int:
+        """Returns the packed start state, the first open cell of the top row facing E"""
+        row, column = get_starting_coordinates(self.cells[:self.width].reshape(1, -1))
+        return pack_state(row, column, Direction.E, self.width)
+
+    def append(self, path_to_follow: str) -> int:
+        """
+        Appends the actions of path_to_follow to the path, and resumes from the last checkpoint.
+
+        Returns the new score.
+        """
+        self.actions.extend(encode_path(path_to_follow))
+        self.replay(len(self.checkpoints) - 1)
+        return self.score
+
+    def toggle_wall(self, row: int, column: int) -> int:
+        """
+        Turns an open cell into a wall, or a wall into an open cell.
+        The wall distances of every cycle through the cell are recalculated (the cycles themselves stay the same),
+        then the path is replayed from the first checkpoint whose trajectory walks over the cell or was stopped by it.
+        If the start state changes (the cell is on the top row), the whole path is replayed.
+
+        Raises a ValueError for a cell outside the board or in the void, only open cells and walls can be toggled.
+
+        Returns the new score.
+        """
+        if not (0 <= row < len(self.cells) // self.width and 0 <= column < self.width):
+            raise ValueError(f"Cell ({row}, {column}) is outside the board, only open cells and walls can be toggled.")
+        cell = row * self.width + column
+        if self.cells[cell] == BOARD_VOID:
+            raise ValueError(f"Cell ({row}, {column}) is not on the board, only open cells and walls can be toggled.")
+        self.cells[cell] = BOARD_WALL if self.cells[cell] == BOARD_OPEN else BOARD_OPEN
+
+        _, _, cycle_offsets, cycle_positions, cycle_lengths, _ = self.packed_jump_table
+        first_segment = len(self.checkpoints) - 1
+        for direction in Direction:
+            state = cell * 4 + direction.value
+            offset, position, length = cycle_offsets[state], cycle_positions[state], cycle_lengths[state]
+            self.update_wall_distances(offset)
+            first_segment = min(first_segment, self.find_first_segment_over(offset, position, length))
+
+        start_state = self.calculate_start_state()
+        if start_state != self.checkpoints[0]:
+            self.checkpoints[0] = start_state
+            first_segment = 0
+
+        self.replay(first_segment)
+        return self.score
+
+    def update_wall_distances(self, offset: int) -> None:
+        """Recalculates the wall distances of the cycle starting at offset in cycle_states (see calculate_wall_distances)"""
+        cycle_states = self.jump_arrays.cycle_states
+        cycle = cycle_states[offset:offset + self.jump_arrays.cycle_lengths[cycle_states[offset]]]
+        self.jump_arrays.wall_distances[cycle] = calculate_wall_distances(self.cells[cycle >> 2] == BOARD_WALL)
+
+    def find_first_segment_over(self, offset: int, position: int, length: int) -> int:
+        """
+        Finds the first segment (the actions between two checkpoints) with a recorded move on the cycle at offset,
+        that walks over the given position or was stopped by a wall on it.
+
+        Returns the segment, or the last segment if no recorded move comes near the position.
+        """
+        for segment, start_position, steps, hit_wall in self.cycle_moves.get(offset, []):
+            reach = steps + hit_wall
+            if reach >= length or (position - start_position) % length <= reach:
+                return segment
+        return len(self.checkpoints) - 1
+
+    def replay(self, segment: int) -> None:
+        """
+        Throws away the checkpoints and recorded moves after the checkpoint of segment,
+        and follows the path again from that checkpoint, storing new checkpoints and recording every move.
+        """
+        checkpoint_interval = self.checkpoint_interval
+        del self.checkpoints[segment + 1:]
+        for moves in self.cycle_moves.values():
+            while moves and moves[-1][0] >= segment:
+                moves.pop()
+
+        _, cycle_states, cycle_offsets, cycle_positions, cycle_lengths, wall_distances = self.packed_jump_table
+        rotate_right, rotate_left = PACKED_ROTATION_DELTAS['R'], PACKED_ROTATION_DELTAS['L']
+        cycle_moves = self.cycle_moves
+        state = self.checkpoints[segment]
+
+        for index in range(segment * checkpoint_interval, len(self.actions)):
+            if index % checkpoint_interval == 0 and index // checkpoint_interval == len(self.checkpoints):
+                self.checkpoints.append(state)
+
+            action = self.actions[index]
+            if action == ROTATE_RIGHT:
+                state += rotate_right[state & 3]
+            elif action == ROTATE_LEFT:
+                state += rotate_left[state & 3]
+            else:
+                wall_distance = wall_distances[state]
+                hit_wall = wall_distance < action
+                steps = wall_distance if hit_wall else action
+                offset, position = cycle_offsets[state], cycle_positions[state]
+                cycle_moves.setdefault(offset, []).append((index // checkpoint_interval, position, steps, hit_wall))
+                state = cycle_states[offset + (position + steps) % cycle_lengths[state]]
+
+        self.actions_replayed = len(self.actions) - segment * checkpoint_interval
+        self.state = state
@@ -0,0 +1,104 @@
+from benchmark_monkey_map import CUBE_NET_LAYOUTS, build_next_cell_table, compare_with_baseline, generate_board_map, generate_path, move_with_next_cell_table
+from benchmark_monkey_map import run_cold_start, time_function
+from monkey_map import build_cached_jump_arrays, get_jump_arrays
+from monkey_map import Direction, calculate_grid_size, calculate_vertex_map, get_starting_coordinates, iterate_path_tokens, move_part1
+from test_monkey_map import SAMPLE_BOARD_MAP
+
+# unit tests for the generators and the baseline comparison of the benchmarks
+
+
+def test_generate_board_map_is_a_cube():
+    for cube_net_layout in CUBE_NET_LAYOUTS:
+        # Act
+        board_map = generate_board_map(6, wall_density=0.2, cube_net_layout=cube_net_layout)
+
+        # Assert
+        assert calculate_grid_size(board_map) == 6
+        assert len(calculate_vertex_map(board_map)) == 7
+        assert len(set(len(board_row) for board_row in board_map)) == 1
+        row, column = get_starting_coordinates(board_map)
+        assert board_map[row][column] == '.'
+
+
+def test_generate_path():
+    # Act
+    path_to_follow = generate_path(1001, max_move_amount=9)
+
+    # Assert
+    actions = list(iterate_path_tokens(path_to_follow))
+    assert len(actions) == 1001
+    assert all(action.isdigit() and 1 <= int(action) <= 9 for action in actions[::2])
+    assert all(action in 'LR' for action in actions[1::2])
+
+
+def test_compare_with_baseline():
+    # Arrange
+    baseline = [{'name': 'traverse_cube[face_size=50]', 'seconds': 1.0}, {'name': 'traverse_board_map[face_size=50]', 'seconds': 1.0}]
+    results = [{'name': 'traverse_cube[face_size=50]', 'seconds': 1.6}, {'name': 'traverse_board_map[face_size=50]', 'seconds': 1.4}, {'name': 'new[face_size=50]', 'seconds': 9.0}]
+
+    # Act
+    regressions = compare_with_baseline(results, baseline, tolerance=1.5)
+    regressions_with_slack = compare_with_baseline(results, baseline, tolerance=1.5, min_seconds=1.0)
+
+    # Assert
+    assert len(regressions) == 1
+    assert regressions[0].startswith('traverse_cube[face_size=50]')
+    assert regressions_with_slack == []
+
+
+def test_time_function_pays_for_the_precompute_every_run():
+    # Arrange
+    cache_sizes = []
+
+    def precompute_sample():
+        cache_sizes.append(build_cached_jump_arrays.cache_info().currsize)
+        get_jump_arrays(SAMPLE_BOARD_MAP, 2)
+
+    # Act
+    time_function(precompute_sample, 3)
+
+    # Assert
+    assert cache_sizes == [0, 0, 0]
+
+
+def test_run_cold_start():
+    # Act
+    results = run_cold_start(repeat=1)
+
+    # Assert
+    assert [result['name'] for result in results] == ['cold_start_import[sample.txt]', 'cold_start_solve[sample.txt]', 'cold_start_process[sample.txt]']
+    assert all(result['seconds'] > 0 for result in results)
+    assert results[2]['seconds'] > results[0]['seconds'] + results[1]['seconds']
+
+
+# unit tests for the next cell table, which should always agree with move_part1
+
+def test_next_cell_table_wrap_over_empty_space():
+    # Arrange
+    board_map = [[' ', ' ', '.', '.', '#', '.', ' ', ' ']]
+
+    # Act
+    next_cell_table = build_next_cell_table(board_map)
+
+    # Assert
+    assert next_cell_table[Direction.E.value][0][5] == (0, 2)
+    assert next_cell_table[Direction.W.value][0][2] == (0, 5)
+    assert next_cell_table[Direction.E.value][0][3] == (0, 3)
+    assert next_cell_table[Direction.W.value][0][5] == (0, 5)
+    assert next_cell_table[Direction.E.value][0][4] is None
+
+
+def test_move_with_next_cell_table_matches_move_part1():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    next_cell_table = build_next_cell_table(board_map)
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            # Act
+            expected = move_part1(board_map, 37, direction, row, column)
+            actual = move_with_next_cell_table(next_cell_table, 37, direction, row, column)
+
+            # Assert
+            assert actual == expected
@@ -1,6 +1,31 @@
-from monkey_map import move, Direction
-
-# unit tests for the move function, as it is quite a complex beast -> splitting it up might be a good idea
+import gzip
+import lzma
+import numpy
+import os
+import pytest
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+from benchmark_monkey_map import write_input_file
+
+from monkey_map import move_part1, Direction, WrapSpans
+from monkey_map import VERTEX_MAP, GRID_SIZE, compile_portal_map, move_part2, reverse_direction, scale_vertex_map
+from monkey_map import calculate_grid_size, calculate_vertex_map, fold_cube_schedule, get_cube_geometry, traverse_board_map, traverse_cube
+from monkey_map import BOARD_OPEN, BOARD_VOID, BOARD_WALL, calculate_cube_schedule, convert_board_map_to_array, get_starting_coordinates
+from monkey_map import iterate_path_tokens, read_path_chunks
+from monkey_map import TRACE_MOVE_END, TRACE_MOVE_START, TRACE_ROTATION, TRACE_SEAM_CROSSING, TRACE_WALL_HIT, subscribe_trace, unsubscribe_trace
+from monkey_map import DIRECTION_VECTORS, Board, PortalMap, State, calculate_board_masks
+from monkey_map import follow_actions_packed, follow_path_packed, pack_state, rotate, unpack_state
+from monkey_map import NO_WALL, build_jump_arrays, get_jump_arrays, pack_jump_arrays
+from monkey_map import load_board_rows, pad_board_map, profile_main
+from monkey_map import build_sparse_board, move_part1_sparse, traverse_sparse_board
+from monkey_map import build_wall_index, find_steps_to_wall, move_part1_bitset
+from monkey_map import TRAJECTORY_STOP_END, TRAJECTORY_STOP_WALL, TrajectoryRecorder
+from monkey_map import load_board, load_input_file, process_input_file, read_input_bytes, scan_input_bytes
+from monkey_map import MoveMemo
+
+# unit tests for the move_part1 function, as it is quite a complex beast -> splitting it up might be a good idea
 
 def test_move_east_obstacle():
     # Arrange
@@ -13,7 +38,7 @@ def test_move_east_obstacle():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -31,7 +56,7 @@ def test_move_east_incomplete():
     start_column = 2
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -48,7 +73,7 @@ def test_move_east_incomplete_obstacle():
     start_column = 3
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -65,7 +90,7 @@ def test_move_east_free():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -84,7 +109,7 @@ def test_move_west_obstacle():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -102,7 +127,7 @@ def test_move_west_incomplete():
     start_column = 2
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -119,7 +144,7 @@ def test_move_west_incomplete_obstacle():
     start_column = 2
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -136,7 +161,7 @@ def test_move_west_free():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -155,7 +180,7 @@ def test_move_north_obstacle():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == obstacle_index + 1
@@ -173,7 +198,7 @@ def test_move_north_incomplete():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == 8 # hardcoded for speed reasons
@@ -190,7 +215,7 @@ def test_move_north_incomplete_obstacle():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == start_row
@@ -207,7 +232,7 @@ def test_move_north_free():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == (-1 * move_amount) % len(board_map)
@@ -226,7 +251,7 @@ def test_move_south_obstacle():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == obstacle_index - 1
@@ -244,7 +269,7 @@ def test_move_south_incomplete():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == 4 # hardcoded for speed reasons
@@ -261,7 +286,7 @@ def test_move_south_incomplete_obstacle():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == 9 # hardcoded for speed reasons
@@ -278,9 +303,940 @@ def test_move_south_free():
     start_column = 0
 
     # Act
-    final_row, final_column = move(board_map, move_amount, direction, start_row, start_column)
+    final_row, final_column = move_part1(board_map, move_amount, direction, start_row, start_column)
 
     # Assert
     assert final_row == move_amount % len(board_map)
     assert final_column == start_column
     assert board_map[final_row][final_column] == '.'
+
+
+SAMPLE_BOARD_MAP = [
+    '        ...#    ',
+    '        .#..    ',
+    '        #...    ',
+    '        ....    ',
+    '...#.......#    ',
+    '........#...    ',
+    '..#....#....    ',
+    '..........#.    ',
+    '        ...#....',
+    '        .....#..',
+    '        .#......',
+    '        ......#.',
+]
+
+SAMPLE_PATH = '10R5L5R10L4R5L5'
+
+
+def write_sample_input_file(path, board_map: list = SAMPLE_BOARD_MAP, path_to_follow: str = SAMPLE_PATH) -> str:
+    write_input_file(str(path), board_map, path_to_follow)
+    return str(path)
+
+
+# unit tests for the portal map and move_part2, using an empty board with the same layout as my own input
+
+def create_empty_cube_board_map() -> list:
+    layout = ['011', '010', '110', '100']
+    board_map = []
+    for layout_row in layout:
+        line = ''.join('.' * GRID_SIZE if face == '1' else ' ' * GRID_SIZE for face in layout_row)
+        board_map += [line] * GRID_SIZE
+    return board_map
+
+
+def test_portal_map_round_trip():
+    # Arrange
+    portal_map = compile_portal_map(scale_vertex_map(VERTEX_MAP, GRID_SIZE))
+
+    for (row, column, direction), (new_row, new_column, new_direction) in portal_map.items():
+        # Act
+        back_row, back_column, back_direction = portal_map[(new_row, new_column, reverse_direction(new_direction))]
+
+        # Assert
+        assert (back_row, back_column) == (row, column)
+        assert back_direction == reverse_direction(direction)
+
+    assert len(portal_map) == len(VERTEX_MAP) * 2 * GRID_SIZE
+
+
+def test_move_part2_over_edge():
+    # Arrange
+    board_map = create_empty_cube_board_map()
+    portal_map = compile_portal_map(scale_vertex_map(VERTEX_MAP, GRID_SIZE))
+    start_row = GRID_SIZE * 2 - 1
+    start_column = GRID_SIZE
+
+    # Act
+    final_row, final_column, final_direction = move_part2(board_map, portal_map, 3, Direction.W, start_row, start_column)
+
+    # Assert
+    assert final_row == GRID_SIZE * 2 + 2
+    assert final_column == GRID_SIZE - 1
+    assert final_direction == Direction.S
+
+
+def test_move_part2_obstacle_after_edge():
+    # Arrange
+    board_map = create_empty_cube_board_map()
+    obstacle_row = GRID_SIZE * 2 + 1
+    board_map[obstacle_row] = board_map[obstacle_row][:GRID_SIZE - 1] + '#' + board_map[obstacle_row][GRID_SIZE:]
+    portal_map = compile_portal_map(scale_vertex_map(VERTEX_MAP, GRID_SIZE))
+    start_row = GRID_SIZE * 2 - 1
+    start_column = GRID_SIZE
+
+    # Act
+    final_row, final_column, final_direction = move_part2(board_map, portal_map, 3, Direction.W, start_row, start_column)
+
+    # Assert
+    assert final_row == GRID_SIZE * 2
+    assert final_column == GRID_SIZE - 1
+    assert final_direction == Direction.S
+
+
+# reference jump table: the cycles are followed state by state with dictionaries, which is far too slow for a real board,
+# but easy to check by hand. build_jump_arrays and the packed followers are tested against it
+
+class JumpTable(NamedTuple):
+    """
+    Helper class to store the jump table of a board (see build_jump_table):
+    - cycles: every cycle of states you visit when walking straight ahead, ignoring walls
+    - cycle_positions: the (cycle index, position in that cycle) for every state on an open cell
+    - wall_distances: the amount of steps possible for every state on an open cell, before hitting a wall (-1 if there is no wall)
+    """
+    cycles: List[List[State]]
+    cycle_positions: Dict[State, Tuple[int, int]]
+    wall_distances: Dict[State, int]
+
+
+def calculate_cycles_part1(board_map: Board) -> List[List[State]]:
+    """
+    Walking straight ahead in part 1 (ignoring walls) always brings you back to where you started.
+    Every row gives a cycle going E and the reversed cycle going W, every column one going S and one going N.
+
+    Returns all cycles as lists of states, in walking order.
+    """
+    import numpy
+    cycles = []
+    void_mask, _ = calculate_board_masks(board_map)
+
+    for row in range(void_mask.shape[0]):
+        line = numpy.flatnonzero(~void_mask[row]).tolist()
+        if line:
+            cycles.append([(row, column, Direction.E) for column in line])
+            cycles.append([(row, column, Direction.W) for column in reversed(line)])
+
+    for column in range(void_mask.shape[1]):
+        line = numpy.flatnonzero(~void_mask[:, column]).tolist()
+        if line:
+            cycles.append([(row, column, Direction.S) for row in line])
+            cycles.append([(row, column, Direction.N) for row in reversed(line)])
+
+    return cycles
+
+
+def calculate_cycles_part2(board_map: Board, portal_map: PortalMap) -> List[List[State]]:
+    """
+    Walking straight ahead on the cube (ignoring walls) goes around the cube once, over 4 faces, and back to where you started.
+    The direction changes when crossing a seam, so these cycles are followed state by state using the portal map.
+
+    Returns all cycles as lists of states, in walking order.
+    """
+    import numpy
+    cycles = []
+    visited = set()
+    void_mask, _ = calculate_board_masks(board_map)
+
+    for row, column in numpy.argwhere(~void_mask).tolist():
+
+        for direction in Direction:
+            state = (row, column, direction)
+            cycle = []
+            while state not in visited:
+                visited.add(state)
+                cycle.append(state)
+
+                state_row, state_column, state_direction = state
+                state = portal_map.get(state)
+                if state is None:
+                    delta_row, delta_column = DIRECTION_VECTORS[state_direction.value]
+                    state = (state_row + delta_row, state_column + delta_column, state_direction)
+
+            if cycle:
+                cycles.append(cycle)
+
+    return cycles
+
+
+def calculate_cycles(board_map: Board, part: int) -> List[List[State]]:
+    """
+    Calculates the cycles for part 1 (wrapping around the board) or part 2 (wrapping around the cube).
+    For part 2 the portals come from the cube geometry of the board, see get_cube_geometry.
+
+    Returns all cycles as lists of states, in walking order.
+    """
+    if part == 1:
+        return calculate_cycles_part1(board_map)
+    if part == 2:
+        return calculate_cycles_part2(board_map, get_cube_geometry(board_map).portal_map)
+    raise RuntimeError(f"Unknown part {part}, there is only part 1 and part 2.")
+
+
+def build_jump_table(board_map: Board, cycles: List[List[State]]) -> JumpTable:
+    """
+    Precomputes, for every state on an open cell, where it lies on its cycle and how far the next wall is.
+
+    The distance to the wall is calculated by walking each cycle backwards, twice, starting right after a wall.
+    This way every state has seen the first wall in front of it by the second lap.
+
+    Returns the jump table, see JumpTable.
+
+    Example:
+    Cycle '..#.' going E from column 0 gives a distance of 1 for column 0, 0 for column 1 and 2 for column 3 (wrapping around).
+    """
+    cycle_positions = {}
+    wall_distances = {}
+    wall_mask = calculate_board_masks(board_map)[1].tolist()
+
+    for cycle_index, cycle in enumerate(cycles):
+        is_wall = [wall_mask[row][column] for row, column, _ in cycle]
+        for position in range(len(cycle)):
+            if not is_wall[position]:
+                cycle_positions[cycle[position]] = (cycle_index, position)
+                wall_distances[cycle[position]] = -1
+
+        if not any(is_wall):
+            continue
+
+        # A wall has a distance of -1, so the cell right before it can take 0 steps
+        distance = -1
+        for position in range(2 * len(cycle) - 1, -1, -1):
+            position %= len(cycle)
+            if is_wall[position]:
+                distance = -1
+            else:
+                distance += 1
+                wall_distances[cycle[position]] = distance
+
+    return JumpTable(cycles, cycle_positions, wall_distances)
+
+
+def move_with_jump_table(jump_table: JumpTable, move_amount: int, direction: Direction, row: int, column: int) -> State:
+    """
+    Movement function for both parts, using a jump table.
+
+    The move is cut off at the distance to the next wall, and what is left is a jump along the cycle.
+    Going around the whole cycle multiple times is taken care of by the modulo of the cycle length.
+
+    Returns the new coordinates and new direction of the point after the move (row, column, direction).
+    """
+    state = (row, column, direction)
+    cycle_index, position = jump_table.cycle_positions[state]
+    wall_distance = jump_table.wall_distances[state]
+
+    if wall_distance != -1 and wall_distance < move_amount:
+        move_amount = wall_distance
+
+    cycle = jump_table.cycles[cycle_index]
+    return cycle[(position + move_amount) % len(cycle)]
+
+
+# unit tests for the jump tables, which should always agree with move_part1 and move_part2
+
+def test_jump_table_wall_distances():
+    # Arrange
+    board_map = [['.', '.', '#', '.']]
+
+    # Act
+    jump_table = build_jump_table(board_map, calculate_cycles_part1(board_map))
+
+    # Assert
+    assert jump_table.wall_distances[(0, 0, Direction.E)] == 1
+    assert jump_table.wall_distances[(0, 1, Direction.E)] == 0
+    assert jump_table.wall_distances[(0, 3, Direction.E)] == 2
+    assert jump_table.wall_distances[(0, 0, Direction.N)] == -1
+
+
+def test_move_with_jump_table_matches_move_part1():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    jump_table = build_jump_table(board_map, calculate_cycles_part1(board_map))
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            for move_amount in (0, 1, 5, 37):
+                # Act
+                expected = move_part1(board_map, move_amount, direction, row, column)
+                actual = move_with_jump_table(jump_table, move_amount, direction, row, column)
+
+                # Assert
+                assert actual == (*expected, direction)
+
+
+def test_move_with_jump_table_matches_move_part2():
+    # Arrange
+    board_map = create_empty_cube_board_map()
+    for row in range(0, len(board_map), 7):
+        column = (row * 13) % len(board_map[row])
+        if board_map[row][column] == '.':
+            board_map[row] = board_map[row][:column] + '#' + board_map[row][column + 1:]
+    portal_map = compile_portal_map(scale_vertex_map(VERTEX_MAP, GRID_SIZE))
+    cycles = calculate_cycles_part2(board_map, portal_map)
+    jump_table = build_jump_table(board_map, cycles)
+
+    for row in range(0, len(board_map), 9):
+        for column in range(0, len(board_map[row]), 11):
+            if board_map[row][column] != '.':
+                continue
+
+            for direction in Direction:
+                # Act
+                expected = move_part2(board_map, portal_map, 333, direction, row, column)
+                actual = move_with_jump_table(jump_table, 333, direction, row, column)
+
+                # Assert
+                assert actual == expected
+
+    assert all(len(cycle) == 4 * GRID_SIZE for cycle in cycles)
+
+
+@pytest.mark.parametrize('part', [1, 2])
+def test_build_jump_arrays_matches_build_jump_table(part):
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    jump_table = build_jump_table(board_map, calculate_cycles(board_map, part))
+    width = len(board_map[0])
+
+    # Act
+    jump_arrays = build_jump_arrays(board_map, part)
+
+    # Assert
+    for (row, column, direction), wall_distance in jump_table.wall_distances.items():
+        state = pack_state(row, column, direction, width)
+        cycle_index, position = jump_table.cycle_positions[(row, column, direction)]
+        cycle = jump_table.cycles[cycle_index]
+        next_state = jump_arrays.cycle_states[jump_arrays.cycle_offsets[state] + (jump_arrays.cycle_positions[state] + 1) % jump_arrays.cycle_lengths[state]]
+        assert jump_arrays.wall_distances[state] == (NO_WALL if wall_distance == -1 else wall_distance)
+        assert jump_arrays.cycle_lengths[state] == len(cycle)
+        assert unpack_state(int(next_state), width) == cycle[(position + 1) % len(cycle)]
+    with pytest.raises(RuntimeError):
+        build_jump_arrays(board_map, 3)
+
+
+@pytest.mark.parametrize('direct_step_budget', [0, 0.1, 1])
+def test_traverse_switches_to_jump_arrays(monkeypatch, direct_step_budget):
+    # Arrange
+    monkeypatch.setattr('monkey_map.DIRECT_STEP_BUDGET', direct_step_budget)
+
+    # Act
+    score_part1 = traverse_board_map(SAMPLE_BOARD_MAP, SAMPLE_PATH)
+    score_part2 = traverse_cube(SAMPLE_BOARD_MAP, SAMPLE_PATH)
+
+    # Assert
+    assert score_part1 == 6032
+    assert score_part2 == 5031
+    assert get_jump_arrays(SAMPLE_BOARD_MAP, 2) is get_jump_arrays(convert_board_map_to_array(SAMPLE_BOARD_MAP), 2)
+
+
+
+def test_follow_path_packed_matches_move_with_jump_table():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    jump_table = build_jump_table(board_map, calculate_cycles(board_map, 2))
+    packed_jump_table = pack_jump_arrays(build_jump_arrays(board_map, 2))
+    width = packed_jump_table.width
+
+    for row, column, direction in jump_table.wall_distances:
+        for path_to_follow in ('7', 'R', 'L', '3L20R2'):
+            expected = (row, column, direction)
+            for action in iterate_path_tokens(path_to_follow):
+                if action in 'LR':
+                    expected = (*expected[:2], rotate(action, expected[2]))
+                else:
+                    expected = move_with_jump_table(jump_table, int(action), expected[2], *expected[:2])
+
+            # Act
+            actual = unpack_state(follow_path_packed(packed_jump_table, pack_state(row, column, direction, width), path_to_follow), width)
+
+            # Assert
+            assert actual == expected
+
+
+def test_rotate_and_reverse_direction():
+    # Arrange / Act / Assert
+    assert [rotate('R', direction) for direction in Direction] == [Direction.S, Direction.W, Direction.N, Direction.E]
+    assert [rotate('L', direction) for direction in Direction] == [Direction.N, Direction.E, Direction.S, Direction.W]
+    assert [reverse_direction(direction) for direction in Direction] == [Direction.W, Direction.N, Direction.E, Direction.S]
+    with pytest.raises(RuntimeError):
+        follow_path_packed(pack_jump_arrays(build_jump_arrays(SAMPLE_BOARD_MAP, 1)), 8, 'X3')
+
+
+# unit tests for the automatic folding of the cube
+
+def test_calculate_vertex_map_matches_my_drawing():
+    # Arrange
+    board_map = create_empty_cube_board_map()
+
+    # Act
+    vertex_map = calculate_vertex_map(board_map)
+
+    # Assert
+    assert calculate_grid_size(board_map) == GRID_SIZE
+    assert len(vertex_map) == len(VERTEX_MAP)
+    assert compile_portal_map(vertex_map) == compile_portal_map(scale_vertex_map(VERTEX_MAP, GRID_SIZE))
+
+
+
+def test_get_cube_geometry_is_shared_and_int_only():
+    # Arrange
+    board_map = create_empty_cube_board_map()
+    board_array = convert_board_map_to_array(board_map)
+
+    # Act
+    cube_geometry = get_cube_geometry(board_map)
+
+    # Assert
+    assert get_cube_geometry(board_array) is cube_geometry
+    assert cube_geometry.grid_size == GRID_SIZE
+    assert cube_geometry.cube_schedule == ((0, 1, 1), (0, 1, 0), (1, 1, 0), (1, 0, 0))
+    assert all(type(value) is int for portal in cube_geometry.portal_map.items() for state in portal for value in state[:2])
+    assert VERTEX_MAP[0][0][0] == (2, 1)
+
+def test_calculate_vertex_map_round_trip_for_other_nets():
+    for cube_schedule in (((0, 0, 1, 0), (1, 1, 1, 0), (0, 0, 1, 1)), ((1, 1, 1, 0, 0), (0, 0, 1, 1, 1)), ((1, 1, 0, 0), (0, 1, 1, 0), (0, 0, 1, 1))):
+        # Arrange
+        board_map = [''.join('.' * 3 if face else ' ' * 3 for face in layout_row) for layout_row in cube_schedule for _ in range(3)]
+
+        # Act
+        portal_map = compile_portal_map(calculate_vertex_map(board_map))
+
+        # Assert
+        assert len(portal_map) == 7 * 2 * 3
+        for (row, column, direction), (new_row, new_column, new_direction) in portal_map.items():
+            assert board_map[new_row][new_column] == '.'
+            assert portal_map[(new_row, new_column, reverse_direction(new_direction))] == (row, column, reverse_direction(direction))
+
+
+def test_fold_cube_schedule_overlapping_faces():
+    # Arrange
+    cube_schedule = ((1, 0, 0), (1, 1, 1), (0, 0, 1), (0, 0, 1))
+
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        fold_cube_schedule(cube_schedule)
+
+
+def test_fold_cube_schedule_is_cached():
+    # Arrange
+    fold_cube_schedule.cache_clear()
+    small_board_map = [''.join('.' * 2 if face == '1' else ' ' * 2 for face in layout_row) for layout_row in ['011', '010', '110', '100'] for _ in range(2)]
+
+    # Act
+    calculate_vertex_map(create_empty_cube_board_map())
+    calculate_vertex_map(small_board_map)
+
+    # Assert
+    assert fold_cube_schedule.cache_info().misses == 1
+    assert fold_cube_schedule.cache_info().hits == 1
+
+
+def test_traverse_cube_sample():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+
+    # Act
+    score = traverse_cube(board_map, SAMPLE_PATH)
+
+    # Assert
+    assert score == 5031
+
+
+# unit tests for the numpy array board, which should always agree with the Matrix2D board
+
+def test_convert_board_map_to_array():
+    # Arrange
+    board_map = ['  .#', ' ..', '#']
+
+    # Act
+    board_array = convert_board_map_to_array(board_map)
+
+    # Assert
+    assert board_array.dtype == 'uint8'
+    assert board_array.shape == (3, 4)
+    assert board_array[0].tolist() == [BOARD_VOID, BOARD_VOID, BOARD_OPEN, BOARD_WALL]
+    assert board_array[1].tolist() == [BOARD_VOID, BOARD_OPEN, BOARD_OPEN, BOARD_VOID]
+    assert board_array[2].tolist() == [BOARD_WALL, BOARD_VOID, BOARD_VOID, BOARD_VOID]
+
+
+def test_move_part1_array_matches_move_part1():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    board_array = convert_board_map_to_array(board_map)
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            for move_amount in (0, 1, 5, 37):
+                # Act
+                expected = move_part1(board_map, move_amount, direction, row, column)
+                actual = move_part1(board_array, move_amount, direction, row, column)
+
+                # Assert
+                assert actual == expected
+
+
+@pytest.mark.parametrize('board_map', [SAMPLE_BOARD_MAP, [' ..  .#. ', '  . #  ..', '.  ..  . ', ' #.   .. ']])
+def test_move_part1_wrap_spans_match_move_part1_array(board_map):
+    # Arrange
+    board_array = convert_board_map_to_array(board_map)
+    wrap_spans = WrapSpans({}, {})
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            for move_amount in (1, 2, 5, 37):
+                # Act
+                actual = move_part1(board_map, move_amount, direction, row, column, wrap_spans)
+
+                # Assert
+                assert actual == move_part1(board_array, move_amount, direction, row, column)
+
+
+def test_move_part2_array_matches_move_part2():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    board_array = convert_board_map_to_array(board_map)
+    portal_map = compile_portal_map(calculate_vertex_map(board_array))
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            # Act
+            expected = move_part2(board_map, portal_map, 13, direction, row, column)
+            actual = move_part2(board_array, portal_map, 13, direction, row, column)
+
+            # Assert
+            assert actual == expected
+
+
+def test_board_array_traversal_matches_board_map():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    board_array = convert_board_map_to_array(board_map)
+
+    # Act
+    score_part1 = traverse_board_map(board_array, SAMPLE_PATH)
+    score_part2 = traverse_cube(board_array, SAMPLE_PATH)
+
+    # Assert
+    assert get_starting_coordinates(board_array) == get_starting_coordinates(board_map)
+    assert calculate_cube_schedule(board_array, 4) == calculate_cube_schedule(board_map, 4)
+    assert score_part1 == 6032
+    assert score_part2 == 5031
+
+
+# unit tests for streaming the path to follow
+
+def test_iterate_path_tokens_split_over_chunks():
+    # Arrange
+    chunks = ['10R', '5', '5L1', '2', 'R', '3\n']
+
+    # Act
+    actions = list(iterate_path_tokens(chunks))
+
+    # Assert
+    assert actions == ['10', 'R', '55', 'L', '12', 'R', '3']
+
+
+def test_read_path_chunks_from_file(tmp_path):
+    # Arrange
+    input_file = write_sample_input_file(tmp_path / 'sample.txt')
+
+    # Act
+    chunks = list(read_path_chunks(input_file, chunk_size=2))
+    score_part1 = traverse_board_map(SAMPLE_BOARD_MAP, read_path_chunks(input_file, chunk_size=3))
+    score_part2 = traverse_cube(SAMPLE_BOARD_MAP, read_path_chunks(input_file, chunk_size=1))
+
+    # Assert
+    assert ''.join(chunks).strip() == SAMPLE_PATH
+    assert max(len(chunk) for chunk in chunks) == 2
+    assert score_part1 == 6032
+    assert score_part2 == 5031
+
+
+# unit tests for the trace events
+
+def test_trace_events_traverse_cube_sample():
+    # Arrange
+    trace_events = []
+    subscribe_trace(trace_events.append)
+
+    # Act
+    score = traverse_cube(SAMPLE_BOARD_MAP, SAMPLE_PATH)
+    unsubscribe_trace(trace_events.append)
+
+    # Assert
+    kinds = [trace_event.kind for trace_event in trace_events]
+    assert score == 5031
+    assert kinds.count(TRACE_ROTATION) == 6
+    assert kinds.count(TRACE_MOVE_START) == kinds.count(TRACE_MOVE_END) == 7
+    assert kinds.count(TRACE_SEAM_CROSSING) == 2
+    assert kinds.count(TRACE_WALL_HIT) == 4
+    assert trace_events[-1].kind == TRACE_MOVE_END
+    assert (trace_events[-1].row, trace_events[-1].column, trace_events[-1].direction) == (4, 6, Direction.N)
+
+
+def test_trace_events_move_part2_over_edge():
+    # Arrange
+    board_map = create_empty_cube_board_map()
+    portal_map = compile_portal_map(scale_vertex_map(VERTEX_MAP, GRID_SIZE))
+    trace_events = []
+    subscribe_trace(trace_events.append)
+
+    # Act
+    move_part2(board_map, portal_map, 3, Direction.W, GRID_SIZE * 2 - 1, GRID_SIZE)
+    unsubscribe_trace(trace_events.append)
+
+    # Assert
+    assert [trace_event.kind for trace_event in trace_events] == [TRACE_MOVE_START, TRACE_SEAM_CROSSING, TRACE_MOVE_END]
+    assert trace_events[1].direction == Direction.S
+    assert trace_events[1].detail == Direction.W.value
+    assert trace_events[2].detail == 3
+
+
+def test_no_trace_events_without_subscribers(monkeypatch):
+    # Arrange
+    trace_events = []
+    subscribe_trace(trace_events.append)
+    unsubscribe_trace(trace_events.append)
+    emitted_events = []
+    monkeypatch.setattr('monkey_map.emit_trace_event', lambda *trace_event: emitted_events.append(trace_event))
+
+    # Act
+    for direct_step_budget in (0, 1):
+        monkeypatch.setattr('monkey_map.DIRECT_STEP_BUDGET', direct_step_budget)
+        traverse_board_map(SAMPLE_BOARD_MAP, SAMPLE_PATH)
+        traverse_cube(SAMPLE_BOARD_MAP, SAMPLE_PATH)
+
+    # Assert
+    assert emitted_events == []
+    assert trace_events == []
+
+
+# unit tests for the profiling of the phases
+
+def test_load_board_rows_and_pad_board_map(tmp_path):
+    # Arrange
+    input_file = tmp_path / 'input.txt'
+    input_file.write_text('  ..\n.#.\n\n10R5\n')
+
+    # Act
+    board_rows = load_board_rows(str(input_file))
+    board_map = pad_board_map(list(board_rows))
+
+    # Assert
+    assert board_rows == ['  ..', '.#.']
+    assert board_map == ['  ..', '.#. ']
+    assert load_board(str(input_file)) == board_map
+    assert ''.join(read_path_chunks(str(input_file))) == '10R5\n'
+
+
+def test_main_does_not_import_numpy(tmp_path):
+    # Arrange
+    input_file = write_sample_input_file(tmp_path / 'sample.txt')
+    script = f"import sys, monkey_map; monkey_map.main({input_file!r}); print('numpy' in sys.modules)"
+
+    # Act
+    output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout
+
+    # Assert
+    assert output.splitlines() == ['Part 1 - Answer: \t6032', 'Part 2 - Answer: \t5031', 'False']
+
+
+def test_profile_main_sample(tmp_path):
+    # Arrange
+    input_file = write_sample_input_file(tmp_path / 'sample.txt')
+
+    # Act
+    profile = profile_main(input_file)
+
+    # Assert
+    assert profile['answers'] == {'part1': 6032, 'part2': 5031}
+    assert list(profile['phases']) == ['input_load', 'board_padding', 'precompute_part1', 'precompute_part2', 'traverse_board_map', 'traverse_cube']
+    assert all(phase['seconds'] >= 0 and phase['peak_bytes'] >= 0 for phase in profile['phases'].values())
+    assert profile['counters']['part1']['moves'] == 7
+    assert profile['counters']['part1']['rotations'] == 6
+    assert profile['counters']['part2']['seam_crossings'] == 2
+    assert profile['counters']['part2']['wall_stops'] == 4
+
+
+
+# unit tests for the sparse board, which should always agree with the Matrix2D board
+
+def test_build_sparse_board_spans():
+    # Act
+    sparse_board = build_sparse_board(SAMPLE_BOARD_MAP)
+
+    # Assert
+    assert sparse_board.row_offsets.tolist()[:5] == [8, 8, 8, 8, 0]
+    assert sparse_board.row_lengths.tolist()[:5] == [4, 4, 4, 4, 12]
+    assert sparse_board.column_offsets.tolist()[:9] == [4, 4, 4, 4, 4, 4, 4, 4, 0]
+    assert sparse_board.column_lengths.tolist()[:9] == [4, 4, 4, 4, 4, 4, 4, 4, 12]
+    assert len(sparse_board.walls) == (6 * 16 + 7) // 8
+    with pytest.raises(RuntimeError):
+        build_sparse_board(['..  ..'])
+
+
+def test_move_part1_sparse_matches_move_part1():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    sparse_board = build_sparse_board([board_row.rstrip(' ') for board_row in board_map])
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            for move_amount in (0, 1, 5, 37):
+                # Act
+                expected = move_part1(board_map, move_amount, direction, row, column)
+                actual = move_part1_sparse(sparse_board, move_amount, direction, row, column)
+
+                # Assert
+                assert actual == expected
+
+
+def test_traverse_sparse_board_sample():
+    # Act
+    score = traverse_sparse_board(build_sparse_board(SAMPLE_BOARD_MAP), SAMPLE_PATH)
+
+    # Assert
+    assert score == 6032
+
+
+@pytest.mark.parametrize('traverse', [traverse_board_map, traverse_cube])
+def test_traverse_rejects_sparse_board(traverse):
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        traverse(build_sparse_board(SAMPLE_BOARD_MAP), '10')
+
+
+
+# unit tests for the bitset wall index, which should always agree with move_part1
+
+def test_find_steps_to_wall():
+    # Arrange / Act / Assert
+    assert find_steps_to_wall(0b00100, 5, 3, forward=True) == 3
+    assert find_steps_to_wall(0b00100, 5, 0, forward=True) == 1
+    assert find_steps_to_wall(0b00100, 5, 3, forward=False) == 0
+    assert find_steps_to_wall(0b00100, 5, 1, forward=False) == 3
+    assert find_steps_to_wall(0, 5, 1, forward=False) == -1
+
+
+def test_build_wall_index_sample():
+    # Act
+    wall_index = build_wall_index(build_sparse_board(SAMPLE_BOARD_MAP))
+
+    # Assert
+    assert wall_index.row_walls[0] == 0b1000
+    assert wall_index.row_walls[4] == 0b100000001000
+    assert wall_index.column_walls[3] == 0b0001
+
+
+def test_move_part1_bitset_matches_move_part1():
+    # Arrange
+    board_map = SAMPLE_BOARD_MAP
+    sparse_board = build_sparse_board(board_map)
+    wall_index = build_wall_index(sparse_board)
+    open_cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] == '.']
+
+    for row, column in open_cells:
+        for direction in Direction:
+            for move_amount in (0, 1, 5, 37, 10 ** 30):
+                # Act
+                expected = move_part1(board_map, min(move_amount, 37), direction, row, column)
+                actual = move_part1_bitset(sparse_board, wall_index, move_amount, direction, row, column)
+
+                # Assert
+                if move_amount <= 37:
+                    assert actual == expected
+                else:
+                    assert board_map[actual[0]][actual[1]] == '.'
+
+
+
+# unit tests for the trajectory recorder
+
+def test_trajectory_recorder_sample(tmp_path):
+    # Arrange
+    recorder = TrajectoryRecorder()
+
+    # Act
+    score = traverse_board_map(SAMPLE_BOARD_MAP, SAMPLE_PATH, recorder=recorder)
+    recorder.save(str(tmp_path / 'trajectory.npy'))
+    segments = numpy.load(str(tmp_path / 'trajectory.npy'), mmap_mode='r')
+
+    # Assert
+    assert score == 6032
+    assert len(recorder) == 7
+    assert segments.tolist() == recorder.segments.tolist()
+    assert segments[0].tolist() == (0, 8, 0, 2, TRAJECTORY_STOP_WALL)
+    assert segments[1].tolist() == (0, 10, 1, 5, TRAJECTORY_STOP_END)
+    assert recorder.segments['length'].tolist() == [2, 5, 5, 2, 4, 2, 0]
+
+
+def test_trajectory_recorder_traced_matches_packed():
+    # Arrange
+    packed_recorder = TrajectoryRecorder()
+    traced_recorder = TrajectoryRecorder()
+    trace_events = []
+
+    # Act
+    traverse_cube(SAMPLE_BOARD_MAP, SAMPLE_PATH, recorder=packed_recorder)
+    subscribe_trace(trace_events.append)
+    traverse_cube(SAMPLE_BOARD_MAP, SAMPLE_PATH, recorder=traced_recorder)
+    unsubscribe_trace(trace_events.append)
+
+    # Assert
+    assert traced_recorder.segments.tolist() == packed_recorder.segments.tolist()
+    assert packed_recorder.segments['stop_reason'].tolist().count(TRAJECTORY_STOP_END) == 3
+
+
+def test_follow_actions_packed_on_move():
+    # Arrange
+    packed_jump_table = pack_jump_arrays(build_jump_arrays(SAMPLE_BOARD_MAP, 1))
+    start_state = pack_state(0, 8, Direction.E, packed_jump_table.width)
+    moves = []
+
+    # Act
+    final_state = follow_actions_packed(packed_jump_table, start_state, iterate_path_tokens(SAMPLE_PATH), lambda *move: moves.append(move))
+
+    # Assert
+    assert final_state == follow_path_packed(packed_jump_table, start_state, SAMPLE_PATH)
+    assert moves[0] == (start_state, 2, True)
+    assert [length for _, length, _ in moves] == [2, 5, 5, 2, 4, 2, 0]
+
+
+
+# unit tests for the memory-mapped input loader, which should always agree with reading the input file line by line
+
+@pytest.mark.parametrize('file_name, opener', [('sample.txt', open), ('sample.txt.gz', gzip.open), ('sample.txt.xz', lzma.open)])
+def test_load_input_file(tmp_path, file_name, opener):
+    # Arrange
+    input_file = str(tmp_path / file_name)
+    with opener(input_file, 'wt') as f:
+        f.write('\n'.join(board_row.rstrip(' ') for board_row in SAMPLE_BOARD_MAP) + '\n\n' + SAMPLE_PATH + '\n')
+
+    # Act
+    board_array, actions_to_follow = load_input_file(input_file, as_array=True)
+    board_rows, _ = load_input_file(input_file, as_rows=True)
+    board_map, _ = load_input_file(input_file)
+    processed_board_map, _ = process_input_file(input_file)
+
+    # Assert
+    assert actions_to_follow == SAMPLE_PATH
+    assert numpy.array_equal(board_array, convert_board_map_to_array(SAMPLE_BOARD_MAP))
+    assert numpy.array_equal(load_board(input_file, as_array=True), board_array)
+    assert [board_row.tobytes().decode() for board_row in board_rows] == [board_row.rstrip(' ') for board_row in SAMPLE_BOARD_MAP]
+    assert board_map == processed_board_map == load_board(input_file) == SAMPLE_BOARD_MAP
+    assert traverse_cube(board_array, read_path_chunks(input_file, chunk_size=3)) == 5031
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 1 << 20])
+def test_read_input_bytes_in_chunks(tmp_path, chunk_size):
+    # Arrange
+    input_file = str(tmp_path / 'sample.txt.xz')
+    with lzma.open(input_file, 'wt') as f:
+        f.write('..#\n .\n\n10R5\n')
+
+    # Act
+    board_bytes, path_bytes = read_input_bytes(input_file, chunk_size=chunk_size)
+    board_only_bytes, no_path_bytes = read_input_bytes(input_file, with_path=False, chunk_size=chunk_size)
+
+    # Assert
+    assert board_bytes.tobytes() == board_only_bytes.tobytes() == b'..#\n .\n'
+    assert path_bytes.tobytes() == b'10R5\n'
+    assert len(no_path_bytes) == 0
+
+
+def test_scan_input_bytes_without_path():
+    # Act
+    input_layout = scan_input_bytes(numpy.frombuffer(b'..#\n .', dtype=numpy.uint8))
+
+    # Assert
+    assert input_layout.row_offsets.tolist() == [0, 4]
+    assert input_layout.row_lengths.tolist() == [3, 2]
+    assert input_layout.width == 3
+    assert input_layout.path_offset == 6
+
+
+def test_load_input_file_empty(tmp_path):
+    # Arrange
+    input_file = tmp_path / 'empty.txt'
+    input_file.write_text('')
+
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        load_input_file(str(input_file))
+
+
+
+# unit tests for the move memo, which should always agree with moving without it
+
+@pytest.mark.parametrize('part, expected_score', [(1, 6032), (2, 5031)])
+def test_move_memo_sample(part, expected_score):
+    # Arrange
+    memo = MoveMemo(SAMPLE_BOARD_MAP, part)
+
+    # Act
+    first_score = memo.traverse(SAMPLE_PATH)
+    second_score = memo.traverse(SAMPLE_PATH)
+
+    # Assert
+    assert first_score == second_score == expected_score
+    assert memo.stats['misses'] == 7
+    assert memo.stats['hits'] == 7
+    assert memo.stats['hit_rate'] == 0.5
+
+
+def test_move_memo_eviction():
+    # Arrange
+    lru_memo = MoveMemo(SAMPLE_BOARD_MAP, capacity=2)
+    fifo_memo = MoveMemo(SAMPLE_BOARD_MAP, capacity=2, eviction='fifo')
+
+    # Act
+    for memo in (lru_memo, fifo_memo):
+        for move_amount in (1, 2, 1, 3, 1):
+            memo.move(move_amount, Direction.E, 0, 8)
+
+    # Assert
+    assert lru_memo.stats['hits'] == 2
+    assert lru_memo.stats['evictions'] == 1
+    assert fifo_memo.stats['hits'] == 1
+    assert fifo_memo.stats['evictions'] == 2
+    with pytest.raises(RuntimeError):
+        MoveMemo(SAMPLE_BOARD_MAP, eviction='random')
+
+
+@pytest.mark.parametrize('part', [0, 3])
+def test_move_memo_unknown_part(part):
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        MoveMemo(SAMPLE_BOARD_MAP, part)
+
+
+def test_move_memo_invalidate():
+    # Arrange
+    board_array = convert_board_map_to_array(SAMPLE_BOARD_MAP)
+    memo = MoveMemo(board_array, part=2)
+    memo.move(10, Direction.E, 0, 8)
+
+    # Act
+    board_array[0, 9] = BOARD_WALL
+    stale_state = memo.move(10, Direction.E, 0, 8)
+    memo.invalidate()
+    state = memo.move(10, Direction.E, 0, 8)
+
+    # Assert
+    assert stale_state == (0, 10, Direction.E)
+    assert state == (0, 8, Direction.E)
+    assert memo.stats['size'] == 1
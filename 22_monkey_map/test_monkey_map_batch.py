@@ -0,0 +1,108 @@
+import numpy
+
+import pytest
+
+from monkey_map import Direction, build_jump_arrays, iterate_path_tokens, rotate, traverse_board_map, traverse_cube
+from monkey_map_batch import ROTATE_LEFT, ROTATE_RIGHT, encode_paths, simulate_walkers, simulate_walkers_on_board
+from monkey_map_batch import simulate_wall_variants_on_board
+from test_monkey_map import SAMPLE_BOARD_MAP, SAMPLE_PATH, build_jump_table, calculate_cycles, move_with_jump_table
+
+# unit tests for the batch walkers, which should always agree with walking one walker at a time
+
+
+def walk_with_jump_table(part: int, path: str, row: int, column: int, direction: Direction) -> tuple:
+    jump_table = build_jump_table(SAMPLE_BOARD_MAP, calculate_cycles(SAMPLE_BOARD_MAP, part))
+    for action in iterate_path_tokens(path):
+        if action in 'LR':
+            direction = rotate(action, direction)
+        else:
+            row, column, direction = move_with_jump_table(jump_table, int(action), direction, row, column)
+    return row, column, direction.value
+
+
+def test_encode_paths():
+    # Act
+    actions = encode_paths(['10R5', 'L3L'])
+
+    # Assert
+    assert actions.tolist() == [[10, ROTATE_RIGHT, 5], [ROTATE_LEFT, 3, ROTATE_LEFT]]
+
+
+def test_simulate_walkers_on_board_sample():
+    # Act
+    scores_part1 = simulate_walkers_on_board(SAMPLE_BOARD_MAP, [SAMPLE_PATH, SAMPLE_PATH], part=1)
+    scores_part2 = simulate_walkers_on_board(SAMPLE_BOARD_MAP, [SAMPLE_PATH], part=2)
+
+    # Assert
+    assert scores_part1.tolist() == [6032, 6032]
+    assert scores_part2.tolist() == [5031]
+
+
+def test_simulate_walkers_on_board_move_above_int32():
+    # Arrange
+    path = '3000000001R5'
+
+    # Act
+    scores = simulate_walkers_on_board(SAMPLE_BOARD_MAP, [path, SAMPLE_PATH], part=1)
+
+    # Assert
+    assert 3000000001 > 2 ** 31
+    assert scores.tolist() == [traverse_board_map(SAMPLE_BOARD_MAP, path), 6032] == [6045, 6032]
+
+
+def test_simulate_walkers_matches_jump_table():
+    # Arrange
+    rng = numpy.random.default_rng(22)
+    open_cells = [(row, column) for row in range(len(SAMPLE_BOARD_MAP)) for column in range(len(SAMPLE_BOARD_MAP[row])) if SAMPLE_BOARD_MAP[row][column] == '.']
+    walkers = [(*open_cells[rng.integers(len(open_cells))], Direction(int(rng.integers(4)))) for _ in range(40)]
+    paths = [''.join(f"{rng.integers(0, 30)}{rng.choice(['L', 'R'])}" for _ in range(rng.integers(1, 12))) for _ in walkers]
+    start_rows, start_columns, start_directions = numpy.array([(row, column, direction.value) for row, column, direction in walkers]).T
+
+    for part in (1, 2):
+        jump_arrays = build_jump_arrays(SAMPLE_BOARD_MAP, part)
+
+        # Act
+        rows, columns, directions, _ = simulate_walkers(jump_arrays, start_rows, start_columns, start_directions, encode_paths(paths))
+
+        # Assert
+        for walker, (row, column, direction) in enumerate(walkers):
+            assert (rows[walker], columns[walker], directions[walker]) == walk_with_jump_table(part, paths[walker], row, column, direction)
+
+
+# unit tests for the wall variants, which should always agree with running every variant on its own board
+
+
+def toggle_walls(overlay: list) -> list:
+    board_map = [list(board_row) for board_row in SAMPLE_BOARD_MAP]
+    for row, column in overlay:
+        board_map[row][column] = '.' if board_map[row][column] == '#' else '#'
+    return [''.join(board_row) for board_row in board_map]
+
+
+@pytest.mark.parametrize('part, traverse', [(1, traverse_board_map), (2, traverse_cube)])
+def test_simulate_wall_variants_on_board(part, traverse):
+    # Arrange
+    rng = numpy.random.default_rng(25)
+    cells = [(row, column) for row in range(len(SAMPLE_BOARD_MAP)) for column in range(len(SAMPLE_BOARD_MAP[row])) if SAMPLE_BOARD_MAP[row][column] != ' ']
+    overlays = [[], [(0, 8)], [(0, 11), (0, 8)]] + [[cells[index] for index in rng.choice(len(cells), rng.integers(1, 6), replace=False)] for _ in range(30)]
+
+    # Act
+    rows, columns, directions, scores = simulate_wall_variants_on_board(SAMPLE_BOARD_MAP, SAMPLE_PATH, overlays, part)
+
+    # Assert
+    assert scores[0] == (6032 if part == 1 else 5031)
+    for variant, overlay in enumerate(overlays):
+        assert scores[variant] == traverse(toggle_walls(overlay), SAMPLE_PATH)
+    assert (scores == 1000 * (rows + 1) + 4 * (columns + 1) + directions).all()
+
+
+def test_simulate_wall_variants_void_cell():
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        simulate_wall_variants_on_board(SAMPLE_BOARD_MAP, SAMPLE_PATH, [[(0, 0)]])
+
+
+def test_simulate_wall_variants_walled_off_top_row():
+    # Act & Assert
+    with pytest.raises(RuntimeError, match='Variant 1 walls off the whole top row'):
+        simulate_wall_variants_on_board(SAMPLE_BOARD_MAP, SAMPLE_PATH, [[], [(0, 8), (0, 9), (0, 10)]])
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import pytest
+
+from monkey_map import build_jump_arrays
+from monkey_map_cache import evict_cache_entries, get_cached_jump_arrays, hash_board_bytes, open_cached_board, traverse_cached
+from test_monkey_map import SAMPLE_BOARD_MAP, write_sample_input_file
+
+# unit tests for the board cache, which should always agree with solving without a cache
+
+
+def test_jump_arrays_round_trip(tmp_path):
+    # Arrange
+    cache_dir = str(tmp_path / 'cache')
+    cached_board = open_cached_board(write_sample_input_file(tmp_path / 'input.txt'), cache_dir)
+    expected = build_jump_arrays(SAMPLE_BOARD_MAP, 2)
+
+    # Act
+    cold_jump_arrays = get_cached_jump_arrays(cached_board, 2, cache_dir)
+    warm_jump_arrays = get_cached_jump_arrays(cached_board, 2, cache_dir)
+
+    # Assert
+    assert warm_jump_arrays.width == cold_jump_arrays.width == expected.width
+    for warm_array, cold_array, expected_array in zip(warm_jump_arrays[1:], cold_jump_arrays[1:], expected[1:]):
+        assert (warm_array == expected_array).all()
+        assert (cold_array == expected_array).all()
+
+
+def test_traverse_cached_reuses_board_for_other_paths(tmp_path):
+    # Arrange
+    cache_dir = str(tmp_path / 'cache')
+    first_input_file = write_sample_input_file(tmp_path / 'first.txt')
+    second_input_file = write_sample_input_file(tmp_path / 'second.txt', path_to_follow='10R5L5R10L4R5L5R3')
+
+    # Act
+    cold_scores = (traverse_cached(first_input_file, 1, cache_dir), traverse_cached(first_input_file, 2, cache_dir))
+    warm_scores = (traverse_cached(first_input_file, 1, cache_dir), traverse_cached(first_input_file, 2, cache_dir))
+    traverse_cached(second_input_file, 2, cache_dir)
+
+    # Assert
+    assert cold_scores == warm_scores == (6032, 5031)
+    assert len(os.listdir(cache_dir)) == 1
+    assert len(os.listdir(os.path.join(cache_dir, os.listdir(cache_dir)[0]))) == 11
+
+
+def test_open_cached_board_hit_does_not_decode(tmp_path, monkeypatch):
+    # Arrange
+    cache_dir = str(tmp_path / 'cache')
+    input_file = write_sample_input_file(tmp_path / 'input.txt')
+    cold_board = open_cached_board(input_file, cache_dir)
+    with open(input_file, 'rb') as f:
+        board_section = f.read().split(b'\n\n')[0]
+    monkeypatch.setattr('monkey_map_cache.decode_board_rows', lambda board_bytes: pytest.fail("a cache hit should not decode the board"))
+
+    # Act
+    warm_board = open_cached_board(input_file, cache_dir)
+
+    # Assert
+    assert warm_board.key == cold_board.key == hashlib.sha256(board_section).hexdigest()
+    assert (warm_board.board_map == cold_board.board_map).all()
+    assert hash_board_bytes(memoryview(board_section + b'\n\n')) == warm_board.key
+
+
+def test_evict_least_recently_used(tmp_path):
+    # Arrange
+    cache_dir = str(tmp_path / 'cache')
+    first_input_file = write_sample_input_file(tmp_path / 'first.txt')
+    second_input_file = write_sample_input_file(tmp_path / 'second.txt', SAMPLE_BOARD_MAP[:-1])
+    first_board = open_cached_board(first_input_file, cache_dir)
+    second_board = open_cached_board(second_input_file, cache_dir)
+    os.utime(first_board.entry_dir, (0, 0))
+
+    # Act
+    evicted_keys = evict_cache_entries(cache_dir, 1)
+
+    # Assert
+    assert evicted_keys == [first_board.key, second_board.key]
+    assert os.listdir(cache_dir) == []
@@ -0,0 +1,144 @@
+import numpy
+import pytest
+
+from monkey_map import traverse_board_map, traverse_cube
+from monkey_map_compiled import compile_path, find_repeated_block, power_mapping, traverse_compiled
+from monkey_map_compiled import compile_path_parallel, count_actions, split_path, traverse_parallel
+from benchmark_monkey_map import generate_board_map, generate_path
+from test_monkey_map import SAMPLE_BOARD_MAP, SAMPLE_PATH
+
+# unit tests for the compiled paths, which should always agree with traversing the whole path
+
+
+def test_find_repeated_block():
+    # Arrange
+    action_codes = numpy.array([10, -2, 5, -1] * 3 + [10])
+
+    # Act
+    block_length, repeats = find_repeated_block(action_codes)
+
+    # Assert
+    assert block_length == 4
+    assert repeats == 3
+
+
+def test_power_mapping_matches_repeated_composition():
+    # Arrange
+    mapping = numpy.random.default_rng(22).permutation(50)
+    expected = numpy.arange(50)
+    for _ in range(13):
+        expected = mapping[expected]
+
+    # Act
+    actual = power_mapping(mapping, 13)
+
+    # Assert
+    assert actual.tolist() == expected.tolist()
+
+
+def test_traverse_compiled_sample():
+    # Act
+    score_part1 = traverse_compiled(SAMPLE_BOARD_MAP, SAMPLE_PATH, part=1)
+    score_part2 = traverse_compiled(SAMPLE_BOARD_MAP, SAMPLE_PATH, part=2)
+
+    # Assert
+    assert score_part1 == 6032
+    assert score_part2 == 5031
+
+
+def test_traverse_compiled_move_above_int32():
+    # Arrange
+    path = '3000000001R5'
+
+    # Act
+    score_part1 = traverse_compiled(SAMPLE_BOARD_MAP, path, part=1)
+    score_part2 = traverse_compiled(SAMPLE_BOARD_MAP, path, part=2)
+
+    # Assert
+    assert score_part1 == traverse_board_map(SAMPLE_BOARD_MAP, path) == 6045
+    assert score_part2 == traverse_cube(SAMPLE_BOARD_MAP, path)
+
+
+def test_traverse_compiled_repeated_block():
+    # Arrange
+    block = '7R13L2L'
+    path = block * 101 + '7R1'
+
+    # Act
+    score_part1 = traverse_compiled(SAMPLE_BOARD_MAP, path, part=1)
+    score_part2 = traverse_compiled(SAMPLE_BOARD_MAP, path, part=2)
+    score_block_repeats = traverse_compiled(SAMPLE_BOARD_MAP, block, part=2, block_repeats=101)
+
+    # Assert
+    assert score_part1 == traverse_board_map(SAMPLE_BOARD_MAP, path)
+    assert score_part2 == traverse_cube(SAMPLE_BOARD_MAP, path)
+    assert score_block_repeats == traverse_cube(SAMPLE_BOARD_MAP, block * 101)
+
+
+def test_traverse_compiled_path_without_repeated_block(monkeypatch):
+    # Arrange
+    board_map = generate_board_map(50)
+    path = generate_path(2001, max_move_amount=100, seed=3)
+    monkeypatch.setattr('monkey_map_compiled.compile_path', lambda *arguments: pytest.fail("a path without a repeated block should not be compiled"))
+
+    # Act
+    score_part1 = traverse_compiled(board_map, path, part=1)
+    score_part2 = traverse_compiled(board_map, path, part=2)
+
+    # Assert
+    assert score_part1 == traverse_board_map(board_map, path)
+    assert score_part2 == traverse_cube(board_map, path)
+
+
+def test_compile_path_is_a_mapping_of_all_states():
+    # Act
+    mapping = compile_path(SAMPLE_BOARD_MAP, SAMPLE_PATH, part=2)
+
+    # Assert
+    assert len(mapping) == len(SAMPLE_BOARD_MAP) * len(SAMPLE_BOARD_MAP[0]) * 4
+
+
+
+# unit tests for the parallel composition, which should always agree with the compiled paths
+
+
+def test_split_path():
+    # Act
+    chunks = split_path('10R5L5R10L4R5L5', 3)
+
+    # Assert
+    assert ''.join(chunks) == '10R5L5R10L4R5L5'
+    assert chunks == ['10R5L5R', '10L4R', '5L5']
+    assert split_path('12', 4) == ['12']
+
+
+def test_compile_path_parallel_matches_compile_path():
+    # Arrange
+    path_to_follow = generate_path(2001, max_move_amount=20, seed=5)
+
+    for part in (1, 2):
+        # Act
+        expected = compile_path(SAMPLE_BOARD_MAP, path_to_follow, part)
+        actual = compile_path_parallel(SAMPLE_BOARD_MAP, path_to_follow, part, workers=2, amount_of_chunks=5)
+
+        # Assert
+        open_states = numpy.flatnonzero(numpy.repeat(numpy.array([list(board_row) for board_row in SAMPLE_BOARD_MAP]).ravel() == '.', 4))
+        assert numpy.array_equal(actual[open_states], expected[open_states])
+
+
+def test_traverse_parallel_matches_traverse():
+    # Arrange
+    board_map = generate_board_map(8, wall_density=0.1)
+    path_to_follow = generate_path(5001, max_move_amount=30, seed=2)
+
+    # Act / Assert
+    assert traverse_parallel(board_map, path_to_follow, 1, workers=2, crossover=0) == traverse_board_map(board_map, path_to_follow)
+    assert traverse_parallel(board_map, path_to_follow, 2, workers=2, crossover=0) == traverse_cube(board_map, path_to_follow)
+    assert traverse_parallel(SAMPLE_BOARD_MAP, SAMPLE_PATH, 2) == 5031
+
+
+def test_count_actions():
+    # Arrange / Act / Assert
+    assert count_actions(SAMPLE_PATH, 100) == 13
+    assert count_actions(SAMPLE_PATH, 5) == 5
+    assert count_actions('123', 100) == 1
@@ -0,0 +1,60 @@
+import collections
+import pytest
+
+from monkey_map import Direction, MoveMemo, convert_board_map_to_array, pack_state, rotate, traverse_board_map, traverse_cube
+from monkey_map_graph import build_state_graph, find_reachable_cells, find_shortest_instructions, get_start_state, search_states
+from test_monkey_map import SAMPLE_BOARD_MAP
+
+# unit tests for the state graph queries, which should always agree with walking the board one step at a time
+
+
+def search_states_step_by_step(part: int, move_amounts: range = range(1, 2)) -> dict:
+    memo = MoveMemo(SAMPLE_BOARD_MAP, part)
+    start = (0, 8, Direction.E)
+    levels = {start: 0}
+    queue = collections.deque([start])
+    while queue:
+        row, column, direction = queue.popleft()
+        moves = [memo.move(move_amount, direction, row, column) for move_amount in move_amounts]
+        for next_state in [(row, column, rotate('R', direction)), (row, column, rotate('L', direction))] + moves:
+            if next_state not in levels:
+                levels[next_state] = levels[(row, column, direction)] + 1
+                queue.append(next_state)
+    return levels
+
+
+@pytest.mark.parametrize('part', [1, 2])
+def test_search_states_single_steps(part):
+    # Arrange
+    expected_levels = search_states_step_by_step(part)
+
+    # Act
+    state_search = search_states(build_state_graph(SAMPLE_BOARD_MAP, part), get_start_state(SAMPLE_BOARD_MAP), max_move=1)
+
+    # Assert
+    width = len(SAMPLE_BOARD_MAP[0])
+    assert (state_search.levels != -1).sum() == len(expected_levels)
+    for (row, column, direction), level in expected_levels.items():
+        assert state_search.levels[pack_state(row, column, direction, width)] == level
+
+
+@pytest.mark.parametrize('part, traverse', [(1, traverse_board_map), (2, traverse_cube)])
+def test_find_shortest_instructions(part, traverse):
+    # Arrange
+    board_array = convert_board_map_to_array(SAMPLE_BOARD_MAP)
+    state_search = search_states(build_state_graph(board_array, part), get_start_state(board_array))
+    expected_levels = search_states_step_by_step(part, range(1, 17))
+
+    # Act
+    reachable_cells = find_reachable_cells(state_search)
+    instructions = {(row, column, direction): find_shortest_instructions(state_search, row, column, direction)
+                    for row, column in zip(*reachable_cells.nonzero()) for direction in Direction}
+
+    # Assert
+    assert (reachable_cells == (board_array == 1)).all()
+    assert instructions[(0, 8, Direction.E)] == []
+    assert instructions[(0, 10, Direction.S)] == ['2', 'R']
+    assert find_shortest_instructions(state_search, 0, 11) is None
+    for (row, column, direction), actions in instructions.items():
+        assert traverse(SAMPLE_BOARD_MAP, ''.join(actions)) == 1000 * (row + 1) + 4 * (column + 1) + direction.value
+        assert len(actions) == expected_levels[(row, column, direction)]
@@ -0,0 +1,47 @@
+import io
+import json
+
+from monkey_map_pool import collect_input_files, solve_input_file, solve_input_files, write_results
+from test_monkey_map import write_sample_input_file
+
+# unit tests for the process pool driver, which solves many input files at once
+
+
+def test_collect_input_files(tmp_path):
+    # Arrange
+    write_sample_input_file(tmp_path / 'b.txt')
+    write_sample_input_file(tmp_path / 'a.txt')
+    (tmp_path / 'notes.md').write_text('not an input file')
+
+    # Act
+    input_files = collect_input_files([str(tmp_path), 'other.txt'])
+
+    # Assert
+    assert input_files == [str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt'), 'other.txt']
+
+
+def test_solve_input_file_keeps_errors():
+    # Arrange / Act
+    result = solve_input_file('does_not_exist.txt')
+
+    # Assert
+    assert result['part1'] is None
+    assert result['error'].startswith('FileNotFoundError')
+
+
+def test_solve_input_files_streams_all_results(tmp_path):
+    # Arrange
+    input_files = [write_sample_input_file(tmp_path / f'{index}.txt') for index in range(5)]
+    (tmp_path / 'empty.txt').write_text('')
+    input_files.append(str(tmp_path / 'empty.txt'))
+    output = io.StringIO()
+
+    # Act
+    summary = write_results(solve_input_files(input_files, workers=2, chunk_size=2), output)
+
+    # Assert
+    results = {result['input_file']: result for result in map(json.loads, output.getvalue().splitlines())}
+    assert summary == {'solved': 5, 'failed': 1}
+    assert sorted(results) == sorted(input_files)
+    assert all((result['part1'], result['part2']) == (6032, 5031) for name, result in results.items() if name != input_files[-1])
+    assert results[input_files[-1]]['error'] == "RuntimeError: You provided an empty file..."
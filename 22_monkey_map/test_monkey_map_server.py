@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from monkey_map_server import QueryServer, calculate_percentiles, load_board
+from test_monkey_map import SAMPLE_PATH, write_sample_input_file
+
+# unit tests for the query server, which should always agree with traversing the board directly
+
+
+async def send_requests(address, requests):
+    reader, writer = await asyncio.open_connection(*address)
+    responses = []
+    for request in requests:
+        writer.write((json.dumps(request) + '\n').encode())
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def test_calculate_percentiles():
+    # Act
+    percentiles = calculate_percentiles([0.001 * index for index in range(1, 101)])
+
+    # Assert
+    assert round(percentiles['p50'], 1) == 50.5
+    assert calculate_percentiles([]) == {'p50': None, 'p90': None, 'p99': None}
+
+
+def test_query_server_sample(tmp_path):
+    input_file = write_sample_input_file(tmp_path / 'sample.txt')
+
+    async def run():
+        # Arrange
+        server = QueryServer(workers=2)
+        await server.start(port=0)
+        load_response, = await send_requests(server.address, [{'op': 'load', 'board': 'sample', 'input_file': input_file}])
+
+        # Act
+        clients = [send_requests(server.address, [
+            {'op': 'query', 'board': 'sample', 'path': SAMPLE_PATH, 'part': 1},
+            {'op': 'query', 'board': 'sample', 'path': SAMPLE_PATH, 'part': 2},
+            {'op': 'query', 'board': 'sample', 'path': '1', 'part': 1, 'start': [5, 11, 0]},
+            {'op': 'query', 'board': 'other', 'path': '1'},
+        ]) for _ in range(5)]
+        responses = await asyncio.gather(*clients)
+        stats, = await send_requests(server.address, [{'op': 'stats'}])
+        await server.close()
+        return load_response, responses, stats
+
+    load_response, responses, stats = asyncio.run(run())
+
+    # Assert
+    assert load_response == {'board': 'sample', 'parts': [1, 2]}
+    for part1, part2, from_start, unknown_board in responses:
+        assert part1 == {'score': 6032, 'state': [5, 7, 0]}
+        assert part2 == {'score': 5031, 'state': [4, 6, 3]}
+        assert from_start['state'] == [5, 0, 0]
+        assert unknown_board['error'] == "RuntimeError: Board other is not loaded."
+    assert stats['queries'] == 15
+    assert stats['queue_depth'] == 0
+    assert 1 <= stats['max_queue_depth'] <= 5
+    assert stats['latency_ms']['p50'] <= stats['latency_ms']['p99']
+
+
+def test_query_rejects_start_off_open_cells(tmp_path):
+    # Arrange
+    server = QueryServer(workers=1)
+    server.boards['sample'] = load_board(write_sample_input_file(tmp_path / 'sample.txt'))
+    starts = [[0, 0, 0], [0, 11, 0], [12, 8, 0], [0, -1, 0]]
+
+    # Act
+    responses = [asyncio.run(server.handle_request(json.dumps({'op': 'query', 'board': 'sample', 'path': '1', 'start': start}).encode())) for start in starts]
+    server.executor.shutdown()
+
+    # Assert
+    for (row, column, _), response in zip(starts, responses):
+        assert response == {'error': f"RuntimeError: Start ({row}, {column}) is not an open cell of the board."}
@@ -0,0 +1,76 @@
+import random
+import pytest
+
+from benchmark_monkey_map import generate_board_map, generate_path
+from monkey_map import traverse_board_map, traverse_cube
+from monkey_map_session import TraversalSession
+from test_monkey_map import SAMPLE_BOARD_MAP, SAMPLE_PATH
+
+# unit tests for the traversal sessions, which should always agree with traversing from scratch
+
+
+def toggle_cell(board_map, row: int, column: int):
+    symbol = '#' if board_map[row][column] == '.' else '.'
+    board_map[row] = board_map[row][:column] + symbol + board_map[row][column + 1:]
+
+
+def test_session_sample():
+    # Act
+    session_part1 = TraversalSession(SAMPLE_BOARD_MAP, SAMPLE_PATH, part=1, checkpoint_interval=2)
+    session_part2 = TraversalSession(SAMPLE_BOARD_MAP, SAMPLE_PATH, part=2, checkpoint_interval=2)
+
+    # Assert
+    assert session_part1.score == 6032
+    assert session_part2.score == 5031
+    assert len(session_part1.get_checkpoints()) == 7
+    assert session_part1.get_checkpoints()[0][:2] == (0, 8)
+
+
+def test_session_append_and_toggle_match_traversing_from_scratch():
+    for part, traverse in ((1, traverse_board_map), (2, traverse_cube)):
+        # Arrange
+        board_map = generate_board_map(6, wall_density=0.1, seed=part)
+        path_to_follow = generate_path(301, max_move_amount=30, seed=part)
+        session = TraversalSession(board_map, path_to_follow, part=part, checkpoint_interval=16)
+        random_generator = random.Random(part)
+        cells = [(row, column) for row in range(len(board_map)) for column in range(len(board_map[row])) if board_map[row][column] != ' ']
+
+        for update in range(40):
+            # Act
+            if update % 4 == 0:
+                extra_path = generate_path(11, max_move_amount=30, seed=update)
+                path_to_follow += 'R' + extra_path
+                score = session.append('R' + extra_path)
+            else:
+                row, column = random_generator.choice(cells)
+                toggle_cell(board_map, row, column)
+                score = session.toggle_wall(row, column)
+
+            # Assert
+            assert score == traverse(board_map, path_to_follow)
+
+
+def test_session_toggle_only_replays_from_the_cell():
+    # Arrange
+    path_to_follow = '1R' * 500 + '2'
+    session = TraversalSession(SAMPLE_BOARD_MAP, path_to_follow, part=1, checkpoint_interval=10)
+    board_map = list(SAMPLE_BOARD_MAP)
+
+    # Act
+    session.toggle_wall(11, 15)
+    toggle_cell(board_map, 11, 15)
+
+    # Assert
+    assert session.actions_replayed <= 10
+    assert session.score == traverse_board_map(board_map, path_to_follow)
+
+
+@pytest.mark.parametrize('row, column', [(0, 0), (-1, 8), (0, -1), (12, 8), (0, 16), (5, 100)])
+def test_session_toggle_wall_outside_the_board(row, column):
+    # Arrange
+    session = TraversalSession(SAMPLE_BOARD_MAP, SAMPLE_PATH, part=1)
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        session.toggle_wall(row, column)
+    assert session.score == 6032